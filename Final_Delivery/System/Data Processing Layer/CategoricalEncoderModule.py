@@ -0,0 +1,135 @@
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from DataSchemaModule import CHOCOLATE_SCHEMA, smallest_int_dtype
+
+
+FORMAT_VERSION = 1
+# Code of values outside a column's categories and of missing values
+UNKNOWN_CODE = -1
+
+
+class CategoricalEncoderModule:
+    """
+    Fixed value -> integer code encoding of the categorical columns
+
+    Each column has a fixed list of categories (declared in the schema, or
+    fitted on training data) and a value's code is its position in the list,
+    like the levels of an R factor; values outside the list and missing
+    values get UNKNOWN_CODE. The encoder is saved as JSON and read by the R
+    training script, so both languages use the same codes.
+    """
+
+    def __init__(self, categories):
+
+        self.categories = {column: pd.Index([str(level) for level in levels], dtype=object)
+                           for column, levels in categories.items()}
+        for column, levels in self.categories.items():
+            if not levels.is_unique:
+                raise ValueError(f"Categories of {column} are not unique: {list(levels)}")
+        self.columns = list(self.categories)
+        self.mappings = {column: {level: code for code, level in enumerate(levels)}
+                         for column, levels in self.categories.items()}
+
+
+
+    @classmethod
+    def from_schema(cls, schema):
+        """Encoder of the category columns of a DataSchemaModule, in their declared order"""
+        return cls({column: spec['categories'] for column, spec in schema.columns.items() if spec['kind'] == 'category'})
+
+
+
+    @classmethod
+    def fit(cls, df, columns):
+        """
+        Encoder fitted on df: the categories of category columns in their
+        order, the sorted distinct values of other columns
+        """
+        categories = {}
+        for column in columns:
+            values = df[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                categories[column] = list(values.cat.categories)
+            else:
+                categories[column] = sorted(str(value) for value in values.dropna().unique())
+        return cls(categories)
+
+
+
+    def encode(self, column, values):
+        """
+        Codes of a Series in one vectorized pass; a category Series only has
+        its categories looked up, and its rows recoded with one take
+
+        Returns:
+            Series of the smallest signed integer dtype holding the codes
+        """
+        categories = self.categories[column]
+        dtype = smallest_int_dtype(UNKNOWN_CODE, len(categories) - 1)
+
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            codes = values.cat.codes.to_numpy()
+            if not values.cat.categories.equals(categories):
+                # Missing values (code -1) index the trailing UNKNOWN_CODE
+                lookup = np.append(categories.get_indexer(values.cat.categories.astype(str)), UNKNOWN_CODE)
+                codes = lookup[codes]
+        else:
+            codes = categories.get_indexer(values)
+
+        return pd.Series(codes.astype(dtype, copy=False), index=values.index, name=values.name)
+
+
+
+    def transform(self, df):
+        """
+        Replace the encoded columns of df by their codes; columns that are
+        already numeric (e.g. read back from processed_data.csv) are kept
+        """
+        for column in self.columns:
+            if column in df.columns and not pd.api.types.is_numeric_dtype(df[column]):
+                df[column] = self.encode(column, df[column])
+        return df
+
+
+
+    def to_dict(self):
+
+        return {
+            'format': FORMAT_VERSION,
+            'unknown_code': UNKNOWN_CODE,
+            'categorical_levels': {column: list(levels) for column, levels in self.categories.items()}
+        }
+
+
+
+    def save(self, path):
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp = path.with_name(path.name + ".tmp")
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(temp, path)
+
+
+
+    @classmethod
+    def load(cls, path):
+        """
+        Raises:
+            ValueError for a file of another format or sentinel code
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+        if saved.get('format') != FORMAT_VERSION or saved.get('unknown_code') != UNKNOWN_CODE:
+            raise ValueError(f"{path} is not a categorical encoder of format {FORMAT_VERSION}")
+        return cls(saved['categorical_levels'])
+
+
+
+CHOCOLATE_ENCODER = CategoricalEncoderModule.from_schema(CHOCOLATE_SCHEMA)
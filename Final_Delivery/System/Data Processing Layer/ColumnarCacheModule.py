@@ -0,0 +1,174 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+# Bump when the on-disk layout changes
+CACHE_FORMAT = 1
+
+META_NAME = "meta.json"
+
+
+def file_content_hash(path):
+    """SHA-256 of a file, read in 1 MB blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+
+class ColumnarCacheModule:
+    """
+    Binary column cache of a parsed CSV file
+
+    Each column is stored as a .npy file (category columns as their integer
+    codes plus the level list in meta.json) and loaded back memory-mapped, so
+    later loads skip CSV parsing and only touch the pages they use. The cache
+    is tied to the source file's path, size, mtime and content hash: a changed
+    size or content rebuilds it, and a file that was only touched (new mtime,
+    same content) keeps using it.
+    """
+
+    def __init__(self, source_path, cache_root=None, fingerprint=""):
+
+        self.source_path = Path(source_path).resolve()
+        if cache_root is None:
+            cache_root = os.environ.get("CHOCOLATE_CACHE_DIR") or self.source_path.parent / ".ingest_cache"
+        key = hashlib.sha256(f"{self.source_path}\0{fingerprint}".encode('utf-8')).hexdigest()[:16]
+        self.cache_dir = Path(cache_root) / f"{self.source_path.name}.{key}"
+        self.fingerprint = fingerprint
+        self.hits = 0
+        self.misses = 0
+
+
+
+    def _read_meta(self):
+
+        try:
+            with open(self.cache_dir / META_NAME, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get('format') != CACHE_FORMAT or meta.get('fingerprint') != self.fingerprint:
+            return None
+        return meta
+
+
+
+    def is_valid(self):
+        """True when the cache matches the current source file"""
+        meta = self._read_meta()
+        if meta is None:
+            return False
+
+        stat = self.source_path.stat()
+        if meta['size'] != stat.st_size:
+            return False
+        if meta['mtime_ns'] == stat.st_mtime_ns:
+            return True
+
+        # Same size, new mtime: only the content hash can tell
+        if file_content_hash(self.source_path) != meta['content_sha256']:
+            return False
+        meta['mtime_ns'] = stat.st_mtime_ns
+        self._write_meta(self.cache_dir, meta)
+        return True
+
+
+
+    def load(self):
+        """
+        Memory-mapped DataFrame from the cache, or None when it is missing or stale
+
+        Columns are copy-on-write maps of the cache files: reading them costs no
+        copy, and writing to them never changes the cache.
+        """
+        if not self.is_valid():
+            self.misses += 1
+            return None
+
+        meta = self._read_meta()
+        columns = {}
+        for column in meta['columns']:
+            # asarray: a plain ndarray view of the map, so downstream results are not memmaps
+            values = np.asarray(np.load(self.cache_dir / column['file'], mmap_mode='c'))
+            if column['categories'] is not None:
+                values = pd.Categorical.from_codes(values, categories=column['categories'])
+            columns[column['name']] = values
+
+        self.hits += 1
+        # copy=False keeps one block per column instead of consolidating (copying) them
+        return pd.DataFrame(columns, copy=False)
+
+
+
+    def save(self, df):
+        """
+        Write df as the cache of the current source file
+
+        Only numeric and category columns can be cached (schema-typed data).
+        """
+        stat = self.source_path.stat()
+        meta = {
+            'format': CACHE_FORMAT,
+            'fingerprint': self.fingerprint,
+            'source': str(self.source_path),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'content_sha256': file_content_hash(self.source_path),
+            'rows': len(df),
+            'columns': []
+        }
+
+        # Build in a temporary directory and swap it in, so readers never see a partial cache
+        staging = self.cache_dir.with_name(f"{self.cache_dir.name}.tmp{os.getpid()}")
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir(parents=True)
+        try:
+            for i, name in enumerate(df.columns):
+                values = df[name]
+                categories = None
+                if isinstance(values.dtype, pd.CategoricalDtype):
+                    categories = [str(level) for level in values.cat.categories]
+                    array = values.cat.codes.to_numpy()
+                elif pd.api.types.is_numeric_dtype(values):
+                    array = values.to_numpy()
+                else:
+                    raise TypeError(f"Column {name} has dtype {values.dtype}; only numeric and category columns can be cached")
+                file_name = f"{i:04d}.npy"
+                np.save(staging / file_name, np.ascontiguousarray(array), allow_pickle=False)
+                meta['columns'].append({'name': name, 'file': file_name, 'categories': categories})
+
+            self._write_meta(staging, meta)
+            if self.cache_dir.exists():
+                old = self.cache_dir.with_name(f"{self.cache_dir.name}.old{os.getpid()}.{time.time_ns()}")
+                os.replace(self.cache_dir, old)
+                shutil.rmtree(old, ignore_errors=True)
+            os.replace(staging, self.cache_dir)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+
+
+    @staticmethod
+    def _write_meta(directory, meta):
+
+        temp = Path(directory) / f"{META_NAME}.tmp"
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(temp, Path(directory) / META_NAME)
+
+
+
+    def invalidate(self):
+
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
@@ -0,0 +1,170 @@
+import gzip
+import io
+import queue
+import threading
+from contextlib import contextmanager
+
+try:
+    from isal import igzip_threaded
+except ImportError:
+    igzip_threaded = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# Leading bytes of each supported compressed format
+MAGIC_BYTES = {
+    'gzip': b"\x1f\x8b",
+    'zstd': b"\x28\xb5\x2f\xfd"
+}
+
+SUFFIXES = {
+    '.gz': 'gzip',
+    '.gzip': 'gzip',
+    '.zst': 'zstd',
+    '.zstd': 'zstd'
+}
+
+# Decompressed bytes handed from the decoder thread to the parser at a time
+BLOCK_SIZE = 1024 * 1024
+# Blocks decoded ahead of the parser; bounds the decompressed data held in memory
+PREFETCH_BLOCKS = 8
+
+
+def detect_codec(path):
+    """
+    Compression of a file from its leading bytes: 'gzip', 'zstd' or None
+
+    Raises:
+        ValueError when the file name promises a codec its content does not have
+    """
+    with open(path, 'rb') as f:
+        head = f.read(4)
+    codec = next((name for name, magic in MAGIC_BYTES.items() if head.startswith(magic)), None)
+
+    expected = next((name for suffix, name in SUFFIXES.items() if str(path).lower().endswith(suffix)), None)
+    if expected is not None and codec != expected:
+        raise ValueError(f"{path} is named as {expected} but its content is {codec or 'not compressed'}")
+    return codec
+
+
+
+class PrefetchReader(io.RawIOBase):
+    """
+    Read-only stream that reads its source on a background thread
+
+    Decompression then runs while the CSV parser works on earlier blocks; at
+    most PREFETCH_BLOCKS decompressed blocks wait in memory at any time.
+    """
+
+    def __init__(self, source, block_size=BLOCK_SIZE, blocks=PREFETCH_BLOCKS):
+
+        self.source = source
+        self.block_size = block_size
+        self._blocks = queue.Queue(maxsize=blocks)
+        self._pending = memoryview(b"")
+        self._finished = False
+        self._error = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._fill, daemon=True)
+        self._thread.start()
+
+
+
+    def _fill(self):
+
+        try:
+            while not self._stop.is_set():
+                block = self.source.read(self.block_size)
+                self._put(block)
+                if not block:
+                    return
+        except Exception as e:
+            self._put(e)
+
+
+
+    def _put(self, item):
+
+        while not self._stop.is_set():
+            try:
+                self._blocks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+
+
+    def readable(self):
+
+        return True
+
+
+
+    def readinto(self, buffer):
+
+        if self._error is not None:
+            raise self._error
+        while not self._pending and not self._finished:
+            block = self._blocks.get()
+            if isinstance(block, Exception):
+                # The fill thread has stopped, so later reads fail the same way
+                self._error = block
+                raise block
+            if not block:
+                self._finished = True
+            self._pending = memoryview(block)
+
+        n = min(len(buffer), len(self._pending))
+        buffer[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return n
+
+
+
+    def close(self):
+
+        if not self.closed:
+            self._stop.set()
+            self._thread.join()
+            self.source.close()
+        super().close()
+
+
+
+def _open_decoder(path, codec):
+
+    if codec == 'gzip':
+        if igzip_threaded is not None:
+            # ISA-L decoder on its own thread
+            return igzip_threaded.open(path, 'rb', threads=1, block_size=BLOCK_SIZE)
+        return io.BufferedReader(PrefetchReader(gzip.open(path, 'rb')), BLOCK_SIZE)
+
+    if zstandard is None:
+        raise ImportError(f"Reading {path} needs the zstandard package (pip install zstandard)")
+    # zstandard releases the GIL while it decodes, so the prefetch thread runs in parallel with parsing
+    reader = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), read_size=BLOCK_SIZE, read_across_frames=True)
+    return io.BufferedReader(PrefetchReader(reader), BLOCK_SIZE)
+
+
+
+@contextmanager
+def open_input(path):
+    """
+    Something pd.read_csv can parse: the path itself for plain files, or a
+    stream of decompressed bytes for .gz/.zst files, so the decompressed file
+    is never held in memory as a whole
+    """
+    codec = detect_codec(path)
+    if codec is None:
+        yield path
+        return
+
+    stream = _open_decoder(path, codec)
+    try:
+        yield stream
+    finally:
+        stream.close()
@@ -1,30 +1,511 @@
+import glob
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
 
+from ColumnarCacheModule import ColumnarCacheModule
+from CompressedInputModule import open_input
+from DataSchemaModule import CHOCOLATE_SCHEMA, SchemaValidationError
+from WatermarkModule import WatermarkModule, header_end, open_range
+
+
+# Rows per chunk for iter_chunks() when no size is given
+DEFAULT_CHUNK_ROWS = 100_000
+
+# Files picked up when file_path is a directory
+SOURCE_PATTERNS = ("*.csv", "*.csv.gz", "*.csv.zst")
+
+
+def resolve_sources(file_path):
+    """
+    Files named by file_path: a file, a directory (its CSV files), a glob
+    pattern or a list of any of these, in sorted order within each entry
+
+    Raises:
+        FileNotFoundError when nothing matches
+    """
+    entries = [file_path] if isinstance(file_path, (str, os.PathLike)) else list(file_path)
+    sources = []
+    for entry in entries:
+        entry = str(entry)
+        if os.path.isdir(entry):
+            matches = sorted({path for pattern in SOURCE_PATTERNS for path in glob.glob(os.path.join(entry, pattern))})
+        elif glob.has_magic(entry):
+            matches = sorted(path for path in glob.glob(entry) if os.path.isfile(path))
+        else:
+            matches = [entry]
+        if not matches:
+            raise FileNotFoundError(f"No input files match {entry}")
+        sources.extend(matches)
+    return sources
+
 
 class DataIngestionModule:
     """
     Module for data ingestion of the Chocolates project
+
+    file_path may be one CSV file or, for data split into several files (e.g.
+    one per region per day), a directory, a glob pattern or a list of paths.
+    Several files are read in parallel by load_data() and in file order by
+    iter_chunks(); they must all have the same columns.
+
+    Column types are inferred unless a schema is given (e.g. CHOCOLATE_SCHEMA,
+    as main.py does); only with a schema do loads raise SchemaValidationError.
     """
     
-    def __init__(self, file_path):
+    def __init__(self, file_path, schema=None, cache=True, max_workers=None):
         
         self.file_path = file_path
+        self.schema = schema
         self.df = None
+        self.memory_report = None
+        # Only schema-typed data is cached: its dtypes are fixed, so the cache is exact
+        self.use_cache = cache and schema is not None
+        self.caches = {}
+        self.max_workers = max_workers
+        # One {"file", "rows", "seconds", "source"} entry per file of the last load
+        self.file_timings = []
+        self.delta_report = None
+        self._pending_marks = None
     
 
 
     def load_data(self):
-        
+        """
+        Load the whole input
+
+        Without a schema, column types are inferred and a file that cannot be
+        read returns None. With a schema, column types are declared instead,
+        and violations raise SchemaValidationError (other errors still return
+        None); with the cache enabled, a file loaded before is memory-mapped
+        from its columnar cache instead of parsed again, until the file changes.
+        """
         try:
-            self.df = pd.read_csv(self.file_path)
+            self.df = self._load_sources(resolve_sources(self.file_path))
+            if self.schema is not None:
+                self.memory_report = self.schema.memory_report(self.df)
+                self.show_memory_report()
             print(f"Data loaded successfully from {self.file_path}")
             return self.df
+        except SchemaValidationError as e:
+            print(f"Schema violation in {self.file_path}: {e}")
+            raise
         except Exception as e:
             print(f"Error loading data: {e}")
             return None
     
 
 
+    def _load_sources(self, sources, ends=None):
+        """ends: {path: byte offset} of plain files to read only up to that offset"""
+        ends = ends or {}
+        if len(sources) == 1:
+            return self._load_file(sources[0], ends.get(sources[0]))
+        return self._load_files(sources, ends)
+    
+
+
+    def _load_file(self, path, end=None):
+
+        df, timing = self._read_file(path, end)
+        self.file_timings = [timing]
+        if self.schema is not None:
+            print(f"Source: {timing['source']}")
+        return df
+    
+
+
+    def _load_files(self, sources, ends):
+        """
+        Read several files on a thread pool (the CSV parser releases the GIL)
+        and concatenate them once, in file order
+        """
+        self.check_consistency(sources)
+        workers = self.max_workers or min(len(sources), os.cpu_count() or 1)
+        print(f"Reading {len(sources)} files with {workers} workers")
+
+        done = []
+        def read(path):
+            df, timing = self._read_file(path, ends.get(path))
+            done.append(path)
+            print(f"  [{len(done)}/{len(sources)}] {path}: {timing['rows']} rows in {timing['seconds']:.2f}s ({timing['source']})")
+            return df, timing
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(read, sources))
+
+        frames = [df for df, _ in results]
+        self.file_timings = [timing for _, timing in results]
+        if self.schema is None:
+            # Same rule as chunks: later files take the first file's dtypes
+            frames[1:] = [self._align_dtypes(df, frames[0].dtypes, path) for df, path in zip(frames[1:], sources[1:])]
+        # A single concat allocates the result once instead of growing it file by file
+        return pd.concat(frames, ignore_index=True)
+    
+
+
+    def _read_file(self, path, end=None):
+        """end: byte offset of a plain file to stop at (default: read it whole)"""
+        start = time.perf_counter()
+        if end is not None and header_end(path) <= end < os.path.getsize(path):
+            # Leave out a last line that may still be being written; the cache covers whole files only
+            chunks = list(self._read_chunks(path, DEFAULT_CHUNK_ROWS, byte_range=(header_end(path), end)))
+            df = pd.concat(chunks, ignore_index=True) if chunks else self._empty_frame(path)
+            source = "CSV (complete lines)"
+        elif self.schema is None:
+            with open_input(path) as handle:
+                df, source = pd.read_csv(handle), "CSV"
+        else:
+            df, source = self._load_cached(path), "columnar cache"
+            if df is None:
+                # Parse in chunks so the wide int64 parse buffers never cover the whole file
+                df = pd.concat(self._read_chunks(path, DEFAULT_CHUNK_ROWS), ignore_index=True)
+                source = self._save_cache(path, df)
+        return df, {"file": path, "rows": len(df), "seconds": time.perf_counter() - start, "source": source}
+    
+
+
+    def check_consistency(self, sources):
+        """
+        Check that every file has the columns of the first one (and, with a
+        schema, that they are valid) before anything is parsed
+
+        Raises:
+            SchemaValidationError (ValueError without a schema) naming the first differing file
+        """
+        error_type = SchemaValidationError if self.schema is not None else ValueError
+        reference = None
+        for path in sources:
+            header = self._read_header(path)
+            if self.schema is not None:
+                try:
+                    self.schema.check_columns(header)
+                except SchemaValidationError as e:
+                    raise SchemaValidationError(f"{path}: {e}") from e
+            if reference is None:
+                reference = (path, header)
+            elif set(header) != set(reference[1]):
+                added = sorted(set(header) - set(reference[1]))
+                missing = sorted(set(reference[1]) - set(header))
+                raise error_type(f"{path} has different columns than {reference[0]} (extra: {added}, missing: {missing})")
+    
+
+
+    def load_delta(self, watermarks, reset=False):
+        """
+        Rows added to the input since the last commit_delta() with the same
+        watermark file, so downstream stages can update instead of recompute
+
+        Appended rows of a plain CSV file are read from the byte offset where
+        the previous read stopped, and new files are read whole (see
+        WatermarkModule). When there is no previous state, reset is True, or
+        a file read before was rewritten rather than appended to, the whole
+        input is returned and delta_report["reset"] is True: downstream
+        results must then be rebuilt from it instead of updated.
+
+        Args:
+            watermarks: path of the watermark JSON file, or a WatermarkModule
+
+        Returns:
+            DataFrame of the new rows (possibly empty), or None on error
+        """
+        try:
+            if not isinstance(watermarks, WatermarkModule):
+                watermarks = WatermarkModule(watermarks)
+            sources = resolve_sources(self.file_path)
+            if len(sources) > 1:
+                self.check_consistency(sources)
+
+            plans = {path: watermarks.plan(path) for path in sources}
+            rebuild = [path for path, plan in plans.items() if plan['mode'] == 'full' and plan['reason'] != "new file"]
+            reset = reset or not watermarks.marks or bool(rebuild)
+
+            frames, marks, files = [], [], []
+            for path in sources if not reset else []:
+                plan = plans[path]
+                if plan['mode'] == 'unchanged':
+                    files.append({'file': path, 'mode': plan['mode'], 'reason': plan['reason'], 'rows': 0})
+                    continue
+
+                if plan['mode'] == 'append':
+                    chunks = self._read_chunks(path, DEFAULT_CHUNK_ROWS, byte_range=(plan['start'], plan['end']), first_row=plan['rows'])
+                    df = pd.concat(chunks, ignore_index=True)
+                    end, rows = plan['end'], plan['rows'] + len(df)
+                else:
+                    df, _ = self._read_file(path, plan.get('end'))
+                    end, rows = plan.get('end'), len(df)
+                    if plan['mode'] == 'reread':
+                        # Only rows past the watermark are new, if the rows before it are still in place
+                        before = plan['rows']
+                        if len(df) < before or (before and plan['last_id'] is not None and _last_id(df.iloc[:before]) != plan['last_id']):
+                            rebuild.append(path)
+                            reset = True
+                            break
+                        df = df.iloc[before:].reset_index(drop=True)
+
+                last_id = _last_id(df)
+                marks.append((path, rows, plan['last_id'] if last_id is None else last_id, end, plan.get('content_sha256')))
+                files.append({'file': path, 'mode': plan['mode'], 'reason': plan['reason'], 'rows': len(df)})
+                frames.append(df)
+
+            if reset:
+                return self._load_full_delta(watermarks, sources, plans, rebuild)
+
+            if frames:
+                delta = pd.concat(frames, ignore_index=True)
+            else:
+                delta = self._empty_frame(sources[0])
+            self.df = delta
+            self._pending_marks = (watermarks, marks)
+            self.delta_report = {'reset': False, 'rows': len(delta), 'rebuilt': [], 'files': files}
+            print(f"Delta of {self.file_path}: {len(delta)} new rows")
+            return delta
+        except SchemaValidationError as e:
+            print(f"Schema violation in {self.file_path}: {e}")
+            raise
+        except Exception as e:
+            print(f"Error loading delta: {e}")
+            return None
+    
+
+
+    def _load_full_delta(self, watermarks, sources, plans, rebuild):
+
+        # Plain files are read up to the end of their plan, which is also the offset marked
+        delta = self.df = self._load_sources(sources, {path: plan['end'] for path, plan in plans.items() if 'end' in plan})
+        if self.schema is not None:
+            self.memory_report = self.schema.memory_report(delta)
+            self.show_memory_report()
+
+        # Row counts and last Ids per file, in the order load_data() concatenated them
+        marks, first = [], 0
+        for timing in self.file_timings:
+            path = timing['file']
+            rows = delta.iloc[first:first + timing['rows']]
+            marks.append((path, timing['rows'], _last_id(rows), plans[path].get('end'), plans[path].get('content_sha256')))
+            first += timing['rows']
+
+        self._pending_marks = (watermarks, marks)
+        self.delta_report = {
+            'reset': True,
+            'rows': len(delta),
+            'rebuilt': rebuild,
+            'files': [{'file': path, 'mode': 'full', 'reason': plans[path]['reason'], 'rows': timing['rows']}
+                      for path, timing in zip(sources, self.file_timings)]
+        }
+        reason = f" ({', '.join(plans[path]['reason'] for path in rebuild)})" if rebuild else ""
+        print(f"Delta of {self.file_path}: full reload of {len(delta)} rows{reason}")
+        return delta
+    
+
+
+    def commit_delta(self, outputs=()):
+        """
+        Save the watermarks of the last load_delta(); call it once the delta
+        has been processed and written, so a failed run reads the same rows again
+
+        Args:
+            outputs: files the delta was written to, whose sizes are saved
+                with the watermarks (see WatermarkModule.restore_output)
+        """
+        if self._pending_marks is None:
+            print("Error: No delta loaded")
+            return
+        watermarks, marks = self._pending_marks
+        for path, rows, last_id, end, content_sha256 in marks:
+            watermarks.mark(path, rows, last_id, end, content_sha256)
+        for path in outputs:
+            watermarks.mark_output(path)
+        watermarks.save()
+        self._pending_marks = None
+        print(f"Watermarks saved to {watermarks.state_path}")
+    
+
+
+    def iter_chunks(self, chunk_rows=DEFAULT_CHUNK_ROWS, usecols=None, dtype=None):
+        """
+        Read the input as a sequence of DataFrames of at most chunk_rows rows,
+        so peak memory is bounded by the chunk size instead of the file size;
+        several files are streamed one after another in file order
+
+        Args:
+            chunk_rows: rows per chunk
+            usecols: columns to read (default: all)
+            dtype: column dtypes overriding the schema; without a schema or
+                dtype the dtypes of the first chunk are kept for every later chunk
+
+        Raises:
+            SchemaValidationError when a chunk violates the schema
+            ValueError when a later chunk cannot be converted to the first chunk's dtypes
+        """
+        rows = 0
+        try:
+            sources = resolve_sources(self.file_path)
+            if len(sources) > 1:
+                self.check_consistency(sources)
+            dtypes = None
+            self.file_timings = []
+            for number, path in enumerate(sources, 1):
+                start, first = time.perf_counter(), rows
+                for chunk in self._file_chunks(path, chunk_rows, usecols, dtype):
+                    if self.schema is None or dtype is not None:
+                        # Later files take the first file's dtypes, like later chunks
+                        if dtypes is None:
+                            dtypes = chunk.dtypes
+                        else:
+                            chunk = self._align_dtypes(chunk, dtypes, path)
+                    # Continue the row numbering across files
+                    chunk.index = pd.RangeIndex(rows, rows + len(chunk))
+                    rows += len(chunk)
+                    yield chunk
+                # Includes the time spent by the consumer on this file's chunks
+                self.file_timings.append({"file": path, "rows": rows - first, "seconds": time.perf_counter() - start})
+                if len(sources) > 1:
+                    print(f"  [{number}/{len(sources)}] {path}: {rows - first} rows in {self.file_timings[-1]['seconds']:.2f}s")
+        except Exception as e:
+            print(f"Error reading chunks from {self.file_path}: {e}")
+            raise
+
+        print(f"Data streamed successfully from {self.file_path} ({rows} rows)")
+    
+
+
+    def _file_chunks(self, path, chunk_rows, usecols, dtype):
+
+        cached = self._load_cached(path) if dtype is None else None
+        if cached is None:
+            yield from self._read_chunks(path, chunk_rows, usecols, dtype)
+            return
+
+        if usecols is not None:
+            self.schema.check_columns(list(cached.columns), usecols)
+            cached = cached[list(usecols)]
+        for start in range(0, len(cached), chunk_rows):
+            # Shallow copies: callers may add or replace columns without touching the cache
+            yield cached.iloc[start:start + chunk_rows].copy(deep=False)
+    
+
+
+    def _read_chunks(self, path, chunk_rows, usecols=None, dtype=None, byte_range=None, first_row=0):
+        """
+        byte_range: (start, end) of a plain file holding whole rows without
+        the header; first_row is then the row number of its first row
+        """
+        use_schema = self.schema is not None and dtype is None
+        header = self._read_header(path)
+        if use_schema:
+            self.schema.check_columns(header, usecols)
+            dtype = self.schema.read_dtypes(usecols or header)
+
+        if byte_range is None:
+            # Compressed files are decompressed as a stream while the parser consumes it
+            opened, names = open_input(path), None
+        else:
+            opened, names = open_range(path, *byte_range), header
+        with opened as source:
+            reader = pd.read_csv(source, chunksize=chunk_rows, usecols=usecols, dtype=dtype,
+                                 header=None if names else 'infer', names=names)
+            dtypes = None
+
+            try:
+                for i, chunk in enumerate(_parse_errors_as(reader, SchemaValidationError if use_schema else None)):
+                    if use_schema:
+                        chunk = self.schema.apply(chunk, first_row)
+                    elif dtypes is None:
+                        dtypes = chunk.dtypes
+                    else:
+                        chunk = self._align_dtypes(chunk, dtypes, f"chunk {i} of {path}")
+                    first_row += len(chunk)
+                    yield chunk
+            finally:
+                reader.close()
+    
+
+
+    def _empty_frame(self, path):
+
+        return pd.DataFrame({column: pd.Series(dtype=self.schema.storage_dtype(column) if self.schema is not None else object)
+                             for column in self._read_header(path)})
+    
+
+
+    @staticmethod
+    def _read_header(path):
+
+        with open_input(path) as source:
+            return list(pd.read_csv(source, nrows=0).columns)
+    
+
+
+    def cache_for(self, path):
+        """ColumnarCacheModule of one input file, or None when caching is off"""
+        if not self.use_cache:
+            return None
+        if path not in self.caches:
+            self.caches[path] = ColumnarCacheModule(path, fingerprint=self.schema.fingerprint())
+        return self.caches[path]
+    
+
+
+    def _load_cached(self, path):
+
+        cache = self.cache_for(path)
+        if cache is None:
+            return None
+        try:
+            return cache.load()
+        except Exception as e:
+            # A damaged cache only costs a re-parse
+            print(f"Warning: ignoring columnar cache of {path}: {e}")
+            return None
+    
+
+
+    def _save_cache(self, path, df):
+
+        cache = self.cache_for(path)
+        if cache is None:
+            return "CSV"
+        try:
+            cache.save(df)
+            return f"CSV (columnar cache written to {cache.cache_dir})"
+        except Exception as e:
+            print(f"Warning: could not write columnar cache of {path}: {e}")
+            return "CSV"
+    
+
+
+    @staticmethod
+    def _align_dtypes(chunk, dtypes, where):
+
+        changed = [column for column in chunk.columns if chunk[column].dtype != dtypes[column]]
+        if not changed:
+            return chunk
+
+        try:
+            return chunk.astype({column: dtypes[column] for column in changed})
+        except (ValueError, TypeError) as e:
+            details = ", ".join(f"{c}: {dtypes[c]} -> {chunk[c].dtype}" for c in changed)
+            raise ValueError(
+                f"Column types changed in {where} ({details}); pass dtype= to fix them"
+            ) from e
+    
+
+
+    def show_memory_report(self):
+
+        if self.memory_report is None:
+            print("Error: No schema-typed data loaded")
+            return
+        report = self.memory_report
+        print(f"Memory with declared schema: {report['declared_bytes'] / 1024:.1f} KB "
+              f"(type inference: ~{report['inferred_bytes'] / 1024:.1f} KB, "
+              f"{report['saved_percent']}% saved)")
+    
+
+
     def show_head(self, n=5):
 
         if self.df is not None:
@@ -53,9 +534,31 @@ class DataIngestionModule:
 
 
 
+def _last_id(df):
+    """Id of the last row (Ids are not ordered in the source files)"""
+    if 'Id' not in df.columns or len(df) == 0:
+        return None
+    return int(df['Id'].iloc[-1])
+
+
+
+def _parse_errors_as(reader, error_type):
+    """Re-raise CSV parse errors (e.g. text or blanks in an integer column) as error_type"""
+    if error_type is None:
+        yield from reader
+        return
+    try:
+        yield from reader
+    except ValueError as e:
+        if isinstance(e, error_type):
+            raise
+        raise error_type(f"Value does not match the declared column types: {e}") from e
+
+
+
 if __name__ == "__main__":
     
-    data_ingestor = DataIngestionModule('data_training.csv')
+    data_ingestor = DataIngestionModule('data_training.csv', schema=CHOCOLATE_SCHEMA)
     df = data_ingestor.load_data()
     
     
@@ -0,0 +1,191 @@
+import hashlib
+import json
+import sys
+
+import numpy as np
+import pandas as pd
+
+
+class SchemaValidationError(ValueError):
+    """Raised when a file does not match the declared schema"""
+
+
+def smallest_int_dtype(low, high):
+    """Smallest numpy integer dtype holding every value in [low, high]"""
+    candidates = ['uint8', 'uint16', 'uint32', 'uint64'] if low >= 0 else ['int8', 'int16', 'int32', 'int64']
+    for name in candidates:
+        info = np.iinfo(name)
+        if info.min <= low and high <= info.max:
+            return np.dtype(name)
+    raise ValueError(f"No integer dtype holds [{low}, {high}]")
+
+
+class DataSchemaModule:
+    """
+    Declared column types and value ranges of the Chocolates dataset
+
+    Integer columns declare their valid range and are stored in the smallest
+    dtype that holds it; categorical columns declare their levels and are
+    stored as category dtype. Files are read with these types directly, so
+    pandas never infers them, and any violation stops the load right away.
+    """
+
+    def __init__(self, columns):
+
+        self.columns = columns
+
+
+
+    def fingerprint(self):
+        """Short hash of the declared columns, so caches built with another schema are not reused"""
+        return hashlib.sha256(json.dumps(self.columns, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+
+    def storage_dtype(self, column):
+
+        spec = self.columns[column]
+        if spec['kind'] == 'int':
+            return smallest_int_dtype(spec['min'], spec['max'])
+        if spec['kind'] == 'category':
+            return pd.CategoricalDtype(spec['categories'])
+        return np.dtype('float64')
+
+
+
+    def read_dtypes(self, columns):
+        """
+        dtypes passed to the CSV parser; integers are parsed as int64 so that
+        out-of-range values can be reported before downcasting
+        """
+        parse = {'int': 'int64', 'float': 'float64', 'category': object}
+        return {column: parse[self.columns[column]['kind']] for column in columns if column in self.columns}
+
+
+
+    def check_columns(self, columns, usecols=None):
+        """
+        Raises:
+            SchemaValidationError for unknown columns or missing required columns
+        """
+        unknown = [column for column in columns if column not in self.columns]
+        if unknown:
+            raise SchemaValidationError(f"Columns not in the schema: {unknown}")
+
+        if usecols is None:
+            missing = [name for name, spec in self.columns.items() if spec.get('required', True) and name not in columns]
+        else:
+            missing = [name for name in usecols if name not in columns]
+        if missing:
+            raise SchemaValidationError(f"Missing required columns: {missing}")
+
+
+
+    def apply(self, df, first_row=0):
+        """
+        Validate a freshly parsed DataFrame and convert it to the storage dtypes
+
+        Args:
+            df: DataFrame read with read_dtypes()
+            first_row: file row number of df's first row, for error messages
+
+        Raises:
+            SchemaValidationError on missing values, out-of-range integers or unknown categories
+        """
+        for column in df.columns:
+            spec = self.columns[column]
+            values = df[column]
+
+            if spec['kind'] == 'int':
+                bad = (values < spec['min']) | (values > spec['max'])
+                if bad.any():
+                    self._fail(column, bad, df, first_row, f"outside [{spec['min']}, {spec['max']}]")
+                df[column] = values.astype(self.storage_dtype(column))
+
+            elif spec['kind'] == 'category':
+                categorical = pd.Categorical(values, dtype=self.storage_dtype(column))
+                unknown = values.notna() & (categorical.codes < 0)
+                if unknown.any():
+                    found = sorted(set(values[unknown].astype(str)))[:5]
+                    self._fail(column, unknown, df, first_row, f"not one of {spec['categories']} (found {found})")
+                if not spec.get('nullable', False) and values.isna().any():
+                    self._fail(column, values.isna(), df, first_row, "missing")
+                df[column] = categorical
+
+            elif not spec.get('nullable', False) and values.isna().any():
+                self._fail(column, values.isna(), df, first_row, "missing")
+
+        return df
+
+
+
+    @staticmethod
+    def _fail(column, mask, df, first_row, problem):
+
+        positions = np.flatnonzero(np.asarray(mask))
+        # +2: 1-based rows plus the header line
+        rows = [int(first_row + p + 2) for p in positions[:5]]
+        raise SchemaValidationError(f"{len(positions)} values of {column} are {problem} (file lines {rows})")
+
+
+
+    def memory_report(self, df):
+        """
+        Memory of df with the declared dtypes compared to what type inference
+        would have used (int64/float64 numbers, one Python string per text cell)
+        """
+        declared = int(df.memory_usage(index=False, deep=True).sum())
+        inferred = 0
+        for column in df.columns:
+            values = df[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                counts = values.value_counts(dropna=True)
+                inferred += 8 * len(values) + sum(int(n) * sys.getsizeof(str(level)) for level, n in counts.items())
+            else:
+                inferred += 8 * len(values)
+
+        return {
+            'declared_bytes': declared,
+            'inferred_bytes': inferred,
+            'saved_bytes': inferred - declared,
+            'saved_percent': round(100 * (inferred - declared) / inferred, 1) if inferred else 0.0
+        }
+
+
+
+def _int(low, high, required=True):
+
+    return {'kind': 'int', 'min': low, 'max': high, 'required': required}
+
+
+
+CHOCOLATE_SCHEMA = DataSchemaModule({
+    'sales': {'kind': 'float', 'required': False},
+    'Id': _int(0, 2**32 - 1),
+    'Web_GRP': _int(0, 1000),
+    'TV_GRP': _int(0, 1000),
+    'Facebook_GRP': _int(0, 1000),
+    'Tone_of_Ad': {'kind': 'category', 'categories': ['funny', 'serious', 'emotional']},
+    'No_of_Web_Banners': _int(0, 255),
+    'Weather': {'kind': 'category', 'categories': ['sunny', 'cloudy', 'rainy']},
+    'Avg_Temperature': _int(-60, 60),
+    'No_of_Rabbits': _int(0, 65535),
+    'Network_Five_G': _int(0, 1),
+    'No_of_iPhone_14_Sold': _int(0, 65535),
+    'No_of_Big_Cities': _int(0, 255),
+    'Health_Index': _int(0, 100),
+    'Sustainability_Index': _int(-100, 100),
+    'Choc_Capital_Distance': _int(0, 65535),
+    'No_of_Competitors': _int(0, 255),
+    'Import_Regulations': _int(0, 1),
+    'Time_in_Region': _int(0, 65535),
+    'Percent_Internet_Access': _int(0, 100),
+    'Percent_Uni_Degrees': _int(0, 100),
+    'Percent_Unemployed': _int(0, 100),
+    'Gender': _int(0, 1),
+    'Coffee_Consumption': {'kind': 'category', 'categories': ['low', 'medium', 'high']},
+    'Avg_No_of_Cust_Complaints': _int(0, 65535),
+    'Avg_Customer_Age': _int(0, 150),
+    # Duplicate of Id present in the source files
+    'id': _int(0, 2**32 - 1, required=False)
+})
@@ -2,6 +2,7 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 import math
+from contextlib import nullcontext
 import seaborn as sns
 from sklearn.preprocessing import LabelEncoder
 import warnings
@@ -11,13 +12,27 @@ warnings.filterwarnings('ignore')
 class FeatureAnalysisModule:
     
     
-    def __init__(self, dataframe):
+    def __init__(self, dataframe, plotting=None):
         
-        self.df = dataframe.copy() if dataframe is not None else None
+        # plotting: optional context manager factory every plot is rendered
+        # in, e.g. MemoryReportModule.excluded to measure the analyses alone
+        self._plotting = plotting or nullcontext
+        
+        # The analyses only read the data (none of them writes into a column),
+        # so it is shared with the caller, not copied; this holds with or
+        # without pandas copy-on-write
+        self.df = dataframe
         self.analysis_results = {}
     
 
 
+    def _numeric_columns(self, exclude):
+        """Numeric (non-bool, like select_dtypes(np.number)) column names without the excluded ones"""
+        return [c for c in self.df.columns if c not in exclude
+                and pd.api.types.is_numeric_dtype(self.df[c]) and not pd.api.types.is_bool_dtype(self.df[c])]
+    
+
+
 
     def analyze_sales_distribution(self):
 
@@ -34,20 +49,21 @@ class FeatureAnalysisModule:
         print(f"Sales range: {self.df['sales'].min():.2f} - {self.df['sales'].max():.2f}")
 
 
-        counts, bins, patches = plt.hist(self.df['sales'], bins=n_bins, alpha=0.7, color='skyblue', edgecolor='black')
+        mean_sales = self.df['sales'].mean()
+        with self._plotting():
+            counts, bins, patches = plt.hist(self.df['sales'], bins=n_bins, alpha=0.7, color='skyblue', edgecolor='black')
 
-        plt.title("Sales Distribution", fontsize=14, fontweight='bold')
-        plt.xlabel("Sales", fontsize=12)
-        plt.ylabel("Frequency", fontsize=12)
-        plt.grid(True, alpha=0.3)
+            plt.title("Sales Distribution", fontsize=14, fontweight='bold')
+            plt.xlabel("Sales", fontsize=12)
+            plt.ylabel("Frequency", fontsize=12)
+            plt.grid(True, alpha=0.3)
 
 
-        mean_sales = self.df['sales'].mean()
-        plt.axvline(mean_sales, color='red', linestyle='--', linewidth=2, label=f'Mean: {mean_sales:.2f}')
-        plt.legend()
+            plt.axvline(mean_sales, color='red', linestyle='--', linewidth=2, label=f'Mean: {mean_sales:.2f}')
+            plt.legend()
 
-        plt.tight_layout()
-        plt.show()
+            plt.tight_layout()
+            plt.show()
 
 
         hist_df = pd.DataFrame({
@@ -89,34 +105,32 @@ class FeatureAnalysisModule:
         print(f"\n=== CORRELATION ANALYSIS ===")
         
         
-        df_work = self.df.copy()
-        df_work = df_work.drop(columns=[c for c in df_work.columns if c.lower() in ['id', 'Id']], errors='ignore')
-        
-        
-        corr = df_work.select_dtypes(include=[np.number]).corr()
-        
+        numeric_cols = self._numeric_columns({c for c in self.df.columns if c.lower() == 'id'})
+        corr = self.df[numeric_cols].corr()
         
-        fig, ax = plt.subplots(figsize=(12, 10))
-        im = ax.imshow(corr, cmap='coolwarm', interpolation='nearest', aspect='auto')
         
-        # Axes
-        ax.set_xticks(range(len(corr.columns)))
-        ax.set_yticks(range(len(corr.index)))
-        ax.set_xticklabels(corr.columns, rotation=90, fontsize=9)
-        ax.set_yticklabels(corr.index, fontsize=9)
-        
-        # Show numerical values
-        for i in range(len(corr.columns)):
-            for j in range(len(corr.index)):
-                text = ax.text(j, i, f"{corr.iloc[i, j]:.2f}",
-                               ha="center", va="center", color="black", fontsize=8)
-        
-        plt.title("Correlation Heatmap (Numerical Features)", fontsize=14)
-        fig.colorbar(im, ax=ax, fraction=0.046, pad=0.04)
-        plt.tight_layout()
-        plt.savefig("OUT/CorrelationHeatmap.png", dpi=200, bbox_inches='tight')
-        plt.show()
-        plt.close()
+        with self._plotting():
+            fig, ax = plt.subplots(figsize=(12, 10))
+            im = ax.imshow(corr, cmap='coolwarm', interpolation='nearest', aspect='auto')
+            
+            # Axes
+            ax.set_xticks(range(len(corr.columns)))
+            ax.set_yticks(range(len(corr.index)))
+            ax.set_xticklabels(corr.columns, rotation=90, fontsize=9)
+            ax.set_yticklabels(corr.index, fontsize=9)
+            
+            # Show numerical values
+            for i in range(len(corr.columns)):
+                for j in range(len(corr.index)):
+                    text = ax.text(j, i, f"{corr.iloc[i, j]:.2f}",
+                                   ha="center", va="center", color="black", fontsize=8)
+            
+            plt.title("Correlation Heatmap (Numerical Features)", fontsize=14)
+            fig.colorbar(im, ax=ax, fraction=0.046, pad=0.04)
+            plt.tight_layout()
+            plt.savefig("OUT/CorrelationHeatmap.png", dpi=200, bbox_inches='tight')
+            plt.show()
+            plt.close()
 
 
         corr_pairs = []
@@ -165,16 +179,13 @@ class FeatureAnalysisModule:
         print(f"\n=== ANOVA ANALYSIS - FEATURE IMPORTANCE ===")
         
         
-        df_work = self.df.copy()
-        
-        
         exclude_cols = {'sales', 'id', 'Id', 'ID'}
-        numeric_cols = [c for c in df_work.select_dtypes(include=[np.number]).columns if c not in exclude_cols]
+        numeric_cols = self._numeric_columns(exclude_cols)
         
         formula = f"sales ~ {' + '.join(numeric_cols)}"
         
-        # Ajustar modelo
-        modelo = ols(formula, data=df_work).fit()
+        # Ajustar modelo (the formula only reads the columns it names)
+        modelo = ols(formula, data=self.df).fit()
         
         # ANOVA
         anova_tabla = sm.stats.anova_lm(modelo, typ=2)
@@ -185,20 +196,21 @@ class FeatureAnalysisModule:
         top_anova['F_log'] = np.log10(top_anova['F'] + 1)  # Logarithmic scaling
         
         # Gráfico
-        plt.figure(figsize=(9, 6))
-        bars = plt.barh(top_anova.index, top_anova['F_log'], color="#4C72B0")
-        plt.xlabel('log₁₀(F-statistic + 1)')
-        plt.title('Top Variables by ANOVA F-statistic (Log-Scaled)')
-        plt.tight_layout()
-        
-        # Labels con el valor F original
-        for bar, f_val in zip(bars, top_anova['F']):
-            plt.text(bar.get_width() + 0.05, bar.get_y() + bar.get_height()/4,
-                     f"{f_val:.1f}", fontsize=8, color='black')
-        
-        plt.savefig("OUT/FeatureImportance.png", dpi=300, bbox_inches='tight')
-        plt.show()
-        plt.close()
+        with self._plotting():
+            plt.figure(figsize=(9, 6))
+            bars = plt.barh(top_anova.index, top_anova['F_log'], color="#4C72B0")
+            plt.xlabel('log₁₀(F-statistic + 1)')
+            plt.title('Top Variables by ANOVA F-statistic (Log-Scaled)')
+            plt.tight_layout()
+            
+            # Labels con el valor F original
+            for bar, f_val in zip(bars, top_anova['F']):
+                plt.text(bar.get_width() + 0.05, bar.get_y() + bar.get_height()/4,
+                         f"{f_val:.1f}", fontsize=8, color='black')
+            
+            plt.savefig("OUT/FeatureImportance.png", dpi=300, bbox_inches='tight')
+            plt.show()
+            plt.close()
 
         print(f"\nTop 15 most important variables:")
         print(top_anova[['F', 'PR(>F)']].round(4))
@@ -226,47 +238,46 @@ class FeatureAnalysisModule:
         
         
         target = 'sales'
-        df_work = self.df.copy()
-        
         
         exclude = {'Id', 'id', 'sales'}
-        num_cols = [c for c in df_work.select_dtypes(include=[np.number]).columns if c not in exclude]
+        num_cols = self._numeric_columns(exclude)
         
-        
-        correlations = df_work[num_cols + [target]].corr()[target].drop(target)
+        # Correlation of each column with the target, without building the full matrix
+        y = self.df[target]
+        correlations = pd.Series({col: self.df[col].corr(y) for col in num_cols})
         correlations = correlations.sort_values(ascending=False)
         
         
-        n_cols = 4
-        n_rows = math.ceil(len(num_cols) / n_cols)
-        fig, axes = plt.subplots(n_rows, n_cols, figsize=(16, 4 * n_rows))
-        
-        
-        for i, col in enumerate(correlations.index):
-            ax = axes.flat[i] if n_rows > 1 else axes
-            x = df_work[col]
-            y = df_work[target]
-            ax.scatter(x, y, s=15, alpha=0.7, color='skyblue')
+        with self._plotting():
+            n_cols = 4
+            n_rows = math.ceil(len(num_cols) / n_cols)
+            fig, axes = plt.subplots(n_rows, n_cols, figsize=(16, 4 * n_rows))
             
-            # Línea de tendencia
-            coef = np.polyfit(x, y, 1)
-            fit = np.poly1d(coef)
-            x_line = np.linspace(x.min(), x.max(), 100)
-            ax.plot(x_line, fit(x_line), color='red', linewidth=1)
             
-            ax.set_title(f"{col} (r={correlations[col]:.2f})", fontsize=9)
-            ax.set_xlabel(col)
-            ax.set_ylabel(target)
-            ax.grid(True, alpha=0.3)
-        
-        # Ocultar subplots vacíos si hay más espacios que variables
-        for j in range(i + 1, n_rows * n_cols):
-            axes.flat[j].axis('off') if n_rows > 1 else axes.axis('off')
-        
-        plt.tight_layout()
-        plt.savefig("OUT/ScatterCorrelations.png", dpi=300, bbox_inches='tight')
-        plt.show()
-        plt.close()
+            for i, col in enumerate(correlations.index):
+                ax = axes.flat[i] if n_rows > 1 else axes
+                x = self.df[col]
+                ax.scatter(x, y, s=15, alpha=0.7, color='skyblue')
+                
+                # Línea de tendencia
+                coef = np.polyfit(x, y, 1)
+                fit = np.poly1d(coef)
+                x_line = np.linspace(x.min(), x.max(), 100)
+                ax.plot(x_line, fit(x_line), color='red', linewidth=1)
+                
+                ax.set_title(f"{col} (r={correlations[col]:.2f})", fontsize=9)
+                ax.set_xlabel(col)
+                ax.set_ylabel(target)
+                ax.grid(True, alpha=0.3)
+            
+            # Ocultar subplots vacíos si hay más espacios que variables
+            for j in range(i + 1, n_rows * n_cols):
+                axes.flat[j].axis('off') if n_rows > 1 else axes.axis('off')
+            
+            plt.tight_layout()
+            plt.savefig("OUT/ScatterCorrelations.png", dpi=300, bbox_inches='tight')
+            plt.show()
+            plt.close()
 
         print(f"\nCorrelations with 'sales' (sorted):")
         for i, (var, corr) in enumerate(correlations.items()):
@@ -289,44 +300,38 @@ class FeatureAnalysisModule:
 
         print(f"\n=== BOXPLOTS ANALYSIS ===")
         
-        # Preparar datos
-        df_work = self.df.copy()
-        
-        # Eliminar columnas ID o target
-        df_work = df_work.drop(columns=[c for c in df_work.columns if c.lower() in ['id', 'sales']], errors='ignore')
-        
-        # Seleccionar solo variables numéricas
-        num_df = df_work.select_dtypes(include=[np.number])
-        cols = num_df.columns.tolist()
+        # Variables numéricas sin ID ni target
+        cols = self._numeric_columns({c for c in self.df.columns if c.lower() in ['id', 'sales']})
         
         # Crear figura 6x4
-        rows, cols_per_row = 6, 4
-        fig, axes = plt.subplots(rows, cols_per_row, figsize=(18, 12))
-        axes = axes.flatten()
-        
-        # Generar boxplots individuales
-        for i, col in enumerate(cols[:rows*cols_per_row]):  # máximo 24 variables
-            ax = axes[i]
-            bp = ax.boxplot(num_df[col].dropna(), patch_artist=True,
-                           boxprops=dict(facecolor='lightcoral'),
-                           medianprops=dict(color='black'))
-            ax.set_title(col, fontsize=9)
-            ax.tick_params(axis='x', bottom=False, labelbottom=False)
-            ax.tick_params(axis='y', labelsize=8)
-            ax.grid(True, alpha=0.3)
-        
-        # Desactivar axes vacíos si hay extras
-        for j in range(i + 1, len(axes)):
-            axes[j].axis('off')
-        
-        plt.suptitle("Boxplots of All Numerical Features (Original Scale)", fontsize=14)
-        plt.tight_layout(rect=[0, 0.03, 1, 0.95])
-        plt.savefig("OUT/Boxplots.png", dpi=200, bbox_inches='tight')
-        plt.show()
-        plt.close()
+        with self._plotting():
+            rows, cols_per_row = 6, 4
+            fig, axes = plt.subplots(rows, cols_per_row, figsize=(18, 12))
+            axes = axes.flatten()
+            
+            # Generar boxplots individuales
+            for i, col in enumerate(cols[:rows*cols_per_row]):  # máximo 24 variables
+                ax = axes[i]
+                bp = ax.boxplot(self.df[col].dropna(), patch_artist=True,
+                               boxprops=dict(facecolor='lightcoral'),
+                               medianprops=dict(color='black'))
+                ax.set_title(col, fontsize=9)
+                ax.tick_params(axis='x', bottom=False, labelbottom=False)
+                ax.tick_params(axis='y', labelsize=8)
+                ax.grid(True, alpha=0.3)
+            
+            # Desactivar axes vacíos si hay extras
+            for j in range(i + 1, len(axes)):
+                axes[j].axis('off')
+            
+            plt.suptitle("Boxplots of All Numerical Features (Original Scale)", fontsize=14)
+            plt.tight_layout(rect=[0, 0.03, 1, 0.95])
+            plt.savefig("OUT/Boxplots.png", dpi=200, bbox_inches='tight')
+            plt.show()
+            plt.close()
 
         # Descriptive statistics
-        desc_stats = num_df.describe()
+        desc_stats = self.df[cols].describe()
         print(f"\nDescriptive statistics of numerical variables:")
         print(desc_stats.round(2))
         
@@ -0,0 +1,233 @@
+import ast
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+FORMAT_VERSION = 1
+
+# Default spec, the only definition of the engineered features: also read by
+# native_model.py and, through feature_expressions.R, by the R scripts
+DEFAULT_SPEC_PATH = Path(__file__).with_name('engineered_features.json')
+
+# Rows evaluated at a time: scratch buffers of 512 KB stay in the L2 cache,
+# while blocks are large enough for the per-operation overhead not to matter
+BLOCK_ROWS = 65536
+
+OPERATORS = {ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.divide}
+
+
+def _compile(node, expression):
+    """Expression AST -> nested tuples ('name', column) | ('const', value) | ('neg', operand) | (ufunc, left, right)"""
+    if isinstance(node, ast.Expression):
+        return _compile(node.body, expression)
+    if isinstance(node, ast.Name):
+        return ('name', node.id)
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return ('const', float(node.value))
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        operand = _compile(node.operand, expression)
+        return ('neg', operand) if isinstance(node.op, ast.USub) else operand
+    if isinstance(node, ast.BinOp) and type(node.op) in OPERATORS:
+        return (OPERATORS[type(node.op)], _compile(node.left, expression), _compile(node.right, expression))
+    raise ValueError(f"Unsupported syntax in feature expression {expression!r}: {ast.dump(node)}")
+
+
+
+def _read_spec(path):
+    """
+    Raises:
+        ValueError for a file of another format
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        saved = json.load(f)
+    if saved.get('format') != FORMAT_VERSION:
+        raise ValueError(f"{path} is not an engineered feature spec of format {FORMAT_VERSION}")
+    return saved['engineered_features']
+
+
+
+# Engineered features: name -> arithmetic expression over the input columns.
+# Exported with the processed data (export()) so the R training and
+# prediction scripts evaluate the same definitions.
+ENGINEERED_FEATURES = _read_spec(DEFAULT_SPEC_PATH)
+
+
+
+def _is_leaf(node):
+
+    return node[0] in ('name', 'const')
+
+
+
+def _scratch_needed(node):
+    """Scratch buffers needed besides the output: one per level of right-hand subexpressions"""
+    if _is_leaf(node):
+        return 0
+    if node[0] == 'neg':
+        return _scratch_needed(node[1])
+    left, right = node[1], node[2]
+    right_needed = 0 if _is_leaf(right) else 1 + _scratch_needed(right)
+    return max(_scratch_needed(left), right_needed)
+
+
+
+class FeatureExpression:
+    """
+    One compiled feature expression, evaluated in place block by block
+
+    Like numexpr, the expression is not evaluated one whole-column operation
+    at a time: each block of BLOCK_ROWS rows runs through every operation
+    before the next block starts, with each intermediate written into the
+    output or a block-sized scratch buffer. Apart from the result column,
+    no full-length temporary is allocated, integer inputs are cast inside
+    the ufunc loops, and the arithmetic is float64 like in R.
+    """
+
+    def __init__(self, expression):
+
+        self.expression = expression
+        parsed = ast.parse(expression, mode='eval')
+        self.tree = _compile(parsed, expression)
+        self.inputs = sorted({node.id for node in ast.walk(parsed) if isinstance(node, ast.Name)})
+        self.scratch_count = _scratch_needed(self.tree)
+
+
+
+    def evaluate(self, columns, n_rows, out=None, block_rows=BLOCK_ROWS):
+        """
+        Args:
+            columns: name -> 1-D numeric array of n_rows values
+            out: float64 array to write into (allocated when None)
+
+        Returns:
+            out
+        """
+        if out is None:
+            out = np.empty(n_rows, dtype=np.float64)
+        scratch = [np.empty(min(block_rows, n_rows), dtype=np.float64) for _ in range(self.scratch_count)]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for start in range(0, n_rows, block_rows):
+                stop = min(start + block_rows, n_rows)
+                block = {name: columns[name][start:stop] for name in self.inputs}
+                self._into(self.tree, block, out[start:stop], [buffer[:stop - start] for buffer in scratch], 0)
+        return out
+
+
+
+    def _into(self, node, block, out, scratch, depth):
+        """Evaluate node into out; scratch[depth:] are free"""
+        if _is_leaf(node):
+            out[...] = self._operand(node, block, scratch, depth)
+        elif node[0] == 'neg':
+            np.negative(self._value(node[1], block, out, scratch, depth), out=out, dtype=np.float64)
+        else:
+            ufunc, left, right = node
+            # The left operand accumulates in out, the right one needs a scratch buffer
+            left_value = self._value(left, block, out, scratch, depth)
+            right_value = self._operand(right, block, scratch, depth)
+            ufunc(left_value, right_value, out=out, dtype=np.float64)
+
+
+
+    def _value(self, node, block, out, scratch, depth):
+        """A leaf as is, otherwise node evaluated into out"""
+        if _is_leaf(node):
+            return self._operand(node, block, scratch, depth)
+        self._into(node, block, out, scratch, depth)
+        return out
+
+
+
+    def _operand(self, node, block, scratch, depth):
+        """A leaf as is, otherwise node evaluated into scratch[depth]"""
+        if node[0] == 'name':
+            return block[node[1]]
+        if node[0] == 'const':
+            return node[1]
+        self._into(node, block, scratch[depth], scratch, depth + 1)
+        return scratch[depth]
+
+
+
+class FeatureEngineeringModule:
+    """
+    Adds the engineered features of a declarative spec to a DataFrame
+
+    The spec maps each feature name to an arithmetic expression (+ - * /,
+    parentheses, numbers and column names), the same definitions the R
+    scripts evaluate. Each feature is computed into one new float64 column
+    without whole-column intermediates (FeatureExpression).
+    """
+
+    def __init__(self, spec=None, block_rows=BLOCK_ROWS):
+
+        self.spec = dict(ENGINEERED_FEATURES if spec is None else spec)
+        self.block_rows = block_rows
+        self.expressions = {name: FeatureExpression(expression) for name, expression in self.spec.items()}
+        self.names = list(self.spec)
+
+
+
+    def add_features(self, df):
+        """
+        Add (or replace) the engineered columns of df; features may use
+        features defined before them
+
+        Raises:
+            ValueError when an input column is missing or not numeric
+        """
+        if df is None:
+            print("Error: No data available")
+            return None
+
+        columns = {}
+        for name, expression in self.expressions.items():
+            for column in expression.inputs:
+                if column in columns:
+                    continue
+                if column not in df.columns:
+                    raise ValueError(f"Missing column {column} for feature {name} = {expression.expression}")
+                values = df[column]
+                if not pd.api.types.is_numeric_dtype(values):
+                    raise ValueError(f"Column {column} of feature {name} is not numeric ({values.dtype})")
+                # numpy columns are read in place; nullable ones are converted, missing values becoming NaN
+                if pd.api.types.is_extension_array_dtype(values):
+                    columns[column] = values.to_numpy(dtype=np.float64, na_value=np.nan)
+                else:
+                    columns[column] = values.to_numpy()
+            columns[name] = expression.evaluate(columns, len(df), block_rows=self.block_rows)
+            # A Series wrapping the result is inserted without copying it (with copy-on-write)
+            df[name] = pd.Series(columns[name], index=df.index, copy=False)
+        return df
+
+
+
+    def to_dict(self):
+
+        return {'format': FORMAT_VERSION, 'engineered_features': self.spec}
+
+
+
+    def export(self, path):
+        """Write the spec as JSON, read by Training Layer/compare_models.R"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp = path.with_name(path.name + ".tmp")
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(temp, path)
+
+
+
+    @classmethod
+    def load(cls, path):
+        """
+        Raises:
+            ValueError for a file of another format
+        """
+        return cls(_read_spec(path))
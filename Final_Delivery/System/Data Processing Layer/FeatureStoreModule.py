@@ -0,0 +1,189 @@
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+# File layout:
+#   8 bytes   MAGIC
+#   4 bytes   header length H (uint32, little-endian)
+#   H bytes   JSON header, space-padded so the data starts on an ALIGNMENT boundary
+#   data      rows x columns matrix, little-endian float32/float64, column-major
+MAGIC = b"CHOCFS01"
+ALIGNMENT = 64
+FORMAT_VERSION = 1
+
+DTYPES = {'float32': np.dtype('<f4'), 'float64': np.dtype('<f8')}
+
+
+def write_feature_store(df, path, dtype='float64', category_maps=None):
+    """
+    Write the numeric columns of df as a feature store file
+
+    Columns are written one at a time straight into the mapped file, so no
+    full-size intermediate matrix is built. Category columns are stored as
+    their codes and their categories recorded in the header; category_maps
+    records the value -> code mapping of columns that were already encoded
+    (e.g. CategoricalEncoderModule.mappings).
+
+    Raises:
+        TypeError for a column that is neither numeric nor category
+    """
+    if dtype not in DTYPES:
+        raise ValueError(f"dtype must be one of {list(DTYPES)}")
+    category_maps = category_maps or {}
+
+    columns = []
+    for name in df.columns:
+        values = df[name]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            categories = {str(level): code for code, level in enumerate(values.cat.categories)}
+        elif pd.api.types.is_numeric_dtype(values):
+            categories = category_maps.get(name)
+        else:
+            raise TypeError(f"Column {name} has dtype {values.dtype}; encode it before writing the feature store")
+        columns.append({'name': str(name), 'dtype': str(values.dtype), 'categories': categories})
+
+    header = {
+        'format': FORMAT_VERSION,
+        'rows': len(df),
+        'dtype': dtype,
+        'order': 'column-major',
+        'missing': 'NaN',
+        'columns': columns
+    }
+    path = Path(path)
+    temp, data_offset = _start_file(path, header)
+
+    if len(df) and columns:
+        matrix = np.memmap(temp, dtype=DTYPES[dtype], mode='r+', offset=data_offset, shape=(len(df), len(columns)), order='F')
+        for j, name in enumerate(df.columns):
+            matrix[:, j] = _column_values(df[name])
+        matrix.flush()
+        del matrix
+    os.replace(temp, path)
+
+
+
+def append_feature_store(df, path):
+    """
+    Add the rows of df, which must have the stored columns in the same
+    order, at the end of a feature store file
+
+    The data is column-major, so the file is written again, but the stored
+    rows are copied from the mapped file instead of being parsed again from
+    the source, and the new file only replaces the old one once complete.
+
+    Raises:
+        ValueError for columns or categories that differ from the stored ones
+    """
+    path = Path(path)
+    store = FeatureStoreModule(path)
+    names = [str(name) for name in df.columns]
+    if names != store.columns:
+        raise ValueError(f"Columns {names} differ from the columns of {path}: {store.columns}")
+    for column in store.header['columns']:
+        values = df[column['name']]
+        if isinstance(values.dtype, pd.CategoricalDtype) and \
+                {str(level): code for code, level in enumerate(values.cat.categories)} != column['categories']:
+            raise ValueError(f"Column {column['name']} has other categories than in {path}")
+
+    stored = store.header['rows']
+    header = dict(store.header, rows=stored + len(df))
+    temp, data_offset = _start_file(path, header)
+
+    if header['rows'] and names:
+        matrix = np.memmap(temp, dtype=DTYPES[header['dtype']], mode='r+', offset=data_offset,
+                           shape=(header['rows'], len(names)), order='F')
+        for j, name in enumerate(df.columns):
+            matrix[:stored, j] = store.matrix[:, j]
+            matrix[stored:, j] = _column_values(df[name])
+        matrix.flush()
+        del matrix
+    # Unmap the old file before it is replaced
+    del store
+    os.replace(temp, path)
+
+
+
+def _start_file(path, header):
+    """Write header to a temporary file next to path, sized for its data; returns (temp path, data offset)"""
+    encoded = json.dumps(header).encode('utf-8')
+    prefix = len(MAGIC) + 4
+    encoded += b" " * (-(prefix + len(encoded)) % ALIGNMENT)
+    data_offset = prefix + len(encoded)
+
+    temp = path.with_name(path.name + ".tmp")
+    with open(temp, 'wb') as f:
+        f.write(MAGIC)
+        f.write(len(encoded).to_bytes(4, 'little'))
+        f.write(encoded)
+        f.truncate(data_offset + header['rows'] * len(header['columns']) * DTYPES[header['dtype']].itemsize)
+    return temp, data_offset
+
+
+
+def _column_values(values):
+
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Missing values (code -1) become NaN like in numeric columns
+        codes = values.cat.codes.to_numpy()
+        return np.where(codes < 0, np.nan, codes)
+    return values.to_numpy(dtype='float64', na_value=np.nan)
+
+
+
+class FeatureStoreModule:
+    """
+    Read-only, memory-mapped view of a feature store file
+
+    The matrix is mapped, not read: every process that opens the same file
+    shares one copy of it in the page cache, and each column is a contiguous
+    slice of the file. The R training script reads the same format
+    (Training Layer/feature_store.R).
+    """
+
+    def __init__(self, path):
+
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{self.path} is not a feature store file")
+            length = int.from_bytes(f.read(4), 'little')
+            self.header = json.loads(f.read(length).decode('utf-8'))
+
+        if self.header['format'] != FORMAT_VERSION:
+            raise ValueError(f"{self.path} has feature store format {self.header['format']}, expected {FORMAT_VERSION}")
+        self.columns = [column['name'] for column in self.header['columns']]
+        self.category_maps = {column['name']: column['categories'] for column in self.header['columns'] if column['categories']}
+        self._positions = {name: j for j, name in enumerate(self.columns)}
+
+        shape = (self.header['rows'], len(self.columns))
+        if 0 in shape:
+            self.matrix = np.empty(shape, dtype=DTYPES[self.header['dtype']], order='F')
+        else:
+            self.matrix = np.memmap(self.path, dtype=DTYPES[self.header['dtype']], mode='r',
+                                    offset=len(MAGIC) + 4 + length, shape=shape, order='F')
+
+
+
+    def column(self, name):
+        """Zero-copy view of one column"""
+        return self.matrix[:, self._positions[name]]
+
+
+
+    def select(self, names):
+        """Matrix of some columns; a view when they are adjacent in the file, a copy otherwise"""
+        positions = [self._positions[name] for name in names]
+        if positions == list(range(positions[0], positions[0] + len(positions))):
+            return self.matrix[:, positions[0]:positions[-1] + 1]
+        return self.matrix[:, positions]
+
+
+
+    def to_frame(self):
+        """DataFrame backed by the mapped matrix (no copy)"""
+        return pd.DataFrame(self.matrix, columns=self.columns, copy=False)
@@ -0,0 +1,125 @@
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    # Windows
+    resource = None
+
+
+def peak_rss_bytes():
+    """High-water mark of the process resident memory, or None where it is not available"""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        return peak if sys.platform == 'darwin' else peak * 1024
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return getattr(psutil.Process().memory_info(), 'peak_wset', None)
+
+
+
+class MemoryReportModule:
+    """
+    Memory high-water marks of the pipeline stages
+
+    Allocations are traced with tracemalloc, which also sees numpy and pandas
+    buffers, and each stage's peak is expressed in copies of the loaded data,
+    so the number of full DataFrame copies a stage holds can be read directly.
+    Work that is not about the data, like plot rendering, can be left out with
+    excluded(). Tracing slows allocation down, so it only runs when enabled.
+    """
+
+    def __init__(self, enabled=True):
+
+        self.enabled = enabled
+        self.stages = []
+        self.data_bytes = None
+        self._last = None
+        # Stage peak reached before an excluded block, and the memory excluded blocks kept
+        self._peak = 0
+        self._excluded = 0
+        if enabled:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            self._last = (tracemalloc.get_traced_memory()[0], time.perf_counter())
+
+
+
+    def set_data(self, df):
+        """Use df (e.g. the freshly loaded data) as the unit of the report"""
+        if self.enabled and df is not None:
+            self.data_bytes = int(df.memory_usage(index=True, deep=True).sum())
+
+
+
+    def checkpoint(self, stage):
+        """Close a stage: record the peak and retained memory since the previous checkpoint"""
+        if not self.enabled:
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        current -= self._excluded
+        peak = max(self._peak, peak - self._excluded)
+        start, started_at = self._last
+        self.stages.append({
+            'stage': stage,
+            'start_bytes': start,
+            'peak_bytes': peak,
+            'end_bytes': current,
+            'seconds': time.perf_counter() - started_at
+        })
+        tracemalloc.reset_peak()
+        self._peak = 0
+        self._last = (current, time.perf_counter())
+
+
+
+    @contextmanager
+    def excluded(self):
+        """
+        Leave what is allocated inside the block out of the stage: its peak
+        does not count, and what the block keeps is not reported as retained
+        """
+        if not self.enabled:
+            yield
+            return
+        before, peak = tracemalloc.get_traced_memory()
+        self._peak = max(self._peak, peak - self._excluded)
+        try:
+            yield
+        finally:
+            self._excluded += tracemalloc.get_traced_memory()[0] - before
+            tracemalloc.reset_peak()
+
+
+
+    def report(self):
+        """
+        Print and return the stages; "peak_copies" is the stage's peak above
+        the memory it started with, in copies of the data
+        """
+        if not self.enabled:
+            print("Error: Memory report not enabled")
+            return None
+
+        print("\n=== MEMORY HIGH-WATER MARKS ===")
+        if self.data_bytes:
+            print(f"One copy of the data: {self.data_bytes / 1024:.1f} KB")
+        print(f"{'Stage':32s} {'Peak KB':>12s} {'Above start KB':>15s} {'Copies':>8s} {'Retained KB':>12s}")
+        for stage in self.stages:
+            above = stage['peak_bytes'] - stage['start_bytes']
+            retained = stage['end_bytes'] - stage['start_bytes']
+            stage['peak_copies'] = round(above / self.data_bytes, 2) if self.data_bytes else None
+            copies = f"{stage['peak_copies']:.2f}" if self.data_bytes else "-"
+            print(f"{stage['stage']:32s} {stage['peak_bytes'] / 1024:12.1f} {above / 1024:15.1f} {copies:>8s} {retained / 1024:12.1f}")
+
+        rss = peak_rss_bytes()
+        if rss is not None:
+            print(f"Process resident memory high-water mark: {rss / 1024 ** 2:.1f} MB")
+        return {'data_bytes': self.data_bytes, 'stages': self.stages, 'peak_rss_bytes': rss}
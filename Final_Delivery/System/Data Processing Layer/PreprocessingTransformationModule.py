@@ -1,13 +1,28 @@
 import pandas as pd
 
+from CategoricalEncoderModule import CHOCOLATE_ENCODER, UNKNOWN_CODE
+
+
+def copy_on_write_enabled():
+    """Whether pandas copy-on-write is on (always from pandas 3, an option before)"""
+    return int(pd.__version__.split('.')[0]) >= 3 or pd.get_option('mode.copy_on_write') is True
+
 
 class PreprocessingTransformationModule:
     
     
-    def __init__(self, dataframe):
+    def __init__(self, dataframe, encoder=None):
         
-        self.df = dataframe.copy() if dataframe is not None else None
-        self.original_df = dataframe.copy() if dataframe is not None else None
+        # Transformations replace whole columns instead of writing into them, so
+        # the caller's frame is never modified. Under copy-on-write (main.py
+        # turns it on) shallow copies are enough and no data is copied up front;
+        # without it, writes into either frame would reach the other, so the
+        # data is copied. The reset_data() snapshot is taken the same way, so
+        # the caller changing its frame afterwards does not change it either
+        self.df = self._working_copy(dataframe)
+        self.original_df = self._working_copy(dataframe)
+        # Fitted CategoricalEncoderModule; the schema's categories by default
+        self.encoder = encoder or CHOCOLATE_ENCODER
     
     def analyze_missing_values(self):
 
@@ -66,32 +81,20 @@ class PreprocessingTransformationModule:
             return None
 
 
-        mappings = {
-            'Tone_of_Ad': {'funny': 2, 'emotional': 1, 'serious': 0},
-            'Weather': {'sunny': 2, 'cloudy': 1, 'rainy': 0},
-            'Coffee_Consumption': {'high': 2, 'medium': 1, 'low': 0}
-        }
-
         print("\n=== CATEGORICAL TO NUMERICAL TRANSFORMATION ===")
         
         transformations_applied = []
         
-        for column, mapping in mappings.items():
-            if column in self.df.columns:
-                if self.df[column].dtype == 'object':
-                    # Verificar que todos los valores tienen un mapping
-                    missing_mappings = set(self.df[column].unique()) - set(mapping.keys())
-                    if missing_mappings:
-                        print(f"Warning: Values without mapping in {column}: {missing_mappings}")
-                        # Use -1 for unmapped values
-                        mapping_with_default = mapping.copy()
-                        for val in missing_mappings:
-                            mapping_with_default[val] = -1
-                        self.df[column] = self.df[column].map(mapping_with_default)
-                    else:
-                        self.df[column] = self.df[column].map(mapping)
-
-                    transformations_applied.append(f"{column}: {mapping}")
+        for column in self.encoder.columns:
+            if column in self.df.columns and not pd.api.types.is_numeric_dtype(self.df[column]):
+                values = self.df[column]
+                codes = self.encoder.encode(column, values)
+                unknown = (codes == UNKNOWN_CODE) & values.notna()
+                if unknown.any():
+                    print(f"Warning: Values without mapping in {column}: {set(values[unknown].unique())}")
+                    print(f"  They are encoded as {UNKNOWN_CODE}")
+                self.df[column] = codes
+                transformations_applied.append(f"{column}: {self.encoder.mappings[column]}")
         
         print("Applied transformations:")
         for transformation in transformations_applied:
@@ -104,6 +107,29 @@ class PreprocessingTransformationModule:
     
 
 
+    @staticmethod
+    def transform_chunks(chunks, encoder=None):
+        """
+        Apply the categorical transformation to each chunk of a stream (e.g.
+        DataIngestionModule.iter_chunks()) without loading the whole file
+
+        Unmapped values become UNKNOWN_CODE, as in transform_categorical_to_numerical().
+        """
+        encoder = encoder or CHOCOLATE_ENCODER
+        for chunk in chunks:
+            yield encoder.transform(chunk)
+    
+
+
+    @staticmethod
+    def _working_copy(dataframe):
+
+        if dataframe is None:
+            return None
+        return dataframe.copy(deep=not copy_on_write_enabled())
+    
+
+
     def get_processed_dataframe(self):
        
         return self.df
@@ -111,7 +137,7 @@ class PreprocessingTransformationModule:
     
     def reset_data(self):
 
-        self.df = self.original_df.copy()
+        self.df = self._working_copy(self.original_df)
         print("DataFrame restored to its original state")
         return self.df
 
@@ -0,0 +1,242 @@
+import hashlib
+import io
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+from ColumnarCacheModule import file_content_hash
+from CompressedInputModule import detect_codec
+
+
+# Bytes before the watermark hashed to notice a rewritten (not appended) file
+TAIL_BYTES = 4096
+
+SCAN_BLOCK = 64 * 1024
+
+
+def _hash_range(path, start, end):
+
+    with open(path, 'rb') as f:
+        f.seek(start)
+        return hashlib.sha256(f.read(end - start)).hexdigest()
+
+
+
+def complete_lines_end(path, size):
+    """Byte offset just after the last newline of the first size bytes (0 if none)"""
+    with open(path, 'rb') as f:
+        end = size
+        while end > 0:
+            start = max(0, end - SCAN_BLOCK)
+            f.seek(start)
+            position = f.read(end - start).rfind(b"\n")
+            if position >= 0:
+                return start + position + 1
+            end = start
+    return 0
+
+
+
+def _continues_line(path, offset):
+    """Whether the bytes from offset on continue a line that ends just before it"""
+    with open(path, 'rb') as f:
+        f.seek(max(0, offset - 1))
+        around = f.read(2 if offset else 1)
+    return offset > 0 and around[:1] not in (b"\n", b"") and around[1:2] not in (b"\n", b"\r", b"")
+
+
+
+def header_end(path):
+    """Byte offset just after the header line"""
+    with open(path, 'rb') as f:
+        return len(f.readline())
+
+
+
+class FileRange(io.RawIOBase):
+    """Read-only view of bytes [start, end) of a file"""
+
+    def __init__(self, path, start, end):
+
+        self._file = open(path, 'rb')
+        self._file.seek(start)
+        self._left = end - start
+
+
+
+    def readable(self):
+
+        return True
+
+
+
+    def readinto(self, buffer):
+
+        n = self._file.readinto(memoryview(buffer)[:min(len(buffer), self._left)])
+        self._left -= n
+        return n
+
+
+
+    def close(self):
+
+        if not self.closed:
+            self._file.close()
+        super().close()
+
+
+
+@contextmanager
+def open_range(path, start, end):
+
+    stream = io.BufferedReader(FileRange(path, start, end))
+    try:
+        yield stream
+    finally:
+        stream.close()
+
+
+
+class WatermarkModule:
+    """
+    How far each input file has been ingested, kept in a JSON file
+
+    Each file's watermark holds the number of rows read and the Id of the
+    last one. For a plain CSV file it also holds the byte offset where
+    reading stopped and hashes of the header and of the bytes just before
+    the offset; as long as those still match, the file has only been
+    appended to and reading resumes at the offset. A compressed file cannot
+    be resumed at a byte offset, so it is tracked by its content hash; when
+    that changes, the file is parsed again and its rows after the
+    watermark's row count are new, provided the row at the watermark still
+    has the last Id read.
+
+    The sizes of output files written from the ingested rows can be saved
+    with the watermarks (mark_output()), so that rows appended to them by a
+    run that failed before save() can be dropped (restore_output()).
+    """
+
+    def __init__(self, state_path):
+
+        self.state_path = Path(state_path)
+        self.marks = {}
+        self.outputs = {}
+        if self.state_path.exists():
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            self.marks = state.get('files', {})
+            self.outputs = state.get('outputs', {})
+
+
+
+    def plan(self, path):
+        """
+        What to read from path to catch up with its watermark
+
+        Returns:
+            {"mode": "unchanged" | "append" | "reread" | "full", "start", "end",
+             "rows", "last_id", "reason"}: "append" gives the byte range
+             start/end of the new rows, "reread" means a changed compressed
+             file (compare its row rows - 1 with last_id), and compressed
+             files also get "content_sha256". For plain files "end" is set
+             in every mode: the file must be read up to it and no further,
+             and it is the offset to pass to mark()
+        """
+        key = str(Path(path).resolve())
+        mark = self.marks.get(key)
+        size = os.path.getsize(path)
+
+        if detect_codec(path) is not None:
+            digest = file_content_hash(path)
+            if mark is not None and mark.get('content_sha256') == digest:
+                return {'mode': 'unchanged', 'rows': mark['rows'], 'last_id': mark['last_id'], 'reason': "same content"}
+            if mark is None:
+                return {'mode': 'full', 'rows': 0, 'last_id': None, 'content_sha256': digest, 'reason': "new file"}
+            return {'mode': 'reread', 'rows': mark['rows'], 'last_id': mark['last_id'], 'content_sha256': digest,
+                    'reason': "compressed file changed"}
+
+        # A file read whole includes its last line, with or without a newline
+        if mark is None or 'offset' not in mark:
+            return {'mode': 'full', 'end': size, 'rows': 0, 'last_id': None, 'reason': "new file"}
+
+        offset = mark['offset']
+        if size < offset:
+            return {'mode': 'full', 'end': size, 'rows': 0, 'last_id': None, 'reason': "file shrank"}
+        if _hash_range(path, 0, header_end(path)) != mark['header_sha256']:
+            return {'mode': 'full', 'end': size, 'rows': 0, 'last_id': None, 'reason': "header changed"}
+        if _hash_range(path, max(0, offset - TAIL_BYTES), offset) != mark['tail_sha256']:
+            return {'mode': 'full', 'end': size, 'rows': 0, 'last_id': None, 'reason': "file rewritten"}
+        if size > offset and _continues_line(path, offset):
+            # The row read last had no newline and has been written further since
+            return {'mode': 'full', 'end': size, 'rows': 0, 'last_id': None, 'reason': "last row continued"}
+
+        # A last line without its newline may still be being written
+        end = complete_lines_end(path, size)
+        if end <= offset:
+            return {'mode': 'unchanged', 'rows': mark['rows'], 'last_id': mark['last_id'], 'reason': "no new rows"}
+        return {'mode': 'append', 'start': offset, 'end': end, 'rows': mark['rows'], 'last_id': mark['last_id'],
+                'reason': f"{end - offset} new bytes"}
+
+
+
+    def mark(self, path, rows, last_id, end=None, content_sha256=None):
+        """
+        Record that path has been read up to byte end (plain files; default:
+        its current size) or entirely (compressed files, whose hash should be
+        the one from plan() so that a file changed meanwhile is read again)
+        """
+        key = str(Path(path).resolve())
+        mark = {'rows': int(rows), 'last_id': None if last_id is None else int(last_id)}
+        if detect_codec(path) is not None:
+            mark['content_sha256'] = content_sha256 or file_content_hash(path)
+        else:
+            if end is None:
+                end = os.path.getsize(path)
+            mark['offset'] = end
+            mark['header_sha256'] = _hash_range(path, 0, header_end(path))
+            mark['tail_sha256'] = _hash_range(path, max(0, end - TAIL_BYTES), end)
+        self.marks[key] = mark
+
+
+
+    def rows(self):
+        """Rows read from all files, as marked"""
+        return sum(mark['rows'] for mark in self.marks.values())
+
+
+
+    def mark_output(self, path):
+        """Record the current size of an output file written from the marked rows"""
+        self.outputs[str(Path(path).resolve())] = os.path.getsize(path)
+
+
+
+    def restore_output(self, path):
+        """
+        Truncate an output file to the size saved with the watermarks, dropping
+        rows appended to it by a run that failed before save()
+
+        Returns:
+            False when the file is missing, has no saved size or is shorter
+            than it (so it cannot be appended to), True otherwise
+        """
+        saved = self.outputs.get(str(Path(path).resolve()))
+        if saved is None or not os.path.exists(path) or os.path.getsize(path) < saved:
+            return False
+        if os.path.getsize(path) > saved:
+            with open(path, 'r+b') as f:
+                f.truncate(saved)
+        return True
+
+
+
+    def save(self):
+        """Write the state file atomically, flushed to disk before it replaces the old one"""
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        temp = self.state_path.with_name(self.state_path.name + ".tmp")
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump({'files': self.marks, 'outputs': self.outputs}, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, self.state_path)
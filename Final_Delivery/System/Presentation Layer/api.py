@@ -1,19 +1,47 @@
 """
 
 
-This API calls R scripts for predictions using the R-trained model.
+This API serves predictions from the R-trained model.
+When the training layer has exported a portable model, it is scored natively
+in Python; otherwise a pool of warm R workers loads the model once and serves it.
 """
 
-from fastapi import FastAPI, File, UploadFile, HTTPException
-from fastapi.responses import FileResponse, HTMLResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, File, UploadFile, HTTPException, Query, Header, Request
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool, iterate_in_threadpool
 import pandas as pd
+import inspect
+import io
 import json
+import os
+import shutil
+import sys
 import platform
 from pathlib import Path
+import anyio
 import tempfile
-import subprocess
+import threading
+import time
+import uuid
+from datetime import datetime
+
+sys.path.append(str(Path(__file__).parent))
+
+from r_worker_pool import RWorkerPool
+from native_model import NativeModel, MANIFEST_NAME
+from model_registry import ModelRegistry
+from prediction_cache import PredictionCache, cache_key
+from request_limiter import PredictionLimiter, QueueFullError
+from micro_batcher import MicroBatcher
+from schemas import PredictionRequest, MAX_JSON_RECORDS, records_to_frame
+from metrics import MetricsRegistry, MetricsMiddleware
+from static_files import CachedStaticFiles, CachedPage
+from health import DeepHealthCheck
+from data_views import CsvDataset, GROUP_COLUMNS, DEFAULT_QUANTILES, summarize
+from response_formats import (
+    MEDIA_TYPES, FILE_EXTENSIONS, UnsupportedFormatError, negotiate_format, encode_predictions, dumps
+)
 
 app = FastAPI(
     title="Chocolate Sales Prediction API",
@@ -21,6 +49,29 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Metrics exposed at /metrics
+metrics = MetricsRegistry()
+REQUESTS_TOTAL = metrics.counter("http_requests_total", "HTTP requests by endpoint, method and status", ("endpoint", "method", "status"))
+REQUEST_DURATION = metrics.histogram("http_request_duration_seconds", "HTTP request latency by endpoint", ("endpoint",))
+REQUESTS_IN_FLIGHT = metrics.gauge("http_requests_in_flight", "HTTP requests currently being served")
+STAGE_DURATION = metrics.histogram(
+    "prediction_stage_duration_seconds",
+    "Time spent per prediction stage (upload_read, parse, score, serialize, response)",
+    ("stage",)
+)
+ROWS_SCORED = metrics.counter("prediction_rows_scored_total", "Rows scored by the model")
+SCORING_SECONDS = metrics.counter("prediction_scoring_seconds_total", "Time spent inside the model scoring rows")
+MODEL_LOAD_SECONDS = metrics.gauge("model_load_seconds", "Time taken to load the most recent model", ("backend",))
+
+app.add_middleware(
+    MetricsMiddleware,
+    requests_total=REQUESTS_TOTAL,
+    request_duration=REQUEST_DURATION,
+    stage_duration=STAGE_DURATION,
+    in_flight=REQUESTS_IN_FLIGHT,
+    mounts=("/static", "/assets")
+)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -33,123 +84,777 @@ app.add_middleware(
 # Paths
 BASE_DIR = Path(__file__).parent.parent
 PRESENTATION_DIR = Path(__file__).parent
-PREDICTIONS_OUTPUT_PATH = BASE_DIR / "OUT" / "predictions.csv"
+PREDICTIONS_OUTPUT_DIR = BASE_DIR / "OUT" / "predictions"
 R_MODEL_PATH = BASE_DIR / "OUT" / "models" / "best_model_R.rds"
+PREPROCESSING_PATH = BASE_DIR / "OUT" / "models" / "preprocessing.json"
+NATIVE_MODEL_DIR = BASE_DIR / "OUT" / "models" / "portable"
+R_WORKER_SCRIPT = PRESENTATION_DIR / "predict_worker.R"
+WARMUP_DATA_PATH = BASE_DIR / "IN" / "data_test.csv"
 
 # Set R executable based on OS
 R_EXECUTABLE = r"C:\Program Files\R\R-4.5.2\bin\Rscript.exe" if platform.system() == "Windows" else "Rscript"
 
-# Mount static files
-app.mount("/static", StaticFiles(directory=str(BASE_DIR / "OUT")), name="static")
+# Prediction backend: "native" (Python), "r" (R worker pool) or "auto" (native if exported)
+PREDICTION_BACKEND = os.environ.get("PREDICTION_BACKEND", "auto").lower()
+
+# Number of warm R workers kept alive for predictions
+PREDICTION_WORKERS = int(os.environ.get("PREDICTION_WORKERS", "2"))
+# Seconds an R worker may take to load the model, and to answer one request, before it is killed
+R_WORKER_START_TIMEOUT = float(os.environ.get("R_WORKER_START_TIMEOUT", "120"))
+R_WORKER_REQUEST_TIMEOUT = float(os.environ.get("R_WORKER_REQUEST_TIMEOUT", "60"))
+
+# Predictions running at once, and how many more may wait before we answer 503
+MAX_CONCURRENT_PREDICTIONS = int(os.environ.get("MAX_CONCURRENT_PREDICTIONS", str(PREDICTION_WORKERS)))
+MAX_QUEUED_PREDICTIONS = int(os.environ.get("MAX_QUEUED_PREDICTIONS", "16"))
+
+# Prediction cache bounds (entries, total cached rows, seconds before expiry)
+PREDICTION_CACHE_ENTRIES = int(os.environ.get("PREDICTION_CACHE_ENTRIES", "128"))
+PREDICTION_CACHE_ROWS = int(os.environ.get("PREDICTION_CACHE_ROWS", "1000000"))
+PREDICTION_CACHE_TTL = float(os.environ.get("PREDICTION_CACHE_TTL", "3600"))
+
+# Small uploads arriving within this window are scored together (0 disables micro-batching)
+MICRO_BATCH_WINDOW_MS = float(os.environ.get("MICRO_BATCH_WINDOW_MS", "5"))
+MICRO_BATCH_MAX_ROWS = int(os.environ.get("MICRO_BATCH_MAX_ROWS", "256"))
+
+# Rows parsed and scored per chunk by /predict/stream
+STREAM_CHUNK_ROWS = int(os.environ.get("STREAM_CHUNK_ROWS", "10000"))
+
+# Largest page returned by the data and prediction paging endpoints
+MAX_PAGE_ROWS = int(os.environ.get("MAX_PAGE_ROWS", "1000"))
+
+# Seconds between checks of OUT/models/ for a retrained model (0 disables the watcher)
+MODEL_WATCH_INTERVAL = float(os.environ.get("MODEL_WATCH_INTERVAL", "10"))
+# Rows of IN/data_test.csv a new model must score before it is swapped in
+MODEL_CANARY_ROWS = int(os.environ.get("MODEL_CANARY_ROWS", "20"))
+# Seconds a /health/deep result is reused before the canary runs again
+HEALTH_DEEP_INTERVAL = float(os.environ.get("HEALTH_DEEP_INTERVAL", "10"))
+
+# When set, admin endpoints require this value in the X-Admin-Token header
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+model_registry = None
+prediction_limiter = None
+micro_batcher = None
+deep_health = None
+prediction_cache = PredictionCache(PREDICTION_CACHE_ENTRIES, PREDICTION_CACHE_ROWS, PREDICTION_CACHE_TTL)
+
+# Pipeline outputs served through /data (processed data shows level names instead of
+# its category codes; test predictions carry Weather/Tone_of_Ad of their inputs)
+DATASETS = {
+    "processed": CsvDataset(
+        BASE_DIR / "OUT" / "processed_data.csv",
+        levels_path=BASE_DIR / "OUT" / "categorical_encoder.json"
+    ),
+    "test_predictions": CsvDataset(BASE_DIR / "OUT" / "test_predictions.csv", join_path=WARMUP_DATA_PATH)
+}
+
+# Mount static files (content-hash ETags, precompressed variants)
+app.mount("/static", CachedStaticFiles(directory=str(BASE_DIR / "OUT")), name="static")
 # Serve presentation assets (images, CSS, JS)
-app.mount("/assets", StaticFiles(directory=str(PRESENTATION_DIR)), name="assets")
+app.mount("/assets", CachedStaticFiles(directory=str(PRESENTATION_DIR)), name="assets")
+
+# index.html is kept in memory, with versioned links to the files it shows
+index_page = CachedPage(PRESENTATION_DIR / "index.html", {"/static": BASE_DIR / "OUT", "/assets": PRESENTATION_DIR})
 
 @app.on_event("startup")
 async def startup_event():
     """Startup event - verify R model exists"""
+    global prediction_limiter, micro_batcher, model_registry, deep_health
+    model_registry = ModelRegistry(
+        loader=load_timed_model,
+        identity_func=model_files_identity,
+        canary_path=WARMUP_DATA_PATH,
+        canary_rows=MODEL_CANARY_ROWS
+    )
+    prediction_limiter = PredictionLimiter(MAX_CONCURRENT_PREDICTIONS, MAX_QUEUED_PREDICTIONS)
+    deep_health = DeepHealthCheck(canary_check, HEALTH_DEEP_INTERVAL)
+    micro_batcher = MicroBatcher(
+        score_frame=score_frame_identified,
+        window_seconds=MICRO_BATCH_WINDOW_MS / 1000,
+        max_rows=MICRO_BATCH_MAX_ROWS,
+        limiter=prediction_limiter
+    )
+
     print("="*70)
     print("CHOCOLATE SALES PREDICTION API")
     print("="*70)
-    print("✓ API started - Using R for predictions")
+    print(f"✓ API started - Prediction backend: {PREDICTION_BACKEND}")
     print(f"✓ R model path: {R_MODEL_PATH}")
     
-    if R_MODEL_PATH.exists():
-        print("✓ R model found and ready")
+    if NativeModel.is_available(NATIVE_MODEL_DIR) or R_MODEL_PATH.exists():
+        print("✓ Trained model found")
+        try:
+            model = get_prediction_model()
+            print(f"✓ Serving predictions with the {model.backend} backend")
+        except Exception as e:
+            print(f"⚠ Could not load prediction model: {e}")
     else:
-        print("⚠ R model not found - run 'python run_pipeline.py' first")
+        print("⚠ No trained model found - run 'python run_pipeline.py' first")
+        print("  The model is loaded when its files appear, or on first use")
+    model_registry.start_watching(MODEL_WATCH_INTERVAL)
     print("="*70)
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Shutdown event - release the prediction model"""
+    model_registry.close()
+
+
+def load_prediction_model():
+    """Load the native model or start the R worker pool, depending on PREDICTION_BACKEND"""
+    if PREDICTION_BACKEND in ("auto", "native") and NativeModel.is_available(NATIVE_MODEL_DIR):
+        return NativeModel(NATIVE_MODEL_DIR)
+    if PREDICTION_BACKEND == "native":
+        raise Exception("Portable model not found - run 'python run_pipeline.py' first")
+
+    if not R_MODEL_PATH.exists():
+        raise Exception("R model not found - run 'python run_pipeline.py' first")
+    pool = RWorkerPool(
+        size=PREDICTION_WORKERS,
+        r_executable=R_EXECUTABLE,
+        script_path=R_WORKER_SCRIPT,
+        model_path=R_MODEL_PATH,
+        cwd=BASE_DIR,
+        warmup_path=WARMUP_DATA_PATH,
+        start_timeout=R_WORKER_START_TIMEOUT,
+        request_timeout=R_WORKER_REQUEST_TIMEOUT
+    )
+    pool.start()
+    return pool
+
+
+def load_timed_model():
+    """Load a prediction model and record how long it took"""
+    start = time.perf_counter()
+    model = load_prediction_model()
+    MODEL_LOAD_SECONDS.set(time.perf_counter() - start, backend=model.backend)
+    return model
+
+
+def model_files_identity():
+    """Identity of the model files on disk (name, size, mtime); a change means a retrained model"""
+    parts = []
+    for path in (R_MODEL_PATH, PREPROCESSING_PATH, NATIVE_MODEL_DIR / MANIFEST_NAME):
+        if path.exists():
+            stat = path.stat()
+            parts.append(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns}")
+    return "|".join(parts)
+
+
+def get_prediction_model():
+    """Return the active prediction model, loading it on first use"""
+    return model_registry.get()
+
+
+def canary_check():
+    """
+    Score the canary batch with the loaded model (blocking); used by /health/deep
+
+    With no model loaded yet, one is loaded through the registry first (and
+    canary-checked like any reload), so a model trained after startup is
+    picked up even when no prediction request arrives.
+    """
+    if model_registry.active is None:
+        try:
+            model_registry.get()
+        except Exception as e:
+            raise RuntimeError(f"Model not loaded yet: {e}")
+    with model_registry.lease() as model:
+        return model_registry.check(model)
+
+
+def record_scoring(rows, seconds):
+    """Account rows scored and time spent in the model"""
+    STAGE_DURATION.observe(seconds, stage="score")
+    ROWS_SCORED.inc(rows)
+    SCORING_SECONDS.inc(seconds)
+
+
+def score_with(model, frame):
+    """Score a parsed DataFrame with the given model (blocking)"""
+    start = time.perf_counter()
+    predictions_data = model.predict_frame(frame)
+    record_scoring(len(predictions_data), time.perf_counter() - start)
+    return predictions_data
+
+
+def score_frame_identified(frame):
+    """Score a parsed DataFrame; returns the predictions and the identity of the model used (blocking)"""
+    with model_registry.lease_version() as version:
+        return score_with(version.model, frame), version_identity(version)
+
+
+def parse_csv(contents):
+    """Parse uploaded CSV bytes into a DataFrame (blocking)"""
+    with STAGE_DURATION.time(stage="parse"):
+        return pd.read_csv(io.BytesIO(contents))
+
+
+def score_upload(contents):
+    """Score uploaded CSV bytes; returns the predictions and the identity of the model used (blocking)"""
+    with model_registry.lease_version() as version:
+        model = version.model
+        if model.backend == "native":
+            return score_with(model, parse_csv(contents)), version_identity(version)
+
+        # R workers read the file themselves, so parsing is part of scoring here
+        with tempfile.NamedTemporaryFile(mode='wb', delete=False, suffix='.csv') as temp_file:
+            temp_file.write(contents)
+            temp_path = temp_file.name
+
+        try:
+            start = time.perf_counter()
+            predictions_data = model.predict_file(temp_path)
+            record_scoring(len(predictions_data), time.perf_counter() - start)
+            return predictions_data, version_identity(version)
+        finally:
+            # Clean up
+            Path(temp_path).unlink()
+
+
+def serialize_json(payload):
+    """Encode a response payload as JSON (blocking)"""
+    with STAGE_DURATION.time(stage="serialize"):
+        return dumps(payload)
+
+
+def response_format(request, requested):
+    """
+    Negotiate the prediction response format from ?format= or the Accept header
+
+    Raises:
+        HTTPException 406 when the format cannot be produced
+    """
+    try:
+        return negotiate_format(request.headers.get("accept"), requested)
+    except UnsupportedFormatError as e:
+        raise HTTPException(status_code=406, detail=str(e))
+
+
+def prediction_response(predictions_data, output_format, envelope):
+    """
+    Build the response for Predictions (blocking)
+
+    JSON keeps the envelope with one object per row; columnar formats are
+    encoded from the Id and Expected arrays and move the envelope fields to headers.
+    """
+    if output_format == "json":
+        payload = {**envelope, "predictions": predictions_data.to_records()}
+        return Response(content=serialize_json(payload), media_type=MEDIA_TYPES["json"])
+
+    with STAGE_DURATION.time(stage="serialize"):
+        body = encode_predictions(predictions_data, output_format)
+
+    headers = {
+        "X-Prediction-Count": str(len(predictions_data)),
+        "X-Prediction-Backend": envelope["backend"]
+    }
+    if "cached" in envelope:
+        headers["X-Cache"] = "hit" if envelope["cached"] else "miss"
+    if output_format in FILE_EXTENSIONS:
+        headers["Content-Disposition"] = f'attachment; filename="predictions.{FILE_EXTENSIONS[output_format]}"'
+    return Response(content=body, media_type=MEDIA_TYPES[output_format], headers=headers)
+
+
+def version_identity(version):
+    """Identity of a model version (backend and the files it was loaded from), used in cache keys"""
+    return f"{version.model.backend}|{version.identity}"
+
+
+def identity_backend(identity):
+    """Backend named in a version_identity() string"""
+    return identity.split("|", 1)[0]
+
+
+def model_identity():
+    """Identity of the active model, loading it on first use (blocking)"""
+    with model_registry.lease_version() as version:
+        return version_identity(version)
+
+
+async def predict_contents(contents):
+    """
+    Score uploaded CSV bytes, serving repeated uploads from the prediction cache
+
+    Returns:
+        Tuple of (predictions list, whether it came from the cache, cache key,
+        identity of the model that scored them)
+    """
+    identity = await run_in_threadpool(model_identity)
+    key = await run_in_threadpool(cache_key, contents, identity)
+    predictions_data = prediction_cache.get(key)
+    if predictions_data is not None:
+        return predictions_data, True, key, identity
+
+    # Small uploads (a rough line count is enough) are coalesced with concurrent ones
+    if micro_batcher.enabled and contents.count(b"\n") <= MICRO_BATCH_MAX_ROWS + 1:
+        frame = await run_in_threadpool(parse_csv, contents)
+        try:
+            predictions_data, scored_by = await micro_batcher.submit(frame)
+        except QueueFullError as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    else:
+        predictions_data, scored_by = await run_prediction(score_upload, contents)
+
+    # Do not cache under the old model's key if a reload happened meanwhile
+    if scored_by == identity:
+        prediction_cache.put(key, predictions_data)
+    return predictions_data, False, key, scored_by
+
+
+def prediction_summary(contents, predictions_data):
+    """Summarize predicted sales overall and by the Weather/Tone_of_Ad of the uploaded rows (blocking)"""
+    frame = pd.DataFrame({"Expected": predictions_data.expected})
+    groups = pd.read_csv(io.BytesIO(contents), usecols=lambda column: column in GROUP_COLUMNS)
+    if len(groups) == len(frame):
+        frame = pd.concat([frame, groups], axis=1)
+    return summarize(frame, ["Expected"])
+
+
+def split_list(value):
+    """Parse a comma-separated query parameter into a list (None when empty)"""
+    return [item.strip() for item in value.split(",") if item.strip()] if value else None
+
+
+def get_dataset(name):
+    """
+    Raises:
+        HTTPException 404 for unknown datasets
+    """
+    if name not in DATASETS:
+        raise HTTPException(status_code=404, detail=f"Unknown dataset '{name}'; choose one of {', '.join(DATASETS)}")
+    return DATASETS[name]
+
+
+async def dataset_response(func, *args):
+    """Run a dataset query off the event loop and encode the result as JSON"""
+    try:
+        result = await run_in_threadpool(func, *args)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except KeyError as e:
+        raise HTTPException(status_code=400, detail=str(e.args[0]))
+    return Response(content=dumps(result), media_type="application/json")
+
+
+def spool_upload(upload):
+    """Copy an upload to a temporary CSV file in fixed-size blocks (blocking)"""
+    with tempfile.NamedTemporaryFile(mode='wb', delete=False, suffix='.csv') as temp_file:
+        shutil.copyfileobj(upload, temp_file, length=1024 * 1024)
+        return temp_file.name
+
+
+def stream_predictions(csv_path, chunk_size, output_format, cancelled):
+    """
+    Parse a CSV file in row chunks and yield scored chunks as CSV or NDJSON text
+
+    The whole stream is scored by the model that was active when it started.
+    It stops before the next chunk once cancelled (a threading.Event) is set;
+    the CSV file is removed and the model lease released here, on the worker
+    thread running the generator, however it ends.
+    """
+    try:
+        with model_registry.lease() as model:
+            with pd.read_csv(csv_path, chunksize=chunk_size) as reader:
+                yield from _scored_chunks(model, reader, output_format, cancelled)
+    finally:
+        Path(csv_path).unlink(missing_ok=True)
+
+
+def _scored_chunks(model, reader, output_format, cancelled):
+
+    i = 0
+    while not cancelled.is_set():
+        with STAGE_DURATION.time(stage="parse"):
+            chunk = next(reader, None)
+        if chunk is None or cancelled.is_set():
+            break
+        predictions_data = score_with(model, chunk)
+        with STAGE_DURATION.time(stage="serialize"):
+            if output_format == "csv":
+                part = predictions_data.to_frame().to_csv(index=False, header=(i == 0))
+            else:
+                part = "".join(json.dumps(p) + "\n" for p in predictions_data.to_records())
+        i += 1
+        yield part
+
+
+class SerializedIterator:
+    """
+    Iterator over a generator whose next() and close() may be called from
+    different worker threads but never run at the same time
+    """
+
+    def __init__(self, generator):
+
+        self.generator = generator
+        self._lock = threading.Lock()
+
+    def __iter__(self):
+
+        return self
+
+    def __next__(self):
+
+        with self._lock:
+            return next(self.generator)
+
+    def close(self):
+        """Close the generator once no next() is running; returns whether it had started"""
+        with self._lock:
+            started = inspect.getgeneratorstate(self.generator) != inspect.GEN_CREATED
+            self.generator.close()
+            return started
+
+
+class ClosingStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that awaits on_close() once it is done, also when the
+    client disconnects before or while the body is sent
+    """
+
+    def __init__(self, content, on_close, **kwargs):
+
+        super().__init__(content, **kwargs)
+        self.on_close = on_close
+
+    async def __call__(self, scope, receive, send):
+
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            with anyio.CancelScope(shield=True):
+                await self.on_close()
+
+
+def save_predictions_copy(csv_text):
+    """Save a CSV response under a unique per-request name and return the file name"""
+    PREDICTIONS_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    filename = f"predictions_{datetime.now():%Y%m%d_%H%M%S}_{uuid.uuid4().hex[:8]}.csv"
+    (PREDICTIONS_OUTPUT_DIR / filename).write_text(csv_text, encoding='utf-8')
+    return filename
+
+
+async def run_prediction(func, *args):
+    """
+    Run blocking prediction work in a worker thread, within the concurrency limit
+
+    Raises:
+        HTTPException 503 when the prediction queue is full
+    """
+    try:
+        async with prediction_limiter:
+            return await run_in_threadpool(func, *args)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+
 @app.get("/", response_class=HTMLResponse)
-async def root():
+async def root(request: Request):
     """Serve the web interface"""
-    index_path = PRESENTATION_DIR / "index.html"
-    if index_path.exists():
-        with open(index_path, 'r', encoding='utf-8') as f:
-            return f.read()
+    if index_page.path.exists():
+        # Rendering hashes the linked assets when they change, so it runs off the event loop
+        return await run_in_threadpool(index_page.response, request.headers)
     return {"message": "Chocolate Sales Prediction API", "version": "1.0.0"}
 
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
-    return {
-        "status": "healthy" if R_MODEL_PATH.exists() else "unhealthy",
-        "r_model_exists": R_MODEL_PATH.exists(),
-        "r_model_path": str(R_MODEL_PATH)
+    """
+    Readiness from in-memory state only (no file system access or scoring)
+    
+    Returns:
+        503 until a model is loaded (status "loading")
+    """
+    active = model_registry.active
+    body = {
+        "status": "healthy" if active is not None else "loading",
+        "model_loaded": active is not None,
+        "backend": active.model.backend if active else None,
+        "model_version": active.version if active else None,
+        "model": active.model.stats() if active else None,
+        "r_model_path": str(R_MODEL_PATH),
+        "predictions_in_flight": prediction_limiter.in_flight,
+        "predictions_queued": prediction_limiter.queued,
+        "max_queued_predictions": prediction_limiter.max_queued
     }
+    return Response(content=dumps(body), media_type="application/json", status_code=200 if active else 503)
+
+
+@app.get("/health/deep")
+async def deep_health_check():
+    """
+    Score a canary batch through the loaded model
+    
+    The result is reused for HEALTH_DEEP_INTERVAL seconds, so polling this
+    endpoint does not add load to the scorer.
+    
+    Loads the model first when none is loaded yet.
+    
+    Returns:
+        503 when the canary prediction fails, or while no model could be
+        loaded yet (status "loading")
+    """
+    result = await deep_health.run()
+    active = model_registry.active
+    if result["healthy"]:
+        status = "healthy"
+    else:
+        status = "unhealthy" if active is not None else "loading"
+    body = {
+        "status": status,
+        "backend": active.model.backend if active else None,
+        "model_version": active.version if active else None,
+        **result
+    }
+    return Response(content=dumps(body), media_type="application/json", status_code=200 if result["healthy"] else 503)
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus-style metrics"""
+    scoring_seconds = SCORING_SECONDS.total()
+    cache = prediction_cache.stats()
+    extra = {
+        "prediction_rows_per_second": (
+            "Model throughput (rows scored per second of scoring time)",
+            ROWS_SCORED.total() / scoring_seconds if scoring_seconds else 0
+        ),
+        "prediction_in_flight": ("Predictions currently running", prediction_limiter.in_flight),
+        "prediction_queued": ("Predictions waiting for a slot", prediction_limiter.queued),
+        "prediction_rejected_total": ("Predictions rejected with 503 (queue full)", prediction_limiter.rejected),
+        "prediction_cache_hits_total": ("Prediction cache hits", cache["hits"]),
+        "prediction_cache_misses_total": ("Prediction cache misses", cache["misses"]),
+        "prediction_cache_entries": ("Prediction cache entries", cache["entries"]),
+        "micro_batches_total": ("Micro-batches scored", micro_batcher.batches),
+        "model_version": ("Version number of the active model", model_registry.status()["version"] or 0),
+        "model_reloads_total": ("Models swapped in by hot reload", model_registry.reloads),
+        "model_reload_failures_total": ("Reloads rejected (load or canary failure)", model_registry.failed_reloads),
+    }
+    return Response(content=metrics.render(extra), media_type="text/plain; version=0.0.4")
+
+
+def check_admin_token(token):
+    """Reject admin calls without the configured token (no-op when ADMIN_TOKEN is unset)"""
+    if ADMIN_TOKEN and token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@app.get("/admin/model")
+async def model_status(x_admin_token: str = Header(None)):
+    """Active model version, in-flight requests and reload history"""
+    check_admin_token(x_admin_token)
+    return model_registry.status()
+
+
+@app.post("/admin/reload-model")
+async def reload_model(x_admin_token: str = Header(None)):
+    """
+    Load the model currently in OUT/models/, validate it on a canary batch and
+    swap it in; the previous model finishes its in-flight requests first
+    """
+    check_admin_token(x_admin_token)
+    try:
+        version = await run_in_threadpool(model_registry.reload)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Reload failed, previous model still active: {str(e)}")
+    return {"status": "reloaded", "loaded_version": version.version, **model_registry.status()}
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Prediction cache hit/miss counters and size"""
+    return prediction_cache.stats()
+
+
+@app.get("/batching/stats")
+async def batching_stats():
+    """Micro-batching counters and batch-size histograms"""
+    return micro_batcher.stats()
+
+
+@app.get("/data/{name}")
+async def dataset_info(name: str):
+    """Row count, columns and file size of a pipeline output"""
+    return await dataset_response(get_dataset(name).info)
+
+
+@app.get("/data/{name}/rows")
+async def dataset_rows(
+    name: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=0, le=MAX_PAGE_ROWS),
+    columns: str = Query(None)
+):
+    """
+    One page of a pipeline output
+    
+    Args:
+        name: "processed" (OUT/processed_data.csv) or "test_predictions"
+        offset: first row to return
+        limit: number of rows to return
+        columns: comma-separated columns to return (default: all)
+    """
+    return await dataset_response(get_dataset(name).page, offset, limit, split_list(columns))
+
+
+@app.get("/data/{name}/summary")
+async def dataset_summary(
+    name: str,
+    columns: str = Query(None),
+    by: str = Query(",".join(GROUP_COLUMNS)),
+    quantiles: str = Query(",".join(str(q) for q in DEFAULT_QUANTILES))
+):
+    """
+    Count, mean, min, max and quantiles of numeric columns, overall and grouped
+    
+    Args:
+        name: "processed" (OUT/processed_data.csv) or "test_predictions"
+        columns: comma-separated numeric columns (default: all numeric columns)
+        by: comma-separated columns to group by, each summarized separately
+        quantiles: comma-separated quantile levels between 0 and 1
+    """
+    try:
+        levels = tuple(float(q) for q in split_list(quantiles) or ())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="quantiles must be numbers between 0 and 1")
+    if any(not 0 <= q <= 1 for q in levels):
+        raise HTTPException(status_code=400, detail="quantiles must be numbers between 0 and 1")
+    return await dataset_response(get_dataset(name).summary, split_list(columns), tuple(split_list(by) or ()), levels)
+
+
+@app.get("/predictions/{result_id}")
+async def prediction_page(
+    result_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=0, le=MAX_PAGE_ROWS)
+):
+    """
+    A page of an earlier /predict result, served from the prediction cache
+    
+    Results are not stored anywhere else, so this only works while the cache
+    holds them; reading pages does not count as cache hits or misses.
+    
+    Raises:
+        404 when the result has expired or been evicted, or when the cache is
+        disabled (PREDICTION_CACHE_ENTRIES=0); upload the file again
+    """
+    predictions_data = prediction_cache.peek(result_id)
+    if predictions_data is None:
+        raise HTTPException(status_code=404, detail="Prediction result not found or expired; upload the file again")
+    return Response(content=dumps({
+        "total": len(predictions_data),
+        "offset": offset,
+        "limit": limit,
+        "rows": predictions_data[offset:offset + limit].to_records()
+    }), media_type="application/json")
 
 
 @app.post("/predict")
-async def predict(file: UploadFile = File(...)):
+async def predict(
+    request: Request,
+    file: UploadFile = File(...),
+    format: str = Query(None, pattern="^(json|columnar|arrow|parquet)$"),
+    limit: int = Query(None, ge=0)
+):
     """
-    Generate predictions using R model
+    Generate predictions using the trained model
     
     Args:
         file: CSV file with test data
+        format: response format; defaults to the Accept header, then JSON
+        limit: return only the first rows, plus a summary and a result_id for
+            fetching further pages from /predictions/{result_id}
         
     Returns:
-        JSON with predictions
+        JSON with predictions, or columnar JSON, Arrow IPC or Parquet
     """
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="File must be a CSV file")
+    output_format = response_format(request, format)
     
     try:
         # Read uploaded CSV
-        contents = await file.read()
-        
-        # Create temporary file
-        with tempfile.NamedTemporaryFile(mode='wb', delete=False, suffix='.csv') as temp_file:
-            temp_file.write(contents)
-            temp_path = temp_file.name
-        
-        # Call R script for predictions
-        r_script = PRESENTATION_DIR / "predict.R"
-        r_executable = R_EXECUTABLE
+        with STAGE_DURATION.time(stage="upload_read"):
+            contents = await file.read()
         
-        result = subprocess.run(
-            [r_executable, str(r_script), temp_path],
-            capture_output=True,
-            text=True,
-            cwd=str(BASE_DIR)
-        )
+        # Score off the event loop (or reuse a cached result)
+        predictions_data, cached, key, scored_by = await predict_contents(contents)
         
-        # Log R script output for debugging
-        print(f"R script return code: {result.returncode}")
-        print(f"R script stdout: {result.stdout[:500]}")
-        print(f"R script stderr: {result.stderr[:500]}")
+        envelope = {
+            "status": "success",
+            "predictions": predictions_data,
+            "count": len(predictions_data),
+            "model": "R Stacking Ensemble",
+            "backend": identity_backend(scored_by),
+            "cached": cached
+        }
+        if limit is not None:
+            envelope["predictions"] = predictions_data[:limit]
+            envelope["result_id"] = key
+            envelope["summary"] = await run_in_threadpool(prediction_summary, contents, predictions_data)
         
-        if result.returncode != 0:
-            raise Exception(f"R script failed with code {result.returncode}. STDERR: {result.stderr}")
+        return await run_in_threadpool(prediction_response, envelope["predictions"], output_format, envelope)
         
-        # Parse JSON output from R
-        try:
-            predictions_data = json.loads(result.stdout)
-        except json.JSONDecodeError as je:
-            raise Exception(f"Failed to parse R output as JSON. Output was: {result.stdout[:200]}")
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Prediction error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+
+
+@app.post("/predict/json")
+async def predict_json(
+    request: Request,
+    payload: PredictionRequest,
+    format: str = Query(None, pattern="^(json|columnar|arrow|parquet)$")
+):
+    """
+    Low-latency predictions for one record or a small list of records
+    
+    Args:
+        payload: a record (or list of records) with the same columns as data_test.csv
+        format: response format; defaults to the Accept header, then JSON
         
-        # Clean up
-        Path(temp_path).unlink()
+    Returns:
+        JSON with predictions, or columnar JSON, Arrow IPC or Parquet
+    """
+    output_format = response_format(request, format)
+    records = payload if isinstance(payload, list) else [payload]
+    if not records:
+        raise HTTPException(status_code=400, detail="No records to score")
+    if len(records) > MAX_JSON_RECORDS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {MAX_JSON_RECORDS} records per request; use /predict/stream for larger inputs"
+        )
+    
+    try:
+        predictions_data, scored_by = await run_prediction(score_frame_identified, records_to_frame(records))
         
-        return {
+        return prediction_response(predictions_data, output_format, {
             "status": "success",
             "predictions": predictions_data,
             "count": len(predictions_data),
-            "model": "R Stacking Ensemble"
-        }
+            "backend": identity_backend(scored_by)
+        })
         
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Prediction error: {str(e)}")
+        print(f"JSON Prediction error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
 
 
 @app.post("/predict/csv")
-async def predict_csv(file: UploadFile = File(...)):
+async def predict_csv(file: UploadFile = File(...), save: bool = Query(False)):
     """
-    Generate predictions using R and return as CSV
+    Generate predictions using the trained model and return as CSV
     
     Args:
         file: CSV file with test data
+        save: also keep a copy under OUT/predictions/ with a unique name
         
     Returns:
         CSV file with predictions
@@ -159,49 +864,88 @@ async def predict_csv(file: UploadFile = File(...)):
     
     try:
         # Read uploaded CSV
-        contents = await file.read()
-        
-        # Create temporary file
-        with tempfile.NamedTemporaryFile(mode='wb', delete=False, suffix='.csv') as temp_file:
-            temp_file.write(contents)
-            temp_path = temp_file.name
-        
-        # Call R script for predictions
-        r_script = PRESENTATION_DIR / "predict.R"
-        r_executable = R_EXECUTABLE
-        
-        result = subprocess.run(
-            [r_executable, str(r_script), temp_path],
-            capture_output=True,
-            text=True,
-            cwd=str(BASE_DIR)
-        )
-        
-        if result.returncode != 0:
-            raise Exception(f"R script failed with code {result.returncode}. STDERR: {result.stderr}")
+        with STAGE_DURATION.time(stage="upload_read"):
+            contents = await file.read()
         
-        # Parse JSON output from R
-        predictions_data = json.loads(result.stdout)
+        # Score off the event loop (or reuse a cached result)
+        predictions_data, _, _, _ = await predict_contents(contents)
         
-        # Convert to DataFrame and save
-        submission = pd.DataFrame(predictions_data)
-        submission.to_csv(PREDICTIONS_OUTPUT_PATH, index=False)
+        # Build the CSV in memory; nothing is shared between requests
+        submission = predictions_data.to_frame()
+        with STAGE_DURATION.time(stage="serialize"):
+            csv_text = await run_in_threadpool(submission.to_csv, index=False)
         
-        # Clean up
-        Path(temp_path).unlink()
+        headers = {"Content-Disposition": 'attachment; filename="predictions.csv"'}
+        if save:
+            saved_name = await run_in_threadpool(save_predictions_copy, csv_text)
+            headers["X-Saved-File"] = f"/static/predictions/{saved_name}"
         
         # Return CSV file
-        return FileResponse(
-            path=PREDICTIONS_OUTPUT_PATH,
-            media_type='text/csv',
-            filename='predictions.csv'
-        )
+        return Response(content=csv_text, media_type='text/csv', headers=headers)
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"CSV Prediction error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
 
 
+@app.post("/predict/stream")
+async def predict_stream(
+    file: UploadFile = File(...),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    chunk_size: int = Query(STREAM_CHUNK_ROWS, ge=1, le=1_000_000)
+):
+    """
+    Generate predictions for large files chunk by chunk
+    
+    Args:
+        file: CSV file with test data
+        format: "ndjson" (one {Id, Expected} object per line) or "csv"
+        chunk_size: rows parsed and scored per chunk
+        
+    Returns:
+        Streamed predictions; memory is bounded by the chunk size, not the file size
+    """
+    if not file.filename.endswith('.csv'):
+        raise HTTPException(status_code=400, detail="File must be a CSV file")
+    
+    try:
+        await prediction_limiter.acquire()
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    
+    try:
+        # Spool the upload to our own file so it outlives the request body
+        csv_path = await run_in_threadpool(spool_upload, file.file)
+    except Exception as e:
+        prediction_limiter.release()
+        print(f"Stream prediction error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+    
+    cancelled = threading.Event()
+    stream = SerializedIterator(stream_predictions(csv_path, chunk_size, format, cancelled))
+    
+    async def close():
+        # A chunk still being scored stops early; closing the generator on a worker thread
+        # then runs its own cleanup there. A stream that never started never opened the CSV
+        cancelled.set()
+        try:
+            if not await run_in_threadpool(stream.close):
+                Path(csv_path).unlink(missing_ok=True)
+        finally:
+            prediction_limiter.release()
+    
+    if format == "csv":
+        return ClosingStreamingResponse(
+            iterate_in_threadpool(stream),
+            close,
+            media_type='text/csv',
+            headers={"Content-Disposition": 'attachment; filename="predictions.csv"'}
+        )
+    return ClosingStreamingResponse(iterate_in_threadpool(stream), close, media_type='application/x-ndjson')
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
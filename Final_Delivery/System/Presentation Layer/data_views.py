@@ -0,0 +1,208 @@
+"""
+Paginated, projected and aggregated views of pipeline outputs.
+
+The web interface only needs a row count, a page of rows or a few summary
+statistics, so these helpers answer that server-side instead of shipping the
+whole CSV to the browser. Each dataset is parsed once per file version and its
+summaries are memoized until the file changes.
+"""
+
+import json
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+
+# Columns the summaries group by when they are present
+GROUP_COLUMNS = ("Weather", "Tone_of_Ad")
+
+DEFAULT_QUANTILES = (0.25, 0.5, 0.75)
+
+# Distinct summaries memoized per dataset version
+MAX_MEMOIZED_SUMMARIES = 64
+
+
+def _statistics(frame, columns, quantiles):
+
+    stats = frame[columns].agg(["count", "mean", "min", "max"])
+    q = frame[columns].quantile(list(quantiles))
+    result = {}
+    for column in columns:
+        values = {name: stats.at[name, column] for name in stats.index}
+        values["count"] = int(values["count"])
+        values.update({f"q{round(level * 100):02d}": q.at[level, column] for level in quantiles})
+        result[column] = values
+    return result
+
+
+def _group_statistics(frame, by, columns, quantiles):
+
+    grouped = frame.groupby(by, sort=True)[columns]
+    stats = grouped.agg(["count", "mean", "min", "max"])
+    q = grouped.quantile(list(quantiles))
+    result = {}
+    for level in stats.index:
+        result[str(level)] = {
+            column: {
+                "count": int(stats.at[level, (column, "count")]),
+                "mean": stats.at[level, (column, "mean")],
+                "min": stats.at[level, (column, "min")],
+                "max": stats.at[level, (column, "max")],
+                **{f"q{round(p * 100):02d}": q.at[(level, p), column] for p in quantiles}
+            }
+            for column in columns
+        }
+    return result
+
+
+def summarize(frame, columns=None, by=GROUP_COLUMNS, quantiles=DEFAULT_QUANTILES):
+    """
+    Count, mean, min, max and quantiles of numeric columns, overall and per group
+
+    Args:
+        frame: DataFrame to summarize
+        columns: numeric columns to describe (default: all numeric columns)
+        by: columns to group by, each summarized separately; absent ones are skipped
+        quantiles: quantile levels between 0 and 1
+
+    Returns:
+        {"count", "columns": {column: stats}, "groups": {by: {level: {column: stats}}}}
+    """
+    by = [column for column in by if column in frame.columns]
+    if columns is None:
+        columns = [c for c in frame.select_dtypes("number").columns if c not in by and c not in ("Id", "id")]
+    missing = [column for column in columns if column not in frame.columns]
+    if missing:
+        raise KeyError(f"Unknown columns: {missing}")
+
+    return {
+        "count": len(frame),
+        "columns": _statistics(frame, columns, quantiles) if columns else {},
+        "groups": {column: _group_statistics(frame, column, columns, quantiles) for column in by} if columns else {}
+    }
+
+
+def page_rows(frame, offset, limit, columns=None):
+    """
+    One page of rows, optionally restricted to some columns
+
+    Returns:
+        {"total", "offset", "limit", "columns", "rows": [{column: value}, ...]}
+    """
+    if columns:
+        missing = [column for column in columns if column not in frame.columns]
+        if missing:
+            raise KeyError(f"Unknown columns: {missing}")
+        frame = frame[columns]
+    page = frame.iloc[offset:offset + limit]
+    return {
+        "total": len(frame),
+        "offset": offset,
+        "limit": limit,
+        "columns": list(page.columns),
+        "rows": page.astype(object).where(page.notna(), None).to_dict("records")
+    }
+
+
+def decode_categories(frame, levels):
+    """
+    Replace integer category codes by their level names, in place; codes
+    outside the levels (the encoder's -1 sentinel) become missing values
+    """
+    for column, names in levels.items():
+        if column in frame.columns and pd.api.types.is_numeric_dtype(frame[column]):
+            frame[column] = frame[column].map(dict(enumerate(names)))
+    return frame
+
+
+class CsvDataset:
+    """
+    A CSV pipeline output, reloaded only when the file changes
+
+    With join_path, columns of another CSV (e.g. Weather and Tone_of_Ad of the
+    test inputs) are attached to each row by Id. With levels_path, category
+    codes are shown as level names, using the "categorical_levels" of a saved
+    categorical encoder (e.g. OUT/categorical_encoder.json).
+    """
+
+    def __init__(self, path, join_path=None, join_columns=GROUP_COLUMNS, key="Id", levels_path=None):
+
+        self.path = Path(path)
+        self.join_path = Path(join_path) if join_path is not None else None
+        self.join_columns = tuple(join_columns)
+        self.key = key
+        self.levels_path = Path(levels_path) if levels_path is not None else None
+        self._identity = None
+        self._frame = None
+        self._summaries = {}
+        self._lock = threading.Lock()
+
+    def _file_identity(self):
+
+        parts = []
+        for path in (self.path, self.join_path, self.levels_path):
+            if path is not None and path.exists():
+                stat = path.stat()
+                parts.append((str(path), stat.st_size, stat.st_mtime_ns))
+        return tuple(parts)
+
+    def _load(self):
+
+        frame = pd.read_csv(self.path)
+        if self.join_path is not None and self.join_path.exists():
+            usecols = [self.key, *self.join_columns]
+            extra = pd.read_csv(self.join_path, usecols=lambda column: column in usecols)
+            frame = frame.merge(extra, on=self.key, how="left", sort=False)
+        if self.levels_path is not None and self.levels_path.exists():
+            with open(self.levels_path, 'r', encoding='utf-8') as f:
+                decode_categories(frame, json.load(f)["categorical_levels"])
+        return frame
+
+    def frame(self):
+        """
+        The parsed dataset (read-only by convention)
+
+        Raises:
+            FileNotFoundError when the pipeline has not produced the file yet
+        """
+        if not self.path.exists():
+            raise FileNotFoundError(f"{self.path.name} not found - run 'python run_pipeline.py' first")
+
+        with self._lock:
+            identity = self._file_identity()
+            if identity != self._identity:
+                self._frame = self._load()
+                self._identity = identity
+                self._summaries = {}
+            return self._frame
+
+    def info(self):
+
+        frame = self.frame()
+        return {
+            "file": self.path.name,
+            "rows": len(frame),
+            "columns": list(frame.columns),
+            "bytes": self.path.stat().st_size
+        }
+
+    def page(self, offset, limit, columns=None):
+
+        return page_rows(self.frame(), offset, limit, columns)
+
+    def summary(self, columns=None, by=GROUP_COLUMNS, quantiles=DEFAULT_QUANTILES):
+        """Memoized summarize() of the current file version"""
+        frame = self.frame()
+        key = (id(frame), tuple(columns) if columns else None, tuple(by), tuple(quantiles))
+        with self._lock:
+            cached = self._summaries.get(key)
+        if cached is not None:
+            return cached
+
+        result = summarize(frame, columns, by, quantiles)
+        with self._lock:
+            if len(self._summaries) >= MAX_MEMOIZED_SUMMARIES:
+                self._summaries.clear()
+            self._summaries[key] = result
+        return result
@@ -0,0 +1,61 @@
+"""
+Rate-limited deep health check.
+
+/health answers from in-memory state only. /health/deep scores a real canary
+batch through the loaded model; its result is reused for min_interval seconds
+and concurrent callers share one running check, so frequent polling cannot
+turn the health endpoint into load on the scorer.
+"""
+
+import asyncio
+import time
+
+from starlette.concurrency import run_in_threadpool
+
+
+class DeepHealthCheck:
+    """
+    Runs a blocking check function at most once per min_interval seconds
+    """
+
+    def __init__(self, check, min_interval):
+
+        self.check = check
+        self.min_interval = float(min_interval)
+        self.runs = 0
+        self._result = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _fresh(self):
+
+        return self._result is not None and time.monotonic() - self._checked_at < self.min_interval
+
+    async def run(self):
+        """
+        Return the latest check result, running the check if it is stale
+
+        Returns:
+            {"healthy", "rows", "latency_ms", "error", "checked_at", "cached"}
+        """
+        if self._fresh():
+            return {**self._result, "cached": True}
+
+        async with self._lock:
+            # Another caller may have refreshed it while we waited
+            if self._fresh():
+                return {**self._result, "cached": True}
+
+            start = time.perf_counter()
+            try:
+                rows = await run_in_threadpool(self.check)
+                result = {"healthy": True, "rows": rows, "error": None}
+            except Exception as e:
+                result = {"healthy": False, "rows": 0, "error": str(e)}
+            result["latency_ms"] = round((time.perf_counter() - start) * 1000, 3)
+            result["checked_at"] = time.time()
+
+            self.runs += 1
+            self._result = result
+            self._checked_at = time.monotonic()
+            return {**result, "cached": False}
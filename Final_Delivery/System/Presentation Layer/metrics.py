@@ -0,0 +1,223 @@
+"""
+Prometheus-style metrics for the prediction API.
+
+Small in-process counters, gauges and histograms rendered in the Prometheus
+text exposition format by the /metrics endpoint, plus an ASGI middleware that
+times every request (including the time spent sending the response body).
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Latency buckets in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(names, values):
+
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{value}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value):
+
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    kind = "counter"
+
+    def __init__(self, name, description, labels=()):
+
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def total(self):
+
+        with self._lock:
+            return sum(self._values.values())
+
+    def samples(self):
+
+        with self._lock:
+            return [(self.name, _format_labels(self.labels, key), value) for key, value in sorted(self._values.items())]
+
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+
+    kind = "gauge"
+
+    def set(self, value, **labels):
+
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount=1, **labels):
+
+        self.inc(-amount, **labels)
+
+
+class Histogram:
+    """Cumulative histogram with fixed buckets"""
+
+    kind = "histogram"
+
+    def __init__(self, name, description, labels=(), buckets=LATENCY_BUCKETS):
+
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self._lock:
+            series = self._series.setdefault(key, {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["buckets"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+
+        samples = []
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, bucket_count in zip(self.buckets, series["buckets"]):
+                    labels = _format_labels(self.labels + ("le",), key + (bound,))
+                    samples.append((f"{self.name}_bucket", labels, bucket_count))
+                labels = _format_labels(self.labels + ("le",), key + ("+Inf",))
+                samples.append((f"{self.name}_bucket", labels, series["count"]))
+                samples.append((f"{self.name}_sum", _format_labels(self.labels, key), series["sum"]))
+                samples.append((f"{self.name}_count", _format_labels(self.labels, key), series["count"]))
+        return samples
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together"""
+
+    def __init__(self):
+
+        self._metrics = []
+
+    def register(self, metric):
+
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, description, labels=()):
+
+        return self.register(Counter(name, description, labels))
+
+    def gauge(self, name, description, labels=()):
+
+        return self.register(Gauge(name, description, labels))
+
+    def histogram(self, name, description, labels=(), buckets=LATENCY_BUCKETS):
+
+        return self.register(Histogram(name, description, labels, buckets))
+
+    def render(self, extra_gauges=None):
+        """
+        Render all metrics in the Prometheus text format
+
+        Args:
+            extra_gauges: optional {name: (description, value)} computed at scrape time
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+
+        for name, (description, value) in (extra_gauges or {}).items():
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request counts, latency, in-flight requests and
+    the time spent sending each response body
+    """
+
+    def __init__(self, app, requests_total, request_duration, stage_duration, in_flight, mounts=()):
+
+        self.app = app
+        self.requests_total = requests_total
+        self.request_duration = request_duration
+        self.stage_duration = stage_duration
+        self.in_flight = in_flight
+        self.mounts = tuple(mounts)
+
+    def _endpoint(self, scope):
+
+        route = scope.get("route")
+        if route is not None and getattr(route, "path", None):
+            return route.path
+        for mount in self.mounts:
+            if scope["path"].startswith(mount + "/"):
+                return mount
+        # Keep label cardinality bounded for unknown paths
+        return "unmatched"
+
+    async def __call__(self, scope, receive, send):
+
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        state = {"status": 500, "response_start": None}
+
+        async def timed_send(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+                state["response_start"] = time.perf_counter()
+            await send(message)
+
+        self.in_flight.inc()
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            end = time.perf_counter()
+            self.in_flight.dec()
+            endpoint = self._endpoint(scope)
+            self.requests_total.inc(endpoint=endpoint, method=scope["method"], status=state["status"])
+            self.request_duration.observe(end - start, endpoint=endpoint)
+            if state["response_start"] is not None and endpoint.startswith("/predict"):
+                self.stage_duration.observe(end - state["response_start"], stage="response")
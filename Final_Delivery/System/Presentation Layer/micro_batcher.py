@@ -0,0 +1,161 @@
+"""
+Micro-batching of small concurrent prediction requests.
+
+Requests that arrive within a short window (or until a row budget is reached)
+are scored together as one matrix, which makes much better use of the
+vectorized XGBoost and random forest code than scoring each one alone.
+Results are split back to each caller by row position, so every caller gets
+exactly its own rows and Ids in its original order. Requests without an Id
+column get Ids 1..n of their own rows, as when they are scored alone, not
+their positions in the batch.
+
+The scoring function returns the predictions together with the identity of
+the model that made them; every caller of a batch receives that identity.
+"""
+
+import asyncio
+
+import numpy as np
+import pandas as pd
+from starlette.concurrency import run_in_threadpool
+
+from predictions import Predictions
+
+
+# Upper bounds of the batch-size histogram buckets (rows per scored batch)
+BATCH_ROW_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+def column_kinds(frame):
+    """Column names of a DataFrame, each with whether it holds numbers or text"""
+    return tuple(
+        (column, "number" if pd.api.types.is_numeric_dtype(dtype) else "text")
+        for column, dtype in frame.dtypes.items()
+    )
+
+
+class MicroBatcher:
+    """
+    Coalesces prediction requests into batches scored by a blocking function
+
+    score_frame(frame) returns a (predictions, model_identity) tuple.
+    """
+
+    def __init__(self, score_frame, window_seconds, max_rows, limiter=None):
+
+        self.score_frame = score_frame
+        self.window_seconds = float(window_seconds)
+        self.max_rows = max(1, int(max_rows))
+        self.limiter = limiter
+        self.batches = 0
+        self.requests = 0
+        self.rows = 0
+        self.row_histogram = {str(bound): 0 for bound in BATCH_ROW_BUCKETS}
+        self.row_histogram["+Inf"] = 0
+        self.request_histogram = {}
+        self._pending = []
+        self._pending_rows = 0
+        self._timer = None
+        self._tasks = set()
+
+    @property
+    def enabled(self):
+
+        return self.window_seconds > 0
+
+    async def submit(self, frame):
+        """
+        Queue a DataFrame for the next batch and wait for its predictions
+
+        Returns:
+            Tuple of (Predictions for the rows of frame, identity of the
+            model that scored them)
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((frame, future))
+        self._pending_rows += len(frame)
+
+        if self._pending_rows >= self.max_rows:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_seconds, self._flush)
+
+        return await future
+
+    def _flush(self):
+
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        pending, self._pending, self._pending_rows = self._pending, [], 0
+        if not pending:
+            return
+
+        # Requests with different columns, or with text where others have numbers,
+        # cannot share one matrix: concatenating them would give mixed object columns
+        groups = {}
+        for frame, future in pending:
+            groups.setdefault(column_kinds(frame), []).append((frame, future))
+
+        for group in groups.values():
+            task = asyncio.ensure_future(self._run_batch(group))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, group):
+
+        frames = [frame for frame, _ in group]
+        futures = [future for _, future in group]
+        combined = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+
+        try:
+            if self.limiter is not None:
+                async with self.limiter:
+                    predictions, identity = await run_in_threadpool(self.score_frame, combined)
+            else:
+                predictions, identity = await run_in_threadpool(self.score_frame, combined)
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self._record(len(combined), len(group))
+
+        # Frames of a group have the same columns, so either all have Ids or none
+        numbered = "Id" not in combined.columns
+        offset = 0
+        for frame, future in group:
+            if not future.done():
+                own = predictions[offset:offset + len(frame)]
+                if numbered:
+                    own = Predictions(np.arange(1, len(frame) + 1), own.expected)
+                future.set_result((own, identity))
+            offset += len(frame)
+
+    def _record(self, rows, requests):
+
+        self.batches += 1
+        self.requests += requests
+        self.rows += rows
+
+        bucket = next((str(bound) for bound in BATCH_ROW_BUCKETS if rows <= bound), "+Inf")
+        self.row_histogram[bucket] += 1
+        self.request_histogram[str(requests)] = self.request_histogram.get(str(requests), 0) + 1
+
+    def stats(self):
+
+        return {
+            "enabled": self.enabled,
+            "window_ms": self.window_seconds * 1000,
+            "max_rows": self.max_rows,
+            "batches": self.batches,
+            "requests": self.requests,
+            "rows": self.rows,
+            "avg_rows_per_batch": round(self.rows / self.batches, 2) if self.batches else 0.0,
+            "avg_requests_per_batch": round(self.requests / self.batches, 2) if self.batches else 0.0,
+            "rows_per_batch_histogram": self.row_histogram,
+            "requests_per_batch_histogram": dict(sorted(self.request_histogram.items(), key=lambda kv: int(kv[0])))
+        }
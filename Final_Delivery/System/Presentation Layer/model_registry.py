@@ -0,0 +1,296 @@
+"""
+Registry of the active prediction model with hot reload.
+
+A new model is loaded in the background, validated on a canary batch and
+swapped in atomically. Requests lease the model they started with, so the
+previous model keeps serving its in-flight requests and is only released once
+they have drained. A watcher thread reloads automatically when the model
+files change on disk.
+
+Files that failed to load are not loaded again on the request path: requests
+fail fast with ModelUnavailableError while the watcher retries them in the
+background, until they load or the files change.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+class ModelValidationError(RuntimeError):
+    """Raised when a newly loaded model fails the canary check"""
+
+
+class ModelUnavailableError(RuntimeError):
+    """Raised when no model is loaded and the model files on disk already failed to load"""
+
+
+class ModelVersion:
+    """
+    A loaded model together with the file identity it was loaded from
+    """
+
+    def __init__(self, model, identity, version, load_seconds):
+
+        self.model = model
+        self.identity = identity
+        self.version = version
+        self.load_seconds = load_seconds
+        self.loaded_at = time.time()
+        self.in_flight = 0
+        self.retired = False
+        self.closed = False
+
+
+class ModelRegistry:
+    """
+    Holds the active model version and swaps it without dropping requests
+    """
+
+    def __init__(self, loader, identity_func, canary_path=None, canary_rows=20):
+
+        self.loader = loader
+        self.identity_func = identity_func
+        self.canary_path = Path(canary_path) if canary_path is not None else None
+        self.canary_rows = canary_rows
+        self.reloads = 0
+        self.failed_reloads = 0
+        self.last_error = None
+        self.failed_identity = None
+        self._active = None
+        self._next_version = 1
+        self._lock = threading.Lock()
+        self._reload_lock = threading.RLock()
+        self._retired = []
+        self._canary = None
+        self._watcher = None
+        self._stop = threading.Event()
+
+    @property
+    def active(self):
+
+        return self._active
+
+    def _load(self, identity):
+
+        start = time.perf_counter()
+        model = self.loader()
+        version = ModelVersion(model, identity, self._next_version, time.perf_counter() - start)
+        self._next_version += 1
+        return version
+
+    def canary_frame(self):
+        """The canary batch, read once (None when there is no canary file)"""
+        if self._canary is None and self.canary_path is not None and self.canary_path.exists():
+            self._canary = pd.read_csv(self.canary_path, nrows=self.canary_rows)
+        return self._canary
+
+    def check(self, model):
+        """
+        Score the canary batch with a model and check the predictions look sane
+
+        Returns:
+            Number of canary rows scored (0 when there is no canary file)
+
+        Raises:
+            ModelValidationError when the model cannot score the canary batch
+        """
+        canary = self.canary_frame()
+        if canary is None:
+            return 0
+
+        try:
+            predictions = model.predict_frame(canary)
+        except Exception as e:
+            raise ModelValidationError(f"Canary prediction failed: {e}")
+
+        if len(predictions) != len(canary):
+            raise ModelValidationError(f"Canary returned {len(predictions)} rows for {len(canary)} inputs")
+        if not np.isfinite(predictions.expected).all():
+            raise ModelValidationError("Canary predictions contain NaN or infinite values")
+        return len(predictions)
+
+    def validate(self, version):
+        """Check a newly loaded version on the canary batch before it is activated"""
+        self.check(version.model)
+
+    def get(self):
+        """Return the active model, loading the first version if needed"""
+        if self._active is None:
+            self._load_first()
+        return self._active.model
+
+    def _load_first(self):
+        """
+        Load the first version, unless another caller or the watcher did meanwhile
+
+        Raises:
+            ModelUnavailableError when the files on disk already failed to load
+            (the watcher retries them, so requests do not reload inline)
+        """
+        with self._reload_lock:
+            if self._active is None:
+                if self.failed_identity is not None and self.identity_func() == self.failed_identity:
+                    raise ModelUnavailableError(f"Model failed to load, retrying in the background: {self.last_error}")
+                self.reload()
+
+    def reload(self):
+        """
+        Load, validate and atomically activate a new model version
+
+        The current version keeps serving if anything fails.
+
+        Returns:
+            The newly active ModelVersion
+        """
+        with self._reload_lock:
+            identity = self.identity_func()
+            try:
+                version = self._load(identity)
+            except Exception as e:
+                self._record_failure(e, identity)
+                raise
+
+            try:
+                self.validate(version)
+            except Exception as e:
+                version.model.close()
+                self._record_failure(e, identity)
+                raise
+
+            with self._lock:
+                previous = self._active
+                self._active = version
+                to_close = None
+                if previous is not None:
+                    previous.retired = True
+                    if previous.in_flight == 0:
+                        previous.closed = True
+                        to_close = previous
+                    else:
+                        self._retired.append(previous)
+                if previous is not None:
+                    self.reloads += 1
+                self.last_error = None
+                self.failed_identity = None
+
+            if to_close is not None:
+                to_close.model.close()
+            print(f"✓ Model version {version.version} active ({version.model.backend} backend, "
+                  f"loaded in {version.load_seconds:.2f}s)")
+            return version
+
+    def _record_failure(self, error, identity):
+
+        with self._lock:
+            self.failed_reloads += 1
+            self.last_error = str(error)
+            self.failed_identity = identity
+            serving = self._active is not None
+        if serving:
+            print(f"⚠ Model reload failed, keeping the current model: {error}")
+        else:
+            print(f"⚠ Model load failed: {error}")
+
+    @contextmanager
+    def lease(self):
+        """
+        Use the active model for one request; a model swapped out meanwhile is
+        released only after every lease on it has ended
+        """
+        with self.lease_version() as version:
+            yield version.model
+
+    @contextmanager
+    def lease_version(self):
+        """Like lease(), but yields the ModelVersion (model and the identity it was loaded from)"""
+        if self._active is None:
+            self._load_first()
+
+        with self._lock:
+            version = self._active
+            version.in_flight += 1
+
+        try:
+            yield version
+        finally:
+            to_close = None
+            with self._lock:
+                version.in_flight -= 1
+                if version.retired and version.in_flight == 0 and not version.closed:
+                    version.closed = True
+                    self._retired.remove(version)
+                    to_close = version
+            if to_close is not None:
+                to_close.model.close()
+                print(f"✓ Model version {to_close.version} drained and released")
+
+    def start_watching(self, interval):
+        """
+        Reload in the background whenever the model files change, or load the
+        first model once its files appear (interval in seconds)
+        """
+        if interval <= 0 or self._watcher is not None:
+            return
+
+        def watch():
+            pending = None
+            while not self._stop.wait(interval):
+                try:
+                    identity = self.identity_func()
+                    active = self._active
+                    # No files yet, already serving them, or an update that was rejected
+                    # while the current model keeps serving
+                    if not identity or (active is not None and identity in (active.identity, self.failed_identity)):
+                        pending = None
+                        continue
+                    # Wait until the files stop changing before loading them; with no
+                    # active model, files that failed to load are retried on every tick
+                    if identity != pending and identity != self.failed_identity:
+                        pending = identity
+                        continue
+                    try:
+                        self.reload()
+                    except Exception:
+                        pass
+                    pending = None
+                except Exception as e:
+                    print(f"⚠ Model watcher error: {e}")
+
+        self._watcher = threading.Thread(target=watch, name="model-watcher", daemon=True)
+        self._watcher.start()
+
+    def close(self):
+
+        self._stop.set()
+        with self._lock:
+            versions = [self._active] + self._retired if self._active is not None else list(self._retired)
+            self._active = None
+            self._retired = []
+        for version in versions:
+            if not version.closed:
+                version.closed = True
+                version.model.close()
+
+    def status(self):
+
+        with self._lock:
+            active = self._active
+            return {
+                "version": active.version if active else None,
+                "backend": active.model.backend if active else None,
+                "identity": active.identity if active else None,
+                "loaded_at": active.loaded_at if active else None,
+                "load_seconds": active.load_seconds if active else None,
+                "in_flight": active.in_flight if active else 0,
+                "draining_versions": [v.version for v in self._retired],
+                "reloads": self.reloads,
+                "failed_reloads": self.failed_reloads,
+                "last_error": self.last_error,
+                "failed_identity": self.failed_identity,
+                "watching": self._watcher is not None
+            }
@@ -0,0 +1,352 @@
+"""
+Native Python inference for the R-trained model.
+
+compare_models.R exports the best model to OUT/models/portable/:
+    model_manifest.json  - model kind, feature order, linear and meta-model coefficients
+    ../preprocessing.json - fitted preprocessing (level maps, training medians, feature definitions)
+    xgb_booster.json     - XGBoost booster
+    random_forest.json   - randomForest trees (one node table per tree)
+
+This module scores that export in-process with numpy/xgboost, so R is not
+needed on the request path. Run this file directly to check its predictions
+against predict.R on IN/data_test.csv.
+"""
+
+import json
+import subprocess
+import sys
+import warnings
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from predictions import Predictions
+
+# The engineered features are defined and compiled by the data processing layer
+sys.path.append(str(Path(__file__).resolve().parent.parent / 'Data Processing Layer'))
+from FeatureEngineeringModule import ENGINEERED_FEATURES, FeatureExpression
+
+
+MANIFEST_NAME = "model_manifest.json"
+
+# Defaults for models trained before preprocessing.json was saved (same as prediction_functions.R)
+DEFAULT_PREPROCESSING = {
+    'categorical_levels': {
+        'Tone_of_Ad': ["funny", "serious", "emotional"],
+        'Weather': ["sunny", "cloudy", "rainy"],
+        'Gender': ["Female", "Male"],
+        'Coffee_Consumption': ["low", "medium", "high"]
+    },
+    'engineered_features': ENGINEERED_FEATURES,
+    'medians': None
+}
+
+# Rows scored per random forest traversal block (bounds the node-index matrix)
+FOREST_BLOCK_ROWS = 2048
+
+
+# Compiled once per definition; a model's preprocessing.json repeats the same few
+compile_expression = lru_cache(maxsize=256)(FeatureExpression)
+
+
+def add_features(columns, definitions, n_rows):
+    """
+    Evaluate engineered feature definitions (arithmetic expressions) on a dict
+    of column arrays, with the same restricted syntax as the training data
+    (FeatureExpression: numbers, column names, + - * / and parentheses)
+
+    Raises:
+        ValueError for other syntax or a missing column
+    """
+    for name, expression in definitions.items():
+        compiled = compile_expression(expression)
+        missing = [column for column in compiled.inputs if column not in columns]
+        if missing:
+            raise ValueError(f"Missing columns {missing} for feature {name} = {expression}")
+        columns[name] = compiled.evaluate(columns, n_rows)
+    return columns
+
+
+def prepare_features(test_data, feature_names, preprocessing=None):
+    """
+    Turn a raw test DataFrame into the model feature matrix, mirroring
+    prepare_features() in prediction_functions.R
+
+    With fitted preprocessing, missing and infinite values are filled with the
+    training medians; without it (older models) batch medians are used.
+
+    Returns:
+        float64 matrix with one column per name in feature_names
+    """
+    preprocessing = preprocessing or DEFAULT_PREPROCESSING
+    levels_map = preprocessing['categorical_levels']
+
+    columns = {}
+    for column in test_data.columns:
+        if column in ("Id", "id", "sales"):
+            continue
+        series = test_data[column]
+        if column in levels_map:
+            levels = pd.Index(levels_map[column])
+            if pd.api.types.is_numeric_dtype(series):
+                # Already codes (e.g. Gender 0/1); codes outside the levels become NA, like in R
+                values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+                columns[column] = np.where(np.isin(values, np.arange(len(levels))), values, np.nan)
+            else:
+                # Values outside the levels become NA, like match() in R
+                codes = levels.get_indexer(series)
+                columns[column] = np.where(codes < 0, np.nan, codes).astype(np.float64)
+        else:
+            columns[column] = pd.to_numeric(series, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+
+    add_features(columns, preprocessing['engineered_features'], len(test_data))
+
+    missing = [name for name in feature_names if name not in columns]
+    if missing:
+        raise ValueError(f"Missing columns for prediction: {missing}")
+
+    X = np.column_stack([columns[name] for name in feature_names]) if feature_names else np.empty((len(test_data), 0))
+
+    # Replace NA/Inf in one vectorized pass (0 where no median is known)
+    invalid = ~np.isfinite(X)
+    if invalid.any():
+        if preprocessing['medians'] is not None:
+            medians = np.array([preprocessing['medians'].get(name, 0.0) for name in feature_names], dtype=np.float64)
+        else:
+            X[invalid] = np.nan
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", category=RuntimeWarning)
+                medians = np.nanmedian(X, axis=0)
+            medians = np.where(np.isnan(medians), 0.0, medians)
+        X[invalid] = np.take(medians, np.nonzero(invalid)[1])
+
+    return X
+
+
+class RandomForestScorer:
+    """
+    Vectorized evaluation of an exported randomForest regression model
+    """
+
+    def __init__(self, forest_path):
+
+        with open(forest_path, 'r', encoding='utf-8') as f:
+            forest = json.load(f)
+
+        self.feature_names = forest['feature_names']
+        trees = forest['trees']
+        n_nodes = max(len(tree['left']) for tree in trees)
+
+        # Pad every tree to the same node count; padded nodes are never reached
+        shape = (len(trees), n_nodes)
+        self.left = np.zeros(shape, dtype=np.int32)
+        self.right = np.zeros(shape, dtype=np.int32)
+        self.split_var = np.zeros(shape, dtype=np.int32)
+        self.split_point = np.zeros(shape, dtype=np.float64)
+        self.prediction = np.zeros(shape, dtype=np.float64)
+
+        for t, tree in enumerate(trees):
+            size = len(tree['left'])
+            # R node and variable indices are 1-based; 0 marks a terminal node
+            self.left[t, :size] = np.asarray(tree['left']) - 1
+            self.right[t, :size] = np.asarray(tree['right']) - 1
+            self.split_var[t, :size] = np.maximum(np.asarray(tree['split_var']) - 1, 0)
+            self.split_point[t, :size] = tree['split_point']
+            self.prediction[t, :size] = tree['prediction']
+
+        self.is_leaf = self.left < 0
+
+    def predict(self, X):
+        """Average of all tree predictions, like predict.randomForest()"""
+        X = np.asarray(X, dtype=np.float64)
+        output = np.empty(X.shape[0], dtype=np.float64)
+        tree_idx = np.arange(self.left.shape[0])[np.newaxis, :]
+
+        for start in range(0, X.shape[0], FOREST_BLOCK_ROWS):
+            block = X[start:start + FOREST_BLOCK_ROWS]
+            row_idx = np.arange(block.shape[0])[:, np.newaxis]
+            nodes = np.zeros((block.shape[0], self.left.shape[0]), dtype=np.int32)
+
+            # Walk all trees for all rows one level at a time
+            active = ~self.is_leaf[tree_idx, nodes]
+            while active.any():
+                values = block[row_idx, self.split_var[tree_idx, nodes]]
+                go_left = values <= self.split_point[tree_idx, nodes]
+                children = np.where(go_left, self.left[tree_idx, nodes], self.right[tree_idx, nodes])
+                nodes = np.where(active, children, nodes)
+                active = ~self.is_leaf[tree_idx, nodes]
+
+            output[start:start + block.shape[0]] = self.prediction[tree_idx, nodes].mean(axis=1)
+
+        return output
+
+
+class NativeModel:
+    """
+    In-process scorer for the portable export of the best R model
+    """
+
+    backend = "native"
+
+    def __init__(self, model_dir):
+
+        self.model_dir = Path(model_dir)
+        with open(self.model_dir / MANIFEST_NAME, 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+
+        self.kind = self.manifest['kind']
+        self.feature_names = self.manifest['feature_names']
+        self.booster = None
+        self.xgb_iteration_range = (0, 0)
+        self.forest = None
+
+        if 'xgboost' in self.manifest:
+            import xgboost as xgb
+            self._xgb = xgb
+            self.booster = xgb.Booster(model_file=str(self.model_dir / self.manifest['xgboost']))
+            # R predict() stops at the early-stopping best iteration (0-based attribute)
+            best_iteration = self.booster.attr("best_iteration")
+            if best_iteration is not None:
+                self.xgb_iteration_range = (0, int(best_iteration) + 1)
+
+        if 'random_forest' in self.manifest:
+            self.forest = RandomForestScorer(self.model_dir / self.manifest['random_forest'])
+
+        # Fitted preprocessing (training medians, level maps, feature definitions)
+        self.preprocessing = None
+        if 'preprocessing' in self.manifest:
+            preprocessing_path = self.model_dir / self.manifest['preprocessing']
+            if preprocessing_path.exists():
+                with open(preprocessing_path, 'r', encoding='utf-8') as f:
+                    self.preprocessing = json.load(f)
+
+    @staticmethod
+    def is_available(model_dir):
+
+        return (Path(model_dir) / MANIFEST_NAME).exists()
+
+    def _linear(self, X, params):
+
+        weights = np.array([params['coefficients'].get(name, 0.0) for name in self.feature_names])
+        return params['intercept'] + X @ weights
+
+    def _xgboost(self, X):
+
+        dmatrix = self._xgb.DMatrix(X, feature_names=self.feature_names)
+        return self.booster.predict(dmatrix, iteration_range=self.xgb_iteration_range).astype(np.float64)
+
+    def _forest(self, X):
+
+        columns = [self.feature_names.index(name) for name in self.forest.feature_names]
+        return self.forest.predict(X[:, columns])
+
+    def predict_log(self, X):
+        """
+        Score a feature matrix (columns in manifest order) on the log1p scale
+        """
+        if self.kind == "Stacking":
+            meta = self.manifest['meta_model']
+            base = {}
+            if self.booster is not None:
+                base['XGBoost'] = self._xgboost(X)
+            if self.forest is not None:
+                base['RandomForest'] = self._forest(X)
+            if 'linear' in self.manifest:
+                base['Linear'] = self._linear(X, self.manifest['linear'])
+            prediction = np.full(X.shape[0], meta['intercept'], dtype=np.float64)
+            for name, weight in meta['coefficients'].items():
+                prediction += weight * base[name]
+            return prediction
+        if self.kind == "XGBoost":
+            return self._xgboost(X)
+        if self.kind == "RandomForest":
+            return self._forest(X)
+        if self.kind == "Linear":
+            return self._linear(X, self.manifest['linear'])
+        raise ValueError(f"Unsupported model kind: {self.kind}")
+
+    def predict_frame(self, test_data):
+        """
+        Score a raw test DataFrame
+
+        Returns:
+            Predictions (Id and Expected columns)
+        """
+        if "Id" in test_data.columns:
+            ids = test_data["Id"].to_numpy()
+        else:
+            ids = np.arange(1, len(test_data) + 1)
+
+        X = prepare_features(test_data, self.feature_names, self.preprocessing)
+        return Predictions(ids, np.expm1(self.predict_log(X)))
+
+    def predict_file(self, csv_path):
+
+        return self.predict_frame(pd.read_csv(csv_path))
+
+    def stats(self):
+
+        return {"kind": self.kind, "features": len(self.feature_names)}
+
+    def close(self):
+
+        self.booster = None
+        self.forest = None
+
+
+def check_parity(model, csv_path, r_executable, r_script, cwd, rtol=1e-3):
+    """
+    Compare native predictions with predict.R on the same CSV file
+
+    Returns:
+        Dictionary with the comparison summary
+    """
+    result = subprocess.run(
+        [r_executable, str(r_script), str(csv_path)],
+        capture_output=True,
+        text=True,
+        cwd=str(cwd)
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"R script failed with code {result.returncode}. STDERR: {result.stderr}")
+
+    r_predictions = pd.DataFrame(json.loads(result.stdout))
+    native_predictions = model.predict_frame(pd.read_csv(csv_path)).to_frame()
+
+    r_values = r_predictions['Expected'].to_numpy(dtype=np.float64)
+    native_values = native_predictions['Expected'].to_numpy(dtype=np.float64)
+    abs_diff = np.abs(native_values - r_values)
+    rel_diff = abs_diff / np.maximum(np.abs(r_values), 1e-12)
+
+    return {
+        "rows": len(r_values),
+        "ids_match": r_predictions['Id'].tolist() == native_predictions['Id'].tolist(),
+        "max_abs_diff": float(abs_diff.max()) if len(abs_diff) else 0.0,
+        "max_rel_diff": float(rel_diff.max()) if len(rel_diff) else 0.0,
+        "rtol": rtol,
+        "passed": bool(np.allclose(native_values, r_values, rtol=rtol))
+    }
+
+
+if __name__ == "__main__":
+    import platform
+    import sys
+
+    base_dir = Path(__file__).parent.parent
+    r_executable = r"C:\Program Files\R\R-4.5.2\bin\Rscript.exe" if platform.system() == "Windows" else "Rscript"
+
+    native_model = NativeModel(base_dir / "OUT" / "models" / "portable")
+    summary = check_parity(
+        native_model,
+        base_dir / "IN" / "data_test.csv",
+        r_executable,
+        Path(__file__).parent / "predict.R",
+        base_dir
+    )
+
+    print("=== NATIVE VS R PARITY CHECK ===")
+    for key, value in summary.items():
+        print(f"{key}: {value}")
+    sys.exit(0 if summary["passed"] and summary["ids_match"] else 1)
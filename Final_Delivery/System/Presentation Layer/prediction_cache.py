@@ -0,0 +1,128 @@
+"""
+Content-addressed cache of prediction results.
+
+Entries are keyed by a hash of the uploaded bytes together with the identity
+of the model that scored them, so a retrained model never serves stale
+results. Eviction is LRU, bounded by entry count and total cached rows, and
+entries expire after a TTL.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+def cache_key(contents, model_identity):
+    """Hash uploaded bytes together with the model identity"""
+    digest = hashlib.sha256()
+    digest.update(str(model_identity).encode('utf-8'))
+    digest.update(b"\0")
+    digest.update(contents)
+    return digest.hexdigest()
+
+
+class PredictionCache:
+    """
+    LRU cache of prediction lists with size and TTL based eviction
+    """
+
+    def __init__(self, max_entries=128, max_rows=1_000_000, ttl_seconds=3600):
+
+        self.max_entries = max(0, int(max_entries))
+        self.max_rows = max(0, int(max_rows))
+        self.ttl_seconds = float(ttl_seconds)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.rows = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+
+        return self.max_entries > 0 and self.max_rows > 0
+
+    def get(self, key):
+        """Return cached predictions for key, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            stored_at, predictions = entry
+            if self.ttl_seconds > 0 and time.monotonic() - stored_at > self.ttl_seconds:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return predictions
+
+    def peek(self, key):
+        """
+        Return cached predictions for key, or None, without counting a hit or
+        miss (for reading back earlier results, which says nothing about reuse)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            stored_at, predictions = entry
+            if self.ttl_seconds > 0 and time.monotonic() - stored_at > self.ttl_seconds:
+                return None
+
+            self._entries.move_to_end(key)
+            return predictions
+
+    def put(self, key, predictions):
+
+        if not self.enabled or len(predictions) > self.max_rows:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic(), predictions)
+            self.rows += len(predictions)
+
+            # Drop least recently used entries until both bounds hold
+            while len(self._entries) > self.max_entries or self.rows > self.max_rows:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key):
+
+        _, predictions = self._entries.pop(key)
+        self.rows -= len(predictions)
+
+    def clear(self):
+
+        with self._lock:
+            self._entries.clear()
+            self.rows = 0
+
+    def stats(self):
+
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "rows": self.rows,
+                "max_entries": self.max_entries,
+                "max_rows": self.max_rows,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
@@ -0,0 +1,47 @@
+"""
+Columnar prediction results.
+
+Scorers return the Ids and predicted sales of a batch as two aligned numpy
+arrays instead of one {"Id", "Expected"} dictionary per row. The columnar,
+Arrow and Parquet responses are encoded straight from the arrays; per-row
+objects are only built for the JSON responses that show them.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class Predictions:
+    """
+    Ids and predicted sales of scored rows
+    """
+
+    def __init__(self, ids, expected):
+
+        self.ids = np.asarray(ids)
+        self.expected = np.asarray(expected, dtype=np.float64)
+        if len(self.ids) != len(self.expected):
+            raise ValueError(f"{len(self.ids)} Ids for {len(self.expected)} predictions")
+
+    @classmethod
+    def from_records(cls, records):
+        """Build from a list of {"Id", "Expected"} dictionaries"""
+        return cls([r["Id"] for r in records], [r["Expected"] for r in records])
+
+    def __len__(self):
+
+        return len(self.expected)
+
+    def __getitem__(self, index):
+
+        if not isinstance(index, slice):
+            raise TypeError("Predictions can only be sliced")
+        return Predictions(self.ids[index], self.expected[index])
+
+    def to_records(self):
+        """One {"Id", "Expected"} dictionary per row, with plain Python values"""
+        return [{"Id": i, "Expected": e} for i, e in zip(self.ids.tolist(), self.expected.tolist())]
+
+    def to_frame(self):
+
+        return pd.DataFrame({"Id": self.ids, "Expected": self.expected})
@@ -0,0 +1,302 @@
+"""
+Pool of long-lived R prediction workers.
+
+Each worker runs predict_worker.R, which loads the R libraries and the trained
+model once and then answers prediction requests over its stdin/stdout pipes.
+This avoids paying for R startup and readRDS() on every API request.
+
+Every read from a worker has a deadline: a worker that does not answer in
+time is killed, and broken workers are replaced by a background thread so
+that restarting R never happens on the request path.
+"""
+
+import json
+import queue
+import subprocess
+import tempfile
+import threading
+from pathlib import Path
+
+from predictions import Predictions
+
+
+# Seconds between attempts to start a replacement worker after a failed start
+RESTART_RETRY_SECONDS = 5
+
+
+class WorkerCrashedError(RuntimeError):
+    """Raised when an R worker process dies or closes its pipes"""
+
+
+class WorkerTimeoutError(WorkerCrashedError):
+    """Raised when an R worker does not answer in time (the worker is killed)"""
+
+
+class PredictionError(RuntimeError):
+    """Raised when an R worker reports an error for a request"""
+
+
+class RPredictionWorker:
+    """
+    A single R process serving predictions line by line
+    """
+
+    def __init__(self, r_executable, script_path, model_path, cwd):
+
+        self.r_executable = r_executable
+        self.script_path = Path(script_path)
+        self.model_path = Path(model_path)
+        self.cwd = cwd
+        self.process = None
+        self._lines = None
+
+    def start(self, timeout=None):
+
+        self.process = subprocess.Popen(
+            [self.r_executable, str(self.script_path), str(self.model_path)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+            cwd=str(self.cwd)
+        )
+
+        # Lines are read by a helper thread so that every read can time out
+        self._lines = queue.Queue()
+        threading.Thread(
+            target=self._read_output,
+            args=(self.process.stdout, self._lines),
+            name="r-worker-output",
+            daemon=True
+        ).start()
+
+        # The worker prints READY once the model is loaded
+        line = self._read_line(timeout)
+        if line.strip() != "READY":
+            self.stop()
+            raise WorkerCrashedError(f"R worker failed to start. Output was: {line[:200]}")
+
+    @staticmethod
+    def _read_output(stdout, lines):
+
+        # An empty string marks the end of the output, like readline() at EOF
+        for line in stdout:
+            lines.put(line)
+        lines.put("")
+
+    def _read_line(self, timeout):
+        """
+        Next line printed by the worker
+
+        Raises:
+            WorkerTimeoutError when no line arrives within timeout seconds
+        """
+        try:
+            return self._lines.get(timeout=timeout)
+        except queue.Empty:
+            self.kill()
+            raise WorkerTimeoutError(f"R worker did not answer within {timeout:g}s and was killed")
+
+    def is_alive(self):
+
+        return self.process is not None and self.process.poll() is None
+
+    def predict_file(self, csv_path, timeout=None):
+
+        if not self.is_alive():
+            raise WorkerCrashedError("R worker is not running")
+
+        try:
+            self.process.stdin.write(f"{csv_path}\n")
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise WorkerCrashedError(f"R worker pipe closed: {e}")
+        line = self._read_line(timeout)
+
+        if not line:
+            raise WorkerCrashedError("R worker exited unexpectedly")
+
+        if line.startswith("ERROR"):
+            raise PredictionError(line[len("ERROR"):].strip())
+
+        try:
+            columns = json.loads(line)
+        except json.JSONDecodeError:
+            raise PredictionError(f"Failed to parse R output as JSON. Output was: {line[:200]}")
+        return Predictions(columns.get("Id", []), columns.get("Expected", []))
+
+    def stop(self):
+
+        if self.process is None:
+            return
+
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=5)
+        except Exception:
+            self.process.kill()
+        self.process = None
+
+    def kill(self):
+
+        if self.process is not None and self.process.poll() is None:
+            self.process.kill()
+
+
+class RWorkerPool:
+    """
+    Fixed-size pool of warm R workers with automatic restart on crash or timeout
+    """
+
+    backend = "r"
+
+    def __init__(self, size, r_executable, script_path, model_path, cwd, warmup_path=None,
+                 start_timeout=120, request_timeout=60):
+
+        self.size = max(1, int(size))
+        self.r_executable = r_executable
+        self.script_path = script_path
+        self.model_path = model_path
+        self.cwd = cwd
+        self.warmup_path = warmup_path
+        self.start_timeout = start_timeout
+        self.request_timeout = request_timeout
+        self.restarts = 0
+        self.timeouts = 0
+        self._workers = []
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+
+    def _new_worker(self):
+
+        worker = RPredictionWorker(self.r_executable, self.script_path, self.model_path, self.cwd)
+        worker.start(self.start_timeout)
+        if self.warmup_path is not None and Path(self.warmup_path).exists():
+            # First prediction loads lazy package code, keep it off the request path
+            try:
+                worker.predict_file(self.warmup_path, self.start_timeout)
+            except Exception:
+                worker.stop()
+                raise
+        return worker
+
+    def start(self):
+
+        with self._lock:
+            for _ in range(self.size):
+                worker = self._new_worker()
+                self._workers.append(worker)
+                self._idle.put(worker)
+        print(f"✓ R worker pool started ({self.size} workers)")
+
+    def _replace(self, worker):
+        """Kill a broken worker and start its replacement in a background thread"""
+        worker.kill()
+        threading.Thread(target=self._restart, args=(worker,), name="r-worker-restart", daemon=True).start()
+
+    def _restart(self, worker):
+
+        worker.stop()
+        while not self._closed.is_set():
+            try:
+                replacement = self._new_worker()
+            except Exception as e:
+                print(f"⚠ R worker restart failed, retrying in {RESTART_RETRY_SECONDS}s: {e}")
+                self._closed.wait(RESTART_RETRY_SECONDS)
+                continue
+
+            with self._lock:
+                if self._closed.is_set() or worker not in self._workers:
+                    replacement.stop()
+                    return
+                self._workers[self._workers.index(worker)] = replacement
+                self.restarts += 1
+            self._idle.put(replacement)
+            print(f"⚠ R worker restarted (total restarts: {self.restarts})")
+            return
+
+    def _next_worker(self):
+        """
+        Take the next idle worker, handing dead ones to the background restart
+
+        Raises:
+            WorkerTimeoutError when no worker becomes idle within the request timeout
+        """
+        while True:
+            try:
+                worker = self._idle.get(timeout=self.request_timeout)
+            except queue.Empty:
+                raise WorkerTimeoutError(f"No R worker became available within {self.request_timeout:g}s")
+            if worker.is_alive():
+                return worker
+            self._replace(worker)
+
+    def _score(self, csv_path):
+
+        worker = self._next_worker()
+        try:
+            result = worker.predict_file(csv_path, self.request_timeout)
+        except WorkerCrashedError as e:
+            if isinstance(e, WorkerTimeoutError):
+                self.timeouts += 1
+            self._replace(worker)
+            raise
+        except Exception:
+            self._idle.put(worker)
+            raise
+        self._idle.put(worker)
+        return result
+
+    def predict_file(self, csv_path):
+        """
+        Score a CSV file on the next idle worker
+
+        Args:
+            csv_path: path to a CSV file with test data
+
+        Returns:
+            Predictions (Id and Expected columns)
+
+        Raises:
+            WorkerTimeoutError when the worker does not answer within request_timeout
+        """
+        try:
+            return self._score(csv_path)
+        except WorkerTimeoutError:
+            # A request that hung once would likely hang again
+            raise
+        except WorkerCrashedError:
+            # Retry once on another worker
+            return self._score(csv_path)
+
+    def predict_frame(self, test_data):
+        """
+        Score a DataFrame by handing it to a worker as a temporary CSV file
+        """
+        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.csv', newline='') as temp_file:
+            test_data.to_csv(temp_file, index=False)
+            temp_path = temp_file.name
+
+        try:
+            return self.predict_file(temp_path)
+        finally:
+            Path(temp_path).unlink()
+
+    def stats(self):
+
+        return {
+            "workers": self.size,
+            "idle_workers": self._idle.qsize(),
+            "restarts": self.restarts,
+            "timeouts": self.timeouts
+        }
+
+    def close(self):
+
+        self._closed.set()
+        with self._lock:
+            for worker in self._workers:
+                worker.stop()
+            self._workers = []
+        self._idle = queue.Queue()
@@ -0,0 +1,64 @@
+"""
+Concurrency limit with a bounded waiting queue for prediction requests.
+
+At most max_concurrent predictions run at once; up to max_queued more wait
+for a slot. Anything beyond that is rejected right away so that a burst of
+uploads degrades cleanly instead of piling up on the server.
+"""
+
+import asyncio
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the prediction queue has no room for another request"""
+
+
+class PredictionLimiter:
+    """
+    Async context manager guarding the prediction slots
+    """
+
+    def __init__(self, max_concurrent, max_queued):
+
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.max_queued = max(0, int(max_queued))
+        self.in_flight = 0
+        self.queued = 0
+        self.rejected = 0
+        self._semaphore = asyncio.Semaphore(self.max_concurrent)
+
+    async def acquire(self):
+        """
+        Wait for a prediction slot
+
+        Raises:
+            QueueFullError when all slots are busy and the queue is full
+        """
+        if self._semaphore.locked() and self.queued >= self.max_queued:
+            self.rejected += 1
+            raise QueueFullError(
+                f"Prediction queue is full ({self.in_flight} running, {self.queued} waiting)"
+            )
+
+        self.queued += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+
+        self.in_flight += 1
+
+    def release(self):
+
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    async def __aenter__(self):
+
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+
+        self.release()
+        return False
@@ -0,0 +1,142 @@
+"""
+Response formats for bulk predictions.
+
+Clients pick a format with the Accept header or a ?format= query parameter:
+    json     - {"status", "predictions": [{"Id", "Expected"}, ...], ...} (default, used by the web UI)
+    columnar - {"Id": [...], "Expected": [...]} without the per-row objects
+    arrow    - Arrow IPC stream with Id and Expected columns
+    parquet  - Parquet file with Id and Expected columns
+
+Without a usable Accept entry (e.g. only text/csv) the response is JSON.
+JSON is encoded with orjson when it is installed; Arrow and Parquet need pyarrow.
+"""
+
+import io
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+MEDIA_TYPES = {
+    "json": "application/json",
+    "columnar": "application/vnd.columnar+json",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet"
+}
+
+# Other media types clients commonly send for the same formats
+MEDIA_TYPE_ALIASES = {
+    "*/*": "json",
+    "application/*": "json",
+    "application/x-parquet": "parquet",
+    "application/vnd.apache.arrow.file": "arrow"
+}
+
+FILE_EXTENSIONS = {"arrow": "arrows", "parquet": "parquet"}
+
+
+class UnsupportedFormatError(ValueError):
+    """Raised when none of the requested formats can be produced"""
+
+
+def _accepted_formats(accept):
+    """Supported formats named in an Accept header, best first (unknown media types are skipped)"""
+    candidates = []
+    for position, item in enumerate(accept.split(",")):
+        parts = [part.strip() for part in item.split(";")]
+        media_type = parts[0].lower()
+        quality = 1.0
+        for param in parts[1:]:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if quality <= 0:
+            continue
+        name = MEDIA_TYPE_ALIASES.get(media_type)
+        if name is None:
+            name = next((key for key, value in MEDIA_TYPES.items() if value == media_type), None)
+        if name is not None:
+            candidates.append((-quality, position, name))
+    return [name for _, _, name in sorted(candidates)]
+
+
+def negotiate_format(accept=None, requested=None):
+    """
+    Choose the response format from an explicit ?format= value or the Accept header
+
+    Accept entries that cannot be produced are skipped; when none is left the
+    response falls back to JSON, as it did before formats were negotiated.
+
+    Raises:
+        UnsupportedFormatError when ?format= is unknown or its library is missing
+    """
+    if requested:
+        if requested not in MEDIA_TYPES:
+            raise UnsupportedFormatError(f"Unknown format '{requested}'; choose one of {', '.join(MEDIA_TYPES)}")
+        if requested in ("arrow", "parquet") and not arrow_available():
+            raise UnsupportedFormatError(f"The {requested} format needs pyarrow, which is not installed")
+        return requested
+
+    if accept:
+        for name in _accepted_formats(accept):
+            if name not in ("arrow", "parquet") or arrow_available():
+                return name
+    return "json"
+
+
+def arrow_available():
+
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def dumps(payload):
+    """Encode a payload as JSON bytes (numpy arrays and scalars become lists and numbers)"""
+    if orjson is not None:
+        # Arrays orjson cannot write natively (e.g. text Ids) fall through to tolist()
+        return orjson.dumps(payload, default=lambda value: value.tolist(), option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, default=lambda value: value.tolist()).encode("utf-8")
+
+
+def _arrow_table(predictions):
+
+    import pyarrow as pa
+
+    return pa.table({"Id": pa.array(predictions.ids), "Expected": pa.array(predictions.expected, type=pa.float64())})
+
+
+def encode_predictions(predictions, name):
+    """
+    Encode Predictions in a columnar format straight from their arrays (blocking)
+
+    Returns:
+        Response body as bytes
+    """
+    if name == "columnar":
+        return dumps({"Id": predictions.ids, "Expected": predictions.expected})
+
+    if name == "arrow":
+        import pyarrow as pa
+
+        table = _arrow_table(predictions)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+    if name == "parquet":
+        import pyarrow.parquet as pq
+
+        buffer = io.BytesIO()
+        pq.write_table(_arrow_table(predictions), buffer)
+        return buffer.getvalue()
+
+    raise UnsupportedFormatError(f"Not a columnar format: {name}")
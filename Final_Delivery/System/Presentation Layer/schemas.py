@@ -0,0 +1,92 @@
+"""
+Request schemas for the JSON prediction endpoint.
+
+The models are built once at import time; FastAPI compiles their validators
+when the route is registered, so nothing is rebuilt per request.
+"""
+
+from typing import List, Optional, Union
+
+import pandas as pd
+from pydantic import BaseModel, Field, field_validator
+
+
+# Columns of IN/data_test.csv used as model input, in file order
+FEATURE_COLUMNS = [
+    "Web_GRP", "TV_GRP", "Facebook_GRP", "Tone_of_Ad", "No_of_Web_Banners", "Weather",
+    "Avg_Temperature", "No_of_Rabbits", "Network_Five_G", "No_of_iPhone_14_Sold",
+    "No_of_Big_Cities", "Health_Index", "Sustainability_Index", "Choc_Capital_Distance",
+    "No_of_Competitors", "Import_Regulations", "Time_in_Region", "Percent_Internet_Access",
+    "Percent_Uni_Degrees", "Percent_Unemployed", "Gender", "Coffee_Consumption",
+    "Avg_No_of_Cust_Complaints", "Avg_Customer_Age"
+]
+
+# Columns that may hold text; everything else is loaded as float64
+TEXT_COLUMNS = {"Tone_of_Ad", "Weather", "Coffee_Consumption"}
+
+# Gender levels in code order (0 = Female, 1 = Male), as in preprocessing.json
+GENDER_LEVELS = ["Female", "Male"]
+
+# Largest list accepted by /predict/json; bigger inputs should use the CSV endpoints
+MAX_JSON_RECORDS = 1000
+
+
+class RegionRecord(BaseModel):
+    """One region, with the same columns as data_test.csv (null marks a missing value)"""
+
+    Id: Optional[int] = None
+    Web_GRP: Optional[float] = Field(...)
+    TV_GRP: Optional[float] = Field(...)
+    Facebook_GRP: Optional[float] = Field(...)
+    Tone_of_Ad: Optional[str] = Field(...)
+    No_of_Web_Banners: Optional[float] = Field(...)
+    Weather: Optional[str] = Field(...)
+    Avg_Temperature: Optional[float] = Field(...)
+    No_of_Rabbits: Optional[float] = Field(...)
+    Network_Five_G: Optional[float] = Field(...)
+    No_of_iPhone_14_Sold: Optional[float] = Field(...)
+    No_of_Big_Cities: Optional[float] = Field(...)
+    Health_Index: Optional[float] = Field(...)
+    Sustainability_Index: Optional[float] = Field(...)
+    Choc_Capital_Distance: Optional[float] = Field(...)
+    No_of_Competitors: Optional[float] = Field(...)
+    Import_Regulations: Optional[float] = Field(...)
+    Time_in_Region: Optional[float] = Field(...)
+    Percent_Internet_Access: Optional[float] = Field(...)
+    Percent_Uni_Degrees: Optional[float] = Field(...)
+    Percent_Unemployed: Optional[float] = Field(...)
+    Gender: Optional[int] = Field(...)
+    Coffee_Consumption: Optional[str] = Field(...)
+    Avg_No_of_Cust_Complaints: Optional[float] = Field(...)
+    Avg_Customer_Age: Optional[float] = Field(...)
+
+    @field_validator("Gender", mode="before")
+    @classmethod
+    def gender_code(cls, value):
+        """
+        Accept Gender as a code (0/1) or a level name, and always store the code,
+        so a list mixing both still becomes one numeric column
+        """
+        if isinstance(value, str):
+            if value.strip() in GENDER_LEVELS:
+                return GENDER_LEVELS.index(value.strip())
+            if value.strip().isdigit():
+                return int(value.strip())
+            raise ValueError(f"Gender must be a code (0/1) or one of {', '.join(GENDER_LEVELS)}")
+        return value
+
+
+PredictionRequest = Union[RegionRecord, List[RegionRecord]]
+
+
+def records_to_frame(records):
+    """
+    Build a DataFrame from validated records
+
+    Records without an Id get their 1-based position, like the CSV endpoints.
+    """
+    columns = {"Id": [r.Id if r.Id is not None else i for i, r in enumerate(records, start=1)]}
+    for name in FEATURE_COLUMNS:
+        values = [getattr(r, name) for r in records]
+        columns[name] = values if name in TEXT_COLUMNS else pd.array(values, dtype="float64").to_numpy(na_value=float("nan"))
+    return pd.DataFrame(columns)
@@ -0,0 +1,262 @@
+"""
+HTTP caching and precompression for static files.
+
+Static responses carry a content-hash ETag, so unchanged files revalidate with
+a 304. URLs with a ?v=<hash> query (written into index.html by CachedPage)
+never change content and are cached for a year. Text outputs of the pipeline
+get gzip (and brotli, when installed) variants written next to them by
+precompress_directory(), and the variant matching Accept-Encoding is served.
+
+Run this file directly to precompress OUT/ (run_pipeline.py does this).
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import stat
+import threading
+from pathlib import Path
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Files worth compressing; images are already compressed
+COMPRESSIBLE_SUFFIXES = {".csv", ".json", ".html", ".css", ".js", ".svg", ".txt"}
+# Files smaller than this are sent as they are
+MIN_COMPRESS_BYTES = 1024
+
+# Preferred first when the client accepts both
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Length of the version hash appended to asset URLs
+VERSION_LENGTH = 12
+
+_hashes = {}
+_hash_lock = threading.Lock()
+
+
+def content_hash(path, stat_result=None):
+    """SHA-256 of a file, recomputed only when its size or mtime changes"""
+    path = str(path)
+    stat_result = stat_result or os.stat(path)
+    identity = (stat_result.st_size, stat_result.st_mtime_ns)
+    with _hash_lock:
+        cached = _hashes.get(path)
+    if cached is not None and cached[0] == identity:
+        return cached[1]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    value = digest.hexdigest()
+    with _hash_lock:
+        _hashes[path] = (identity, value)
+    return value
+
+
+def accepted_encodings(request_headers):
+
+    accept = request_headers.get("accept-encoding", "")
+    return {item.split(";")[0].strip().lower() for item in accept.split(",") if "q=0" not in item.replace(" ", "")}
+
+
+def etag_matches(request_headers, etag):
+
+    if_none_match = request_headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def precompress_file(path):
+    """
+    Write .gz (and .br) variants of a file unless they are already up to date
+
+    Returns:
+        List of variant paths written
+    """
+    path = Path(path)
+    data = None
+    written = []
+    for encoding, suffix in ENCODINGS:
+        if encoding == "br" and brotli is None:
+            continue
+        variant = path.with_name(path.name + suffix)
+        if variant.exists() and variant.stat().st_mtime_ns >= path.stat().st_mtime_ns:
+            continue
+        if data is None:
+            data = path.read_bytes()
+        compressed = brotli.compress(data, quality=11) if encoding == "br" else gzip.compress(data, 9, mtime=0)
+        # Write then rename so the server never serves a partial variant
+        temp = variant.with_name(variant.name + ".tmp")
+        temp.write_bytes(compressed)
+        os.replace(temp, variant)
+        written.append(variant)
+    return written
+
+
+def precompress_directory(directory):
+    """Precompress every compressible file directly inside directory"""
+    written = []
+    for path in sorted(Path(directory).iterdir()):
+        if path.is_file() and path.suffix.lower() in COMPRESSIBLE_SUFFIXES and path.stat().st_size >= MIN_COMPRESS_BYTES:
+            written.extend(precompress_file(path))
+    return written
+
+
+class CachedStaticFiles(StaticFiles):
+    """
+    StaticFiles with content-hash ETags, Cache-Control and precompressed variants
+    """
+
+    async def get_response(self, path, scope):
+
+        if scope["method"] in ("GET", "HEAD"):
+            try:
+                full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path)
+            except OSError:
+                stat_result = None
+            if stat_result is not None and stat.S_ISREG(stat_result.st_mode):
+                # Hashing a new or changed file reads all of it, so keep it off the event loop
+                return await anyio.to_thread.run_sync(self.file_response, full_path, stat_result, scope)
+        # Other methods, directories and missing files are answered by StaticFiles
+        return await super().get_response(path, scope)
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        """Build the response for a regular file (blocking: may hash the file)"""
+        request_headers = Headers(scope=scope)
+        digest = content_hash(full_path, stat_result)
+
+        # A matching ?v= means the URL is tied to this exact content
+        version = re.search(r"(?:^|&)v=([0-9a-f]+)", scope.get("query_string", b"").decode("latin-1"))
+        versioned = version is not None and digest.startswith(version.group(1))
+        headers = {
+            "cache-control": IMMUTABLE_CACHE_CONTROL if versioned else REVALIDATE_CACHE_CONTROL,
+            "vary": "Accept-Encoding"
+        }
+
+        path, served_stat, encoding = full_path, stat_result, None
+        accepted = accepted_encodings(request_headers)
+        for name, suffix in ENCODINGS:
+            if name not in accepted:
+                continue
+            try:
+                variant_stat = os.stat(str(full_path) + suffix)
+            except OSError:
+                continue
+            if variant_stat.st_mtime_ns >= stat_result.st_mtime_ns:
+                path, served_stat, encoding = str(full_path) + suffix, variant_stat, name
+                break
+
+        etag = f'"{digest}-{encoding}"' if encoding else f'"{digest}"'
+        headers["etag"] = etag
+        if etag_matches(request_headers, etag):
+            return Response(status_code=304, headers=headers)
+
+        if encoding:
+            headers["content-encoding"] = encoding
+        media_type = mimetypes.guess_type(str(full_path))[0] or "application/octet-stream"
+        return FileResponse(
+            path,
+            status_code=status_code,
+            stat_result=served_stat,
+            media_type=media_type,
+            headers=headers,
+            method=scope["method"]
+        )
+
+
+class CachedPage:
+    """
+    An HTML page kept in memory (with a gzip copy) and re-read only when it
+    or one of the assets it links to changes
+
+    Links to files under the given URL prefixes get a ?v=<content hash> query,
+    so browsers can cache those files indefinitely.
+    """
+
+    def __init__(self, path, asset_dirs):
+
+        self.path = Path(path)
+        self.asset_dirs = {prefix: Path(directory) for prefix, directory in asset_dirs.items()}
+        self._pattern = re.compile(
+            "(" + "|".join(re.escape(prefix) for prefix in self.asset_dirs) + r")/([\w.\-]+\.\w+)(?=['\")])"
+        )
+        self._identity = None
+        self._page = None
+        self._lock = threading.Lock()
+
+    def _assets(self, text):
+
+        return sorted({(m.group(1), m.group(2)) for m in self._pattern.finditer(text)})
+
+    def _identity_of(self, assets):
+
+        parts = [self.path.stat().st_mtime_ns]
+        for prefix, name in assets:
+            path = self.asset_dirs[prefix] / name
+            parts.append(path.stat().st_mtime_ns if path.exists() else None)
+        return tuple(parts)
+
+    def _render(self):
+
+        text = self.path.read_text(encoding="utf-8")
+        assets = self._assets(text)
+
+        def versioned(match):
+            path = self.asset_dirs[match.group(1)] / match.group(2)
+            if not path.exists():
+                return match.group(0)
+            return f"{match.group(0)}?v={content_hash(path)[:VERSION_LENGTH]}"
+
+        body = self._pattern.sub(versioned, text).encode("utf-8")
+        return {
+            "assets": assets,
+            "body": body,
+            "gzip": gzip.compress(body, 6, mtime=0),
+            "etag": f'"{hashlib.sha256(body).hexdigest()}"'
+        }
+
+    def get(self):
+        """Current rendered page ({"body", "gzip", "etag"})"""
+        with self._lock:
+            if self._page is None or self._identity_of(self._page["assets"]) != self._identity:
+                self._page = self._render()
+                self._identity = self._identity_of(self._page["assets"])
+            return self._page
+
+    def response(self, request_headers):
+
+        page = self.get()
+        use_gzip = "gzip" in accepted_encodings(request_headers)
+        etag = page["etag"][:-1] + '-gzip"' if use_gzip else page["etag"]
+        headers = {"etag": etag, "cache-control": REVALIDATE_CACHE_CONTROL, "vary": "Accept-Encoding"}
+        if etag_matches(request_headers, etag):
+            return Response(status_code=304, headers=headers)
+        if use_gzip:
+            headers["content-encoding"] = "gzip"
+            return Response(content=page["gzip"], media_type="text/html", headers=headers)
+        return Response(content=page["body"], media_type="text/html", headers=headers)
+
+
+if __name__ == "__main__":
+    out_dir = Path(__file__).parent.parent / "OUT"
+    written = precompress_directory(out_dir)
+    print(f"✓ Precompressed {len(written)} files in {out_dir}" + ("" if brotli else " (gzip only - brotli not installed)"))
+    for path in written:
+        print(f"  {path.name}")
@@ -6,30 +6,95 @@ This script coordinates the data flow between all POO modules
 import sys
 import os
 
+import pandas as pd
+
 # Add current directory to path to import modules
 current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(os.path.join(current_dir, 'Data Processing Layer'))
 
 from DataIngestionModule import DataIngestionModule
+from DataSchemaModule import CHOCOLATE_SCHEMA
 from PreprocessingTransformationModule import PreprocessingTransformationModule
+from CategoricalEncoderModule import CategoricalEncoderModule
+from FeatureEngineeringModule import FeatureEngineeringModule
 from FeatureAnalysisModule import FeatureAnalysisModule
+from FeatureStoreModule import FeatureStoreModule, append_feature_store, write_feature_store
+from MemoryReportModule import MemoryReportModule
+from WatermarkModule import WatermarkModule
+
+# Copy-on-write: selections and shallow copies share data until one side is
+# modified, so the modules can hand views around instead of full copies
+# (always on from pandas 3, where the option is deprecated). The modules do
+# not depend on it: PreprocessingTransformationModule checks it and copies
+# its input when it is off, and FeatureAnalysisModule never writes its data
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
+
+
+PROCESSED_PATH = 'OUT/processed_data.csv'
+# How far IN/data_training.csv has been processed into PROCESSED_PATH
+WATERMARKS_PATH = 'OUT/ingest_watermarks.json'
+# Memory-mappable binary copy of PROCESSED_PATH, read by the R training script
+FEATURE_STORE_PATH = 'OUT/processed_data.fstore'
+# Categorical codes used in PROCESSED_PATH, read by the R training script
+ENCODER_PATH = 'OUT/categorical_encoder.json'
+# Definitions of the engineered features in PROCESSED_PATH, read by the R training script
+FEATURES_PATH = 'OUT/engineered_features.json'
+
+
+def write_csv(df, path):
+    """Write a CSV file through a temporary file, so a failed write leaves the old one in place"""
+    temp = path + '.tmp'
+    with open(temp, 'w', newline='', encoding='utf-8') as f:
+        df.to_csv(f, index=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp, path)
+
+
+def append_csv(df, path):
+    """Append rows to a CSV file and flush them to disk before returning"""
+    with open(path, 'a', newline='', encoding='utf-8') as f:
+        df.to_csv(f, header=False, index=False)
+        f.flush()
+        os.fsync(f.fileno())
 
 
-def main():
+def main(incremental=False, memory_report=False):
     """
     Main function that executes the entire data analysis pipeline
+
+    With incremental=True only the rows appended to the training data since
+    the last run are ingested and transformed, and they are appended to
+    OUT/processed_data.csv and the feature store; the feature analysis then
+    runs on the updated feature store, and is skipped when there are no new
+    rows. The watermarks are saved only once both outputs are written, and
+    rows a failed run appended before that are dropped by the next one.
+
+    With memory_report=True the memory high-water mark of each step is
+    printed at the end, in copies of the loaded data; plot rendering is left
+    out of it.
     """
     print("=" * 60)
     print("CHOCOLATES PROJECT - DATA ANALYSIS PIPELINE")
     print("=" * 60)
     
+    memory = MemoryReportModule(enabled=memory_report)
+    
     try:
         # Step 1: Data ingestion
         print("\nSTEP 1: DATA INGESTION")
         print("-" * 30)
         
-        data_ingestor = DataIngestionModule('IN/data_training.csv')
-        df = data_ingestor.load_data()
+        data_ingestor = DataIngestionModule('IN/data_training.csv', schema=CHOCOLATE_SCHEMA)
+        watermarks = WatermarkModule(WATERMARKS_PATH)
+        # A full run records the watermarks too, so a later incremental run appends to its output;
+        # without the processed file as of the watermarks there is nothing to append to, and without
+        # the saved encoder and feature spec the new rows could be encoded or derived differently
+        can_append = incremental and all(os.path.exists(path) for path in (ENCODER_PATH, FEATURES_PATH, FEATURE_STORE_PATH)) \
+            and watermarks.restore_output(PROCESSED_PATH) \
+            and FeatureStoreModule(FEATURE_STORE_PATH).header['rows'] == watermarks.rows()
+        df = data_ingestor.load_delta(watermarks, reset=not can_append)
         
         if df is None:
             print("X Error: Could not load data")
@@ -38,37 +103,77 @@ def main():
         # Show head and size
         data_ingestor.show_head()
         data_ingestor.show_dataset_size()
+        memory.set_data(df)
+        memory.checkpoint("1 Data ingestion")
         
         # Step 2: Preprocessing and transformation
         print("\nSTEP 2: PREPROCESSING AND TRANSFORMATION")
         print("-" * 45)
         
-        preprocessor = PreprocessingTransformationModule(df)
-        
-        # Complete data analysis (missing values, columns, size, unique values, data types)
-        print("\n2.1 Complete data analysis...")
-        analysis_results = preprocessor.complete_data_analysis()
-        
-        # Transform categorical variables
-        print("\n2.2 Transforming categorical variables...")
-        processed_df = preprocessor.transform_categorical_to_numerical()
-        
-        if processed_df is not None:
-            print("\nOK Transformation completed successfully")
-            
-            # Save modified CSV in OUT
-            print("\n5. Saving modified CSV...")
-            processed_df.to_csv('OUT/processed_data.csv', index=False)
-            print("Modified CSV saved in OUT/processed_data.csv")
+        if not data_ingestor.delta_report['reset']:
+            if len(df) == 0:
+                print("\nOK No new rows since the last run - outputs are up to date")
+                return {'data_ingestor': data_ingestor, 'raw_data': df}
+
+            # Only the new rows are transformed and appended
+            print(f"\n2.1 Transforming {len(df)} new rows...")
+            preprocessor = None
+            encoder = CategoricalEncoderModule.load(ENCODER_PATH)
+            features = FeatureEngineeringModule.load(FEATURES_PATH)
+            new_rows = next(PreprocessingTransformationModule.transform_chunks([df], encoder))
+            new_rows = features.add_features(new_rows)
+            append_csv(new_rows, PROCESSED_PATH)
+            append_feature_store(new_rows, FEATURE_STORE_PATH)
+            data_ingestor.commit_delta(outputs=[PROCESSED_PATH])
+            print(f"{len(new_rows)} rows appended to {PROCESSED_PATH} and {FEATURE_STORE_PATH}")
+            # Copied from the mapped feature store instead of parsing the processed CSV again
+            # (some pandas reductions write into their input, which the read-only mapping refuses)
+            processed_df = FeatureStoreModule(FEATURE_STORE_PATH).to_frame().copy()
         else:
-            print("X Error in preprocessing")
-            return
+            preprocessor = PreprocessingTransformationModule(df)
+            
+            # Complete data analysis (missing values, columns, size, unique values, data types)
+            print("\n2.1 Complete data analysis...")
+            analysis_results = preprocessor.complete_data_analysis()
+            
+            # Transform categorical variables
+            print("\n2.2 Transforming categorical variables...")
+            processed_df = preprocessor.transform_categorical_to_numerical()
+            
+            if processed_df is not None:
+                print("\nOK Transformation completed successfully")
+                
+                # Engineered features, from the spec shared with the R scripts
+                print("\n2.3 Engineering features...")
+                features = FeatureEngineeringModule()
+                processed_df = features.add_features(processed_df)
+                print(f"Added {', '.join(features.names)}")
+                
+                # Save modified CSV in OUT
+                print("\n5. Saving modified CSV...")
+                write_csv(processed_df, PROCESSED_PATH)
+                print("Modified CSV saved in OUT/processed_data.csv")
+                encoder = preprocessor.encoder
+                encoder.save(ENCODER_PATH)
+                print(f"Categorical encoder saved in {ENCODER_PATH}")
+                features.export(FEATURES_PATH)
+                print(f"Engineered feature definitions saved in {FEATURES_PATH}")
+                write_feature_store(processed_df, FEATURE_STORE_PATH, category_maps=encoder.mappings)
+                print(f"Feature store saved in {FEATURE_STORE_PATH}")
+                data_ingestor.commit_delta(outputs=[PROCESSED_PATH])
+            else:
+                print("X Error in preprocessing")
+                return
+        
+        memory.checkpoint("2 Preprocessing and transformation")
         
         # Step 3: Feature analysis
         print("\nSTEP 3: FEATURE ANALYSIS")
         print("-" * 38)
         
-        analyzer = FeatureAnalysisModule(processed_df)
+        # The engineered features are combinations of the analyzed columns
+        # (Total_ad_spend is an exact sum), which would make the ANOVA degenerate
+        analyzer = FeatureAnalysisModule(processed_df.drop(columns=features.names), plotting=memory.excluded)
         
         # Complete feature analysis
         print("\n3.1 Complete feature analysis...")
@@ -79,17 +184,24 @@ def main():
         print("-" * 35)
         
         analyzer.export_analysis_results('OUT/feature_analysis_results.json')
+        memory.checkpoint("3-4 Feature analysis and export")
         
         print("\nOK PIPELINE COMPLETED SUCCESSFULLY")
         print("=" * 60)
         print("\nFiles generated in OUT/:")
-        print("- processed_data.csv (clean data)")
+        print("- processed_data.csv (clean data with engineered features)")
+        print("- processed_data.fstore (clean data, binary feature store)")
+        print("- categorical_encoder.json (categorical codes)")
+        print("- engineered_features.json (engineered feature definitions)")
         print("- feature_analysis_results.json (analysis)")
         print("- CorrelationHeatmap.png")
         print("- FeatureImportance.png")
         print("- ScatterCorrelations.png")
         print("- Boxplots.png")
         
+        if memory_report:
+            memory.report()
+        
         return {
             'data_ingestor': data_ingestor,
             'preprocessor': preprocessor,
@@ -118,7 +230,7 @@ def demonstrate_module_usage():
     # Example of DataIngestionModule usage
     print("\n1) DataIngestionModule - Individual example:")
     try:
-        data_ingestor = DataIngestionModule('IN/data_training.csv')
+        data_ingestor = DataIngestionModule('IN/data_training.csv', schema=CHOCOLATE_SCHEMA)
         df = data_ingestor.load_data()
         if df is not None:
             print(f"   OK Data loaded: {df.shape[0]} rows, {df.shape[1]} columns")
@@ -130,7 +242,7 @@ def demonstrate_module_usage():
     # Example of PreprocessingTransformationModule usage
     print("\n2) PreprocessingTransformationModule - Individual example:")
     try:
-        data_ingestor = DataIngestionModule('IN/data_training.csv')
+        data_ingestor = DataIngestionModule('IN/data_training.csv', schema=CHOCOLATE_SCHEMA)
         df = data_ingestor.load_data()
         
         if df is not None:
@@ -148,7 +260,7 @@ def demonstrate_module_usage():
     # Example of FeatureAnalysisModule usage
     print("\n3) FeatureAnalysisModule - Individual example:")
     try:
-        data_ingestor = DataIngestionModule('IN/data_training.csv')
+        data_ingestor = DataIngestionModule('IN/data_training.csv', schema=CHOCOLATE_SCHEMA)
         df = data_ingestor.load_data()
         
         if df is not None:
@@ -161,11 +273,25 @@ def demonstrate_module_usage():
                 print("   - Complete feature analysis available")
     except Exception as e:
         print(f"   X Error: {e}")
+    
+    # Example of chunked ingestion for files too large to load at once
+    print("\n4) DataIngestionModule - Chunked example:")
+    try:
+        data_ingestor = DataIngestionModule('IN/data_training.csv', schema=CHOCOLATE_SCHEMA)
+        chunks = data_ingestor.iter_chunks(chunk_rows=250, usecols=['Id', 'sales', 'Tone_of_Ad', 'Weather'])
+        total_rows = 0
+        total_sales = 0.0
+        for chunk in PreprocessingTransformationModule.transform_chunks(chunks):
+            total_rows += len(chunk)
+            total_sales += chunk['sales'].sum()
+        print(f"   OK Streamed {total_rows} rows, mean sales {total_sales / total_rows:.2f}")
+    except Exception as e:
+        print(f"   X Error: {e}")
 
 
 if __name__ == "__main__":
     # Ejecutar el pipeline principal
-    results = main()
+    results = main(incremental='--incremental' in sys.argv, memory_report='--memory-report' in sys.argv)
     
     print("\nChocolates project ready to use!")
     print("Pipeline executed successfully")
\ No newline at end of file
@@ -60,6 +60,7 @@ def run_command(cmd, description):
 
     if result.returncode != 0:
         print(f"❌ Error: {description} failed")
+        print(result.stdout)
         print(result.stderr)
         return False
 
@@ -81,7 +82,9 @@ def main():
 
     # Step 1: Data Processing (Python)
     print_step(1, "DATA PROCESSING")
-    if not run_command(f'"{python_exe}" main.py', "Data processing"):
+    # Only the rows added since the last run are processed when asked for (run_pipeline.py --incremental)
+    incremental = " --incremental" if "--incremental" in sys.argv else ""
+    if not run_command(f'"{python_exe}" main.py{incremental}', "Data processing"):
         sys.exit(1)
 
     # Step 2: Model Training and Selection (R)
@@ -113,8 +116,21 @@ def main():
         print("\n❌ Pipeline incomplete - some files are missing")
         sys.exit(1)
 
-    # Step 4: Summary
-    print_step(4, "PIPELINE COMPLETE")
+    # The API only scores the portable export natively if it matches predict.R
+    manifest_path = BASE_DIR / "OUT" / "models" / "portable" / "model_manifest.json"
+    if manifest_path.exists():
+        if not run_command(f'"{python_exe}" "Presentation Layer/native_model.py"', "Native vs R parity check"):
+            manifest_path.unlink()
+            print("❌ Native predictions differ from predict.R - portable export removed, the API will use R")
+            sys.exit(1)
+
+    # Step 4: Precompress text outputs for the API's static file server
+    print_step(4, "PRECOMPRESSING STATIC OUTPUTS")
+    if not run_command(f'"{python_exe}" "Presentation Layer/static_files.py"', "Static output precompression"):
+        sys.exit(1)
+
+    # Step 5: Summary
+    print_step(5, "PIPELINE COMPLETE")
     print("✓ Data processed successfully")
     print("✓ Model trained and saved (R XGBoost)")
     print("✓ Visualizations generated")
@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# The layers are script directories, not packages: import their modules by name
+SYSTEM_DIR = Path(__file__).resolve().parent.parent
+for layer in ("Data Processing Layer", "Presentation Layer"):
+    sys.path.insert(0, str(SYSTEM_DIR / layer))
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from DataIngestionModule import DataIngestionModule
+from PreprocessingTransformationModule import PreprocessingTransformationModule
+
+
+def write_rows(path, rows):
+
+    pd.DataFrame({
+        'Id': range(rows),
+        'sales': np.arange(rows) * 1.5,
+        'Weather': ['sunny', 'cloudy', 'rainy'] * (rows // 3) + ['sunny'] * (rows % 3),
+    }).to_csv(path, index=False)
+
+
+def test_chunks_cover_the_file_in_order(tmp_path):
+
+    path = tmp_path / "data.csv"
+    write_rows(path, 10)
+
+    chunks = list(DataIngestionModule(str(path)).iter_chunks(chunk_rows=4))
+
+    assert [len(chunk) for chunk in chunks] == [4, 4, 2]
+    whole = pd.concat(chunks)
+    assert whole['Id'].tolist() == list(range(10))
+    assert whole.index.tolist() == list(range(10))
+    pd.testing.assert_frame_equal(whole, pd.read_csv(path))
+
+
+def test_usecols_and_first_chunk_dtypes_are_kept(tmp_path):
+
+    path = tmp_path / "data.csv"
+    # The second chunk's sales are whole numbers, which would be parsed as int64 on their own
+    path.write_text("Id,sales,Weather\n1,1.5,sunny\n2,2.5,rainy\n3,3,sunny\n4,4,cloudy\n")
+
+    chunks = list(DataIngestionModule(str(path)).iter_chunks(chunk_rows=2, usecols=['Id', 'sales']))
+
+    assert [list(chunk.columns) for chunk in chunks] == [['Id', 'sales']] * 2
+    assert [chunk['sales'].dtype for chunk in chunks] == [np.float64, np.float64]
+
+
+def test_incompatible_later_chunk_is_reported(tmp_path):
+
+    path = tmp_path / "data.csv"
+    path.write_text("Id,Gender\n1,0\n2,1\n3,x\n")
+
+    with pytest.raises(ValueError, match="Column types changed"):
+        list(DataIngestionModule(str(path)).iter_chunks(chunk_rows=2))
+
+
+def test_files_are_streamed_with_continuous_row_numbers(tmp_path):
+
+    write_rows(tmp_path / "a.csv", 3)
+    write_rows(tmp_path / "b.csv", 2)
+
+    ingestor = DataIngestionModule(str(tmp_path))
+    chunks = list(ingestor.iter_chunks(chunk_rows=2))
+
+    assert pd.concat(chunks).index.tolist() == list(range(5))
+    assert [timing['rows'] for timing in ingestor.file_timings] == [3, 2]
+
+
+def test_transform_chunks_encodes_each_chunk(tmp_path):
+
+    path = tmp_path / "data.csv"
+    write_rows(path, 5)
+
+    chunks = DataIngestionModule(str(path)).iter_chunks(chunk_rows=2)
+    encoded = list(PreprocessingTransformationModule.transform_chunks(chunks))
+
+    assert pd.concat(encoded)['Weather'].tolist() == [0, 1, 2, 0, 0]
@@ -0,0 +1,28 @@
+import gzip
+import io
+
+import pytest
+
+from CompressedInputModule import PrefetchReader
+
+
+def test_prefetch_reader_returns_the_source_in_order():
+
+    source = gzip.open(io.BytesIO(gzip.compress(b"abc" * 1000)), "rb")
+    reader = PrefetchReader(source, block_size=7, blocks=2)
+
+    assert reader.read() == b"abc" * 1000
+    reader.close()
+
+
+def test_read_error_is_raised_again_by_later_reads(tmp_path):
+
+    path = tmp_path / "data.csv.gz"
+    path.write_bytes(gzip.compress(b"Id,x\n" + b"1,10\n" * 1000)[:-20])
+    reader = PrefetchReader(gzip.open(path, "rb"))
+
+    with pytest.raises(EOFError):
+        reader.read()
+    with pytest.raises(EOFError):
+        reader.read()
+    reader.close()
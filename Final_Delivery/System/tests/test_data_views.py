@@ -0,0 +1,74 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from data_views import CsvDataset, decode_categories, page_rows, summarize
+
+
+def test_page_rows_projects_and_turns_missing_values_into_none():
+
+    frame = pd.DataFrame({"Id": [1, 2, 3], "sales": [1.5, None, 3.0], "Weather": ["sunny", "rainy", "cloudy"]})
+
+    page = page_rows(frame, 1, 5, columns=["Id", "sales"])
+
+    assert page["total"] == 3
+    assert page["columns"] == ["Id", "sales"]
+    assert page["rows"] == [{"Id": 2, "sales": None}, {"Id": 3, "sales": 3.0}]
+    with pytest.raises(KeyError):
+        page_rows(frame, 0, 1, columns=["nope"])
+
+
+def test_decode_categories_maps_codes_to_levels_and_unknown_codes_to_missing():
+
+    frame = pd.DataFrame({"Weather": [0, 2, -1], "Tone_of_Ad": ["funny", "serious", "funny"]})
+
+    decode_categories(frame, {"Weather": ["sunny", "cloudy", "rainy"], "Tone_of_Ad": ["funny", "serious"]})
+
+    assert frame["Weather"].tolist()[:2] == ["sunny", "rainy"]
+    assert pd.isna(frame["Weather"].iloc[2])
+    assert frame["Tone_of_Ad"].tolist() == ["funny", "serious", "funny"]
+
+
+def test_summarize_overall_and_per_group():
+
+    frame = pd.DataFrame({"Id": [1, 2, 3, 4], "sales": [1.0, 2.0, 3.0, 4.0], "Weather": ["sunny", "sunny", "rainy", "rainy"]})
+
+    summary = summarize(frame, by=("Weather", "Tone_of_Ad"))
+
+    assert summary["count"] == 4
+    assert list(summary["columns"]) == ["sales"]
+    assert summary["columns"]["sales"]["mean"] == 2.5
+    assert summary["columns"]["sales"]["q50"] == 2.5
+    assert list(summary["groups"]) == ["Weather"]
+    assert summary["groups"]["Weather"]["rainy"]["sales"]["min"] == 3.0
+    assert summary["groups"]["Weather"]["sunny"]["sales"]["count"] == 2
+
+
+def test_dataset_joins_decodes_and_reloads_when_the_file_changes(tmp_path):
+
+    processed = tmp_path / "processed_data.csv"
+    inputs = tmp_path / "data_test.csv"
+    levels = tmp_path / "categorical_encoder.json"
+    pd.DataFrame({"Id": [1, 2], "Expected": [10.0, 20.0]}).to_csv(processed, index=False)
+    pd.DataFrame({"Id": [2, 1], "Weather": [1, 0], "x": [0, 0]}).to_csv(inputs, index=False)
+    levels.write_text(json.dumps({"categorical_levels": {"Weather": ["sunny", "cloudy"]}}))
+
+    dataset = CsvDataset(processed, join_path=inputs, levels_path=levels)
+    frame = dataset.frame()
+    assert frame.columns.tolist() == ["Id", "Expected", "Weather"]
+    assert frame["Weather"].tolist() == ["sunny", "cloudy"]
+    assert dataset.frame() is frame
+    first = dataset.summary()
+
+    pd.DataFrame({"Id": [1, 2, 3], "Expected": [1.0, 2.0, 3.0]}).to_csv(processed, index=False)
+    os.utime(processed, ns=(0, os.stat(processed).st_mtime_ns + 1_000_000))
+    assert dataset.info()["rows"] == 3
+    assert dataset.summary()["count"] == 3 != first["count"]
+
+
+def test_missing_file_is_reported():
+
+    with pytest.raises(FileNotFoundError):
+        CsvDataset("does/not/exist.csv").frame()
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import native_model
+from FeatureEngineeringModule import ENGINEERED_FEATURES, FeatureEngineeringModule, FeatureExpression
+
+
+def test_expression_matches_numpy_across_blocks():
+
+    rng = np.random.default_rng(0)
+    columns = {'a': rng.integers(0, 100, 1000), 'b': rng.random(1000), 'c': rng.random(1000)}
+
+    expression = FeatureExpression("(a - b) / (c + 1) * -a + 2 * (b - (c - a))")
+    assert expression.inputs == ['a', 'b', 'c']
+
+    result = expression.evaluate(columns, 1000, block_rows=64)
+    a, b, c = columns['a'], columns['b'], columns['c']
+    np.testing.assert_allclose(result, (a - b) / (c + 1) * -a + 2 * (b - (c - a)))
+    assert result.dtype == np.float64
+
+
+def test_division_by_zero_gives_inf_and_nan_like_r():
+
+    result = FeatureExpression("a / b").evaluate({'a': np.array([1, 0]), 'b': np.array([0, 0])}, 2)
+    assert np.isinf(result[0]) and np.isnan(result[1])
+
+
+@pytest.mark.parametrize("expression", [
+    "__import__('os').system('true')",
+    "a.real",
+    "a[0]",
+    "a ** 2",
+    "a if b else c",
+    "lambda: a",
+    "a < b",
+    "'text'",
+    "True + a",
+    "[a, b]",
+])
+def test_unsafe_or_unsupported_syntax_is_rejected(expression):
+
+    with pytest.raises(ValueError, match="Unsupported syntax"):
+        FeatureExpression(expression)
+
+
+def test_module_adds_the_default_features():
+
+    df = pd.DataFrame({
+        'Web_GRP': [10, 20], 'TV_GRP': [5, 0], 'Facebook_GRP': [4, 9],
+        'No_of_Competitors': [3, 6], 'No_of_Big_Cities': [2, 0],
+        'Percent_Internet_Access': [50, 80], 'Percent_Uni_Degrees': [20, 10],
+    })
+
+    features = FeatureEngineeringModule()
+    features.add_features(df)
+
+    assert features.names == list(ENGINEERED_FEATURES)
+    assert df['Web_Facebook_ratio'].tolist() == [2.0, 2.0]
+    assert df['Total_ad_spend'].tolist() == [19.0, 29.0]
+    assert df['Internet_adoption'].tolist() == [10.0, 8.0]
+
+
+def test_missing_input_column_is_reported():
+
+    with pytest.raises(ValueError, match="Missing column b"):
+        FeatureEngineeringModule({'f': "a + b"}).add_features(pd.DataFrame({'a': [1]}))
+
+
+def test_spec_round_trip(tmp_path):
+
+    path = tmp_path / "features.json"
+    FeatureEngineeringModule({'f': "a * 2", 'g': "f + 1"}).export(path)
+
+    loaded = FeatureEngineeringModule.load(path)
+    assert loaded.spec == {'f': "a * 2", 'g': "f + 1"}
+    assert loaded.add_features(pd.DataFrame({'a': [1.5]}))['g'].tolist() == [4.0]
+
+
+def test_native_model_uses_the_same_evaluator():
+
+    assert native_model.DEFAULT_PREPROCESSING['engineered_features'] == ENGINEERED_FEATURES
+
+    columns = native_model.add_features({'a': np.array([1.0, 2.0])}, {'f': "a * 3", 'g': "f - a"}, 2)
+    assert columns['g'].tolist() == [2.0, 4.0]
+    with pytest.raises(ValueError, match="Unsupported syntax"):
+        native_model.add_features({'a': np.array([1.0])}, {'f': "__import__('os')"}, 1)
+    with pytest.raises(ValueError, match="Missing columns"):
+        native_model.add_features({'a': np.array([1.0])}, {'f': "a + b"}, 1)
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from FeatureStoreModule import ALIGNMENT, FeatureStoreModule, append_feature_store, write_feature_store
+
+
+def frame():
+
+    return pd.DataFrame({
+        'Id': np.array([1, 2, 3], dtype=np.uint32),
+        'sales': [10.5, np.nan, 30.0],
+        'Weather': pd.Categorical(['sunny', None, 'rainy'], categories=['sunny', 'cloudy', 'rainy']),
+        'Tone_of_Ad': [0, 1, 2],
+    })
+
+
+def test_round_trip(tmp_path):
+
+    path = tmp_path / "data.fstore"
+    write_feature_store(frame(), path, category_maps={'Tone_of_Ad': {'funny': 0, 'serious': 1, 'emotional': 2}})
+
+    store = FeatureStoreModule(path)
+    assert store.columns == ['Id', 'sales', 'Weather', 'Tone_of_Ad']
+    assert store.header['rows'] == 3
+    assert store.category_maps == {'Weather': {'sunny': 0, 'cloudy': 1, 'rainy': 2},
+                                   'Tone_of_Ad': {'funny': 0, 'serious': 1, 'emotional': 2}}
+    np.testing.assert_array_equal(store.column('Id'), [1, 2, 3])
+    np.testing.assert_array_equal(store.column('sales'), [10.5, np.nan, 30.0])
+    # Missing categories are NaN, like missing numbers
+    np.testing.assert_array_equal(store.column('Weather'), [0, np.nan, 2])
+    assert store.to_frame().shape == (3, 4)
+
+
+def test_data_is_aligned_and_mapped_read_only(tmp_path):
+
+    path = tmp_path / "data.fstore"
+    write_feature_store(frame(), path, dtype='float32')
+
+    store = FeatureStoreModule(path)
+    assert store.matrix.dtype == np.float32
+    assert store.matrix.offset % ALIGNMENT == 0
+    assert np.shares_memory(store.column('sales'), store.matrix)
+    assert np.shares_memory(store.select(['sales', 'Weather']), store.matrix)
+    with pytest.raises(ValueError):
+        store.column('Id')[0] = 5
+
+
+def test_append_keeps_the_stored_rows(tmp_path):
+
+    path = tmp_path / "data.fstore"
+    write_feature_store(frame(), path)
+    more = frame().iloc[:2].assign(Id=np.array([4, 5], dtype=np.uint32))
+
+    append_feature_store(more, path)
+
+    store = FeatureStoreModule(path)
+    assert store.header['rows'] == 5
+    np.testing.assert_array_equal(store.column('Id'), [1, 2, 3, 4, 5])
+    np.testing.assert_array_equal(store.column('Weather'), [0, np.nan, 2, 0, np.nan])
+
+
+def test_append_rejects_other_columns_or_categories(tmp_path):
+
+    path = tmp_path / "data.fstore"
+    write_feature_store(frame(), path)
+
+    with pytest.raises(ValueError, match="differ"):
+        append_feature_store(frame()[['sales', 'Id', 'Weather', 'Tone_of_Ad']], path)
+    other = frame().assign(Weather=pd.Categorical(['sunny'] * 3, categories=['sunny', 'rainy']))
+    with pytest.raises(ValueError, match="other categories"):
+        append_feature_store(other, path)
+    assert FeatureStoreModule(path).header['rows'] == 3
+
+
+def test_text_columns_and_other_files_are_rejected(tmp_path):
+
+    with pytest.raises(TypeError):
+        write_feature_store(pd.DataFrame({'Weather': ['sunny']}), tmp_path / "text.fstore")
+
+    path = tmp_path / "not_a_store.fstore"
+    path.write_bytes(b"Id,sales\n")
+    with pytest.raises(ValueError, match="not a feature store"):
+        FeatureStoreModule(path)
+
+
+def test_empty_frame(tmp_path):
+
+    path = tmp_path / "empty.fstore"
+    write_feature_store(frame().iloc[:0], path)
+    assert FeatureStoreModule(path).to_frame().shape == (0, 4)
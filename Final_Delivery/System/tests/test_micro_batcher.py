@@ -0,0 +1,104 @@
+import asyncio
+
+import pandas as pd
+import pytest
+
+from micro_batcher import MicroBatcher
+from predictions import Predictions
+
+
+class Scorer:
+    """Scores Id * 10 and records the frames it was given"""
+
+    def __init__(self):
+
+        self.frames = []
+
+    def __call__(self, frame):
+
+        self.frames.append(frame)
+        return Predictions(frame["Id"], frame["Id"] * 10.0), "model-1"
+
+
+def submit_all(batcher, frames):
+
+    async def run():
+        return await asyncio.gather(*(batcher.submit(frame) for frame in frames))
+    return asyncio.run(run())
+
+
+def test_concurrent_requests_are_scored_together_and_split_in_order():
+
+    scorer = Scorer()
+    batcher = MicroBatcher(scorer, window_seconds=0.05, max_rows=1000)
+    frames = [pd.DataFrame({"Id": ids, "x": [1.0] * len(ids)}) for ids in ([3, 1, 2], [7], [5, 4])]
+
+    results = submit_all(batcher, frames)
+
+    assert len(scorer.frames) == 1
+    assert scorer.frames[0]["Id"].tolist() == [3, 1, 2, 7, 5, 4]
+    for frame, (predictions, identity) in zip(frames, results):
+        assert predictions.ids.tolist() == frame["Id"].tolist()
+        assert predictions.expected.tolist() == [i * 10.0 for i in frame["Id"]]
+        assert identity == "model-1"
+    assert batcher.stats()["requests_per_batch_histogram"] == {"3": 1}
+
+
+def test_row_budget_flushes_without_waiting_for_the_window():
+
+    scorer = Scorer()
+    batcher = MicroBatcher(scorer, window_seconds=60, max_rows=3)
+    frames = [pd.DataFrame({"Id": [1, 2]}), pd.DataFrame({"Id": [3]})]
+
+    results = submit_all(batcher, frames)
+
+    assert [p.ids.tolist() for p, _ in results] == [[1, 2], [3]]
+    assert batcher.batches == 1
+
+
+def test_text_and_numeric_columns_are_not_mixed_in_one_batch():
+
+    scorer = Scorer()
+    batcher = MicroBatcher(scorer, window_seconds=0.05, max_rows=1000)
+    frames = [
+        pd.DataFrame({"Id": [1], "Weather": ["sunny"]}),
+        pd.DataFrame({"Id": [2], "Weather": [0]}),
+        pd.DataFrame({"Id": [3], "Weather": ["rainy"]}),
+    ]
+
+    results = submit_all(batcher, frames)
+
+    assert sorted(frame["Id"].tolist() for frame in scorer.frames) == [[1, 3], [2]]
+    assert all(frame["Weather"].map(type).nunique() == 1 for frame in scorer.frames)
+    assert [p.ids.tolist() for p, _ in results] == [[1], [2], [3]]
+
+
+def test_scoring_error_reaches_every_caller_of_the_batch():
+
+    def fail(frame):
+        raise RuntimeError("model unavailable")
+
+    batcher = MicroBatcher(fail, window_seconds=0.01, max_rows=1000)
+
+    async def run():
+        return await asyncio.gather(batcher.submit(pd.DataFrame({"Id": [1]})),
+                                    batcher.submit(pd.DataFrame({"Id": [2]})), return_exceptions=True)
+
+    errors = asyncio.run(run())
+    assert [str(e) for e in errors] == ["model unavailable"] * 2
+
+
+def test_requests_without_ids_get_their_own_row_numbers():
+
+    def score(frame):
+        # Like the scorers: row positions of the batch stand in for missing Ids
+        return Predictions(range(1, len(frame) + 1), frame["x"] * 10.0), "model-1"
+
+    batcher = MicroBatcher(score, window_seconds=0.05, max_rows=1000)
+    frames = [pd.DataFrame({"x": [1.0, 2.0, 3.0]}), pd.DataFrame({"x": [4.0, 5.0]})]
+
+    results = submit_all(batcher, frames)
+
+    assert batcher.batches == 1
+    assert [p.ids.tolist() for p, _ in results] == [[1, 2, 3], [1, 2]]
+    assert [p.expected.tolist() for p, _ in results] == [[10.0, 20.0, 30.0], [40.0, 50.0]]
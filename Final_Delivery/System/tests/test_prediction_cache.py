@@ -0,0 +1,88 @@
+import time
+
+from prediction_cache import PredictionCache, cache_key
+from predictions import Predictions
+
+
+def predictions(rows):
+
+    return Predictions(list(range(rows)), [float(i) for i in range(rows)])
+
+
+def test_key_depends_on_contents_and_model_identity():
+
+    key = cache_key(b"Id,x\n1,2\n", ("model.rds", 1))
+    assert key == cache_key(b"Id,x\n1,2\n", ("model.rds", 1))
+    assert key != cache_key(b"Id,x\n1,3\n", ("model.rds", 1))
+    assert key != cache_key(b"Id,x\n1,2\n", ("model.rds", 2))
+
+
+def test_get_counts_hits_and_misses_peek_does_not():
+
+    cache = PredictionCache()
+    stored = predictions(3)
+    cache.put("a", stored)
+
+    assert cache.get("a") is stored
+    assert cache.get("b") is None
+    assert cache.peek("a") is stored
+    assert cache.peek("b") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+def test_least_recently_used_entry_is_evicted_first():
+
+    cache = PredictionCache(max_entries=2)
+    cache.put("a", predictions(1))
+    cache.put("b", predictions(1))
+    cache.get("a")
+    cache.put("c", predictions(1))
+
+    assert cache.peek("b") is None
+    assert cache.peek("a") is not None and cache.peek("c") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_row_bound_evicts_and_oversized_results_are_not_cached():
+
+    cache = PredictionCache(max_rows=10)
+    cache.put("a", predictions(6))
+    cache.put("b", predictions(6))
+    assert cache.peek("a") is None
+    assert cache.rows == 6
+
+    cache.put("c", predictions(11))
+    assert cache.peek("c") is None
+    assert cache.rows == 6
+
+
+def test_replacing_an_entry_keeps_the_row_count():
+
+    cache = PredictionCache()
+    cache.put("a", predictions(4))
+    cache.put("a", predictions(2))
+    assert cache.rows == 2
+    assert len(cache.peek("a")) == 2
+
+
+def test_expired_entries_are_dropped(monkeypatch):
+
+    cache = PredictionCache(ttl_seconds=10)
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    cache.put("a", predictions(1))
+
+    monkeypatch.setattr(time, "monotonic", lambda: now + 11)
+    assert cache.peek("a") is None
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+    assert cache.rows == 0
+
+
+def test_disabled_cache_stores_nothing():
+
+    cache = PredictionCache(max_entries=0)
+    cache.put("a", predictions(1))
+    assert not cache.enabled
+    assert cache.get("a") is None
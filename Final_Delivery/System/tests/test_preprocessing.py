@@ -0,0 +1,20 @@
+import pandas as pd
+import pytest
+
+from PreprocessingTransformationModule import PreprocessingTransformationModule
+
+
+@pytest.mark.parametrize("copy_on_write", [True, False])
+def test_reset_data_ignores_later_changes_to_the_callers_frame(copy_on_write):
+
+    with pd.option_context("mode.copy_on_write", copy_on_write):
+        frame = pd.DataFrame({"Id": [1, 2], "sales": [1.0, 2.0]})
+        preprocessor = PreprocessingTransformationModule(frame)
+
+        frame.loc[0, "sales"] = 99.0
+        frame["extra"] = 0
+
+        restored = preprocessor.reset_data()
+
+    assert restored["sales"].tolist() == [1.0, 2.0]
+    assert list(restored.columns) == ["Id", "sales"]
@@ -0,0 +1,67 @@
+import io
+import json
+
+import pytest
+
+import response_formats
+from predictions import Predictions
+from response_formats import UnsupportedFormatError, encode_predictions, negotiate_format
+
+
+@pytest.mark.parametrize("accept, expected", [
+    (None, "json"),
+    ("*/*", "json"),
+    ("application/json", "json"),
+    ("text/csv", "json"),
+    ("text/html, text/csv;q=0.5", "json"),
+    ("application/vnd.columnar+json", "columnar"),
+    ("application/json;q=0.5, application/vnd.apache.arrow.stream", "arrow"),
+    ("application/vnd.apache.parquet;q=0.9, application/vnd.columnar+json;q=0.8", "parquet"),
+    ("application/vnd.apache.parquet;q=0, application/vnd.columnar+json", "columnar"),
+    ("application/x-parquet", "parquet"),
+    ("application/vnd.columnar+json, application/vnd.apache.arrow.stream", "columnar"),
+])
+def test_accept_header(accept, expected):
+
+    assert negotiate_format(accept) == expected
+
+
+def test_format_parameter_overrides_accept():
+
+    assert negotiate_format("application/vnd.apache.parquet", requested="columnar") == "columnar"
+    with pytest.raises(UnsupportedFormatError):
+        negotiate_format(None, requested="xml")
+
+
+def test_arrow_formats_are_skipped_without_pyarrow(monkeypatch):
+
+    monkeypatch.setattr(response_formats, "arrow_available", lambda: False)
+    assert negotiate_format("application/vnd.apache.arrow.stream, application/vnd.columnar+json;q=0.5") == "columnar"
+    assert negotiate_format("application/vnd.apache.parquet") == "json"
+    with pytest.raises(UnsupportedFormatError):
+        negotiate_format(None, requested="parquet")
+
+
+def test_encoded_columns_round_trip():
+
+    predictions = Predictions([3, 1, 2], [30.5, 10.25, 20.0])
+
+    columnar = json.loads(encode_predictions(predictions, "columnar"))
+    assert columnar == {"Id": [3, 1, 2], "Expected": [30.5, 10.25, 20.0]}
+
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+    arrow = pa.ipc.open_stream(encode_predictions(predictions, "arrow")).read_all()
+    parquet = pq.read_table(io.BytesIO(encode_predictions(predictions, "parquet")))
+    for table in (arrow, parquet):
+        assert table.column("Id").to_pylist() == [3, 1, 2]
+        assert table.column("Expected").to_pylist() == [30.5, 10.25, 20.0]
+
+    with pytest.raises(UnsupportedFormatError):
+        encode_predictions(predictions, "json")
+
+
+def test_text_ids_are_encoded_as_json_strings():
+
+    predictions = Predictions(["A-1", "B-2"], [1.0, 2.0])
+    assert json.loads(encode_predictions(predictions, "columnar")) == {"Id": ["A-1", "B-2"], "Expected": [1.0, 2.0]}
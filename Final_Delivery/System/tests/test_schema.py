@@ -0,0 +1,89 @@
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from DataIngestionModule import DataIngestionModule
+from DataSchemaModule import CHOCOLATE_SCHEMA, DataSchemaModule, SchemaValidationError, smallest_int_dtype
+
+
+SCHEMA = DataSchemaModule({
+    'Id': {'kind': 'int', 'min': 0, 'max': 70000, 'required': True},
+    'Gender': {'kind': 'int', 'min': 0, 'max': 1, 'required': True},
+    'Temperature': {'kind': 'int', 'min': -60, 'max': 60, 'required': True},
+    'Weather': {'kind': 'category', 'categories': ['sunny', 'cloudy', 'rainy']},
+    'sales': {'kind': 'float', 'required': False, 'nullable': True},
+})
+
+
+def load(tmp_path, text, schema=SCHEMA):
+
+    path = tmp_path / "data.csv"
+    path.write_text(text)
+    return DataIngestionModule(str(path), schema=schema, cache=False).load_data()
+
+
+def test_smallest_int_dtype():
+
+    assert smallest_int_dtype(0, 1) == np.uint8
+    assert smallest_int_dtype(0, 70000) == np.uint32
+    assert smallest_int_dtype(-60, 60) == np.int8
+    with pytest.raises(ValueError):
+        smallest_int_dtype(0, 2**70)
+
+
+def test_columns_get_the_declared_dtypes(tmp_path):
+
+    df = load(tmp_path, "Id,Gender,Temperature,Weather,sales\n1,0,-5,sunny,10.5\n2,1,30,rainy,\n")
+
+    assert df.dtypes.to_dict() == {
+        'Id': np.uint32, 'Gender': np.uint8, 'Temperature': np.int8,
+        'Weather': pd.CategoricalDtype(['sunny', 'cloudy', 'rainy']), 'sales': np.float64
+    }
+    assert df['Weather'].cat.codes.tolist() == [0, 2]
+    assert np.isnan(df['sales'].iloc[1])
+
+
+@pytest.mark.parametrize("row, message", [
+    ("3,2,0,sunny,1.0", "Gender are outside [0, 1] (file lines [3])"),
+    ("3,0,99,sunny,1.0", "Temperature are outside [-60, 60]"),
+    ("3,0,0,foggy,1.0", "Weather are not one of"),
+    ("3,0,0,,1.0", "Weather are missing"),
+    ("3,0,x,sunny,1.0", "does not match the declared column types"),
+])
+def test_invalid_values_are_rejected_with_their_line(tmp_path, row, message):
+
+    with pytest.raises(SchemaValidationError, match=re.escape(message)):
+        load(tmp_path, f"Id,Gender,Temperature,Weather,sales\n1,0,0,sunny,1.0\n{row}\n")
+
+
+def test_unknown_and_missing_columns_are_rejected(tmp_path):
+
+    with pytest.raises(SchemaValidationError, match="not in the schema"):
+        load(tmp_path, "Id,Gender,Temperature,Weather,extra\n1,0,0,sunny,1\n")
+    with pytest.raises(SchemaValidationError, match=r"Missing required columns: \['Temperature'\]"):
+        load(tmp_path, "Id,Gender,Weather\n1,0,sunny\n")
+
+
+def test_without_a_schema_types_are_inferred_and_errors_return_none(tmp_path):
+
+    path = tmp_path / "data.csv"
+    path.write_text("Id,Gender,Weather\n1,0,sunny\n2,1,rainy\n")
+
+    df = DataIngestionModule(str(path)).load_data()
+    assert df['Gender'].dtype == np.int64
+    assert df['Weather'].dtype == object
+    assert DataIngestionModule(str(tmp_path / "missing.csv")).load_data() is None
+
+
+def test_chocolate_schema_reads_the_training_data():
+
+    path = Path(__file__).resolve().parent.parent / 'IN' / 'data_training.csv'
+    df = DataIngestionModule(str(path), schema=CHOCOLATE_SCHEMA, cache=False).load_data()
+
+    assert len(df) > 0
+    assert df['Gender'].dtype == np.uint8
+    assert isinstance(df['Weather'].dtype, pd.CategoricalDtype)
+    assert CHOCOLATE_SCHEMA.memory_report(df)['saved_bytes'] > 0
@@ -0,0 +1,167 @@
+import gzip
+
+import pytest
+
+from DataIngestionModule import DataIngestionModule
+from WatermarkModule import WatermarkModule, complete_lines_end
+
+
+HEADER = "Id,x\n"
+
+
+def delta(path, state, commit=True, **kwargs):
+
+    ingestor = DataIngestionModule(str(path))
+    df = ingestor.load_delta(str(state), **kwargs)
+    if commit:
+        ingestor.commit_delta()
+    return df, ingestor.delta_report
+
+
+@pytest.fixture
+def files(tmp_path):
+
+    return tmp_path / "data.csv", tmp_path / "watermarks.json"
+
+
+def test_complete_lines_end_stops_after_the_last_newline(tmp_path):
+
+    path = tmp_path / "lines.csv"
+    path.write_bytes(b"a\nbb\ncc")
+    assert complete_lines_end(str(path), 7) == 5
+    assert complete_lines_end(str(path), 4) == 2
+    path.write_bytes(b"abc")
+    assert complete_lines_end(str(path), 3) == 0
+
+
+def test_first_run_reads_everything_then_only_appended_rows(files):
+
+    path, state = files
+    path.write_text(HEADER + "1,10\n2,20\n")
+    df, report = delta(path, state)
+    assert report['reset'] and df['Id'].tolist() == [1, 2]
+
+    df, report = delta(path, state)
+    assert not report['reset'] and len(df) == 0
+    assert list(df.columns) == ['Id', 'x']
+
+    with open(path, 'a') as f:
+        f.write("3,30\n4,40\n")
+    df, report = delta(path, state)
+    assert not report['reset']
+    assert df['Id'].tolist() == [3, 4]
+    assert report['files'][0]['mode'] == 'append'
+
+
+def test_partial_trailing_line_waits_until_it_is_complete(files):
+
+    path, state = files
+    path.write_text(HEADER + "1,10\n")
+    delta(path, state)
+
+    with open(path, 'a') as f:
+        f.write("2,20\n3,3")
+    df, _ = delta(path, state)
+    assert df['Id'].tolist() == [2]
+
+    with open(path, 'a') as f:
+        f.write("0\n")
+    df, _ = delta(path, state)
+    assert df.values.tolist() == [[3, 30]]
+
+
+def test_offset_marked_is_the_one_planned(files):
+
+    path, state = files
+    path.write_text(HEADER + "1,10\n")
+    delta(path, state)
+    with open(path, 'a') as f:
+        f.write("2,20\n3,3")
+
+    plan = WatermarkModule(str(state)).plan(str(path))
+    delta(path, state)
+    assert WatermarkModule(str(state)).marks[str(path.resolve())]['offset'] == plan['end']
+
+
+def test_continued_last_row_of_a_full_read_forces_a_full_read(files):
+
+    path, state = files
+    path.write_text(HEADER + "1,10\n2,2")
+    df, _ = delta(path, state)
+    assert df['x'].tolist() == [10, 2]
+
+    with open(path, 'a') as f:
+        f.write("0\n3,30\n")
+    df, report = delta(path, state)
+    assert report['reset'] and report['files'][0]['reason'] == "last row continued"
+    assert df['x'].tolist() == [10, 20, 30]
+
+
+@pytest.mark.parametrize("rewrite, reason", [
+    (HEADER + "1,10\n", "file shrank"),
+    ("Id,y\n1,10\n2,20\n3,30\n", "header changed"),
+    (HEADER + "9,90\n2,20\n3,30\n", "file rewritten"),
+])
+def test_rewritten_file_is_read_again_in_full(files, rewrite, reason):
+
+    path, state = files
+    path.write_text(HEADER + "1,10\n2,20\n")
+    delta(path, state)
+
+    path.write_text(rewrite)
+    df, report = delta(path, state)
+    assert report['reset']
+    assert report['rebuilt'] == [str(path)]
+    assert report['files'][0]['reason'] == reason
+    assert len(df) == len(rewrite.splitlines()) - 1
+
+
+def test_reset_and_uncommitted_delta(files):
+
+    path, state = files
+    path.write_text(HEADER + "1,10\n")
+    delta(path, state)
+    with open(path, 'a') as f:
+        f.write("2,20\n")
+
+    # Without commit_delta() the same rows come back next time
+    df, _ = delta(path, state, commit=False)
+    assert df['Id'].tolist() == [2]
+    df, _ = delta(path, state)
+    assert df['Id'].tolist() == [2]
+
+    df, report = delta(path, state, reset=True)
+    assert report['reset'] and df['Id'].tolist() == [1, 2]
+
+
+def test_compressed_file_yields_rows_past_the_watermark(tmp_path):
+
+    path, state = tmp_path / "data.csv.gz", tmp_path / "watermarks.json"
+    path.write_bytes(gzip.compress((HEADER + "1,10\n2,20\n").encode()))
+    delta(path, state)
+
+    path.write_bytes(gzip.compress((HEADER + "1,10\n2,20\n3,30\n").encode()))
+    df, report = delta(path, state)
+    assert not report['reset'] and df['Id'].tolist() == [3]
+
+    path.write_bytes(gzip.compress((HEADER + "7,10\n8,20\n9,30\n4,40\n").encode()))
+    df, report = delta(path, state)
+    assert report['reset'] and len(df) == 4
+
+
+def test_output_is_truncated_to_its_size_at_the_last_save(tmp_path):
+
+    output, state = tmp_path / "processed.csv", tmp_path / "watermarks.json"
+    output.write_text("a\n1\n")
+    watermarks = WatermarkModule(str(state))
+    assert not watermarks.restore_output(str(output))
+    watermarks.mark_output(str(output))
+    watermarks.save()
+
+    with open(output, 'a') as f:
+        f.write("2\n")
+    assert WatermarkModule(str(state)).restore_output(str(output))
+    assert output.read_text() == "a\n1\n"
+
+    output.write_text("a\n")
+    assert not WatermarkModule(str(state)).restore_output(str(output))